@@ -0,0 +1,124 @@
+"""Admin routes: login, dashboard, clubs and bulk imports."""
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, session, flash, jsonify
+from models import db, Club
+from queries import query_budget, get_admin_dashboard_data
+from pagination import parse_filters, InvalidCursor
+import fragments
+import jobs
+import importer
+import database
+from caching import chatbot_cache, invalidate_catalog
+from main_views import job_owner
+import io
+
+bp = Blueprint('admin', __name__)
+
+@bp.route('/admin_login', methods=['GET', 'POST'])
+def admin_login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        
+        if username == 'admin' and password == 'admin123':
+            session['admin_id'] = 1
+            session['admin_name'] = 'admin'
+            session['user_type'] = 'admin'
+            flash('Login successful!', 'success')
+            return redirect(url_for('admin.admin_dashboard'))
+        else:
+            flash('Invalid username or password', 'error')
+    
+    return render_template('admin_login.html')
+
+@bp.route('/admin_dashboard')
+@query_budget('admin_dashboard')
+def admin_dashboard():
+    if 'admin_id' not in session or session.get('user_type') != 'admin':
+        return redirect(url_for('admin.admin_login'))
+    
+    try:
+        data = get_admin_dashboard_data(events_cursor=request.args.get('events_cursor'),
+                                        registrations_cursor=request.args.get('registrations_cursor'),
+                                        filters=parse_filters(request.args))
+    except InvalidCursor:
+        return redirect(url_for('admin.admin_dashboard'))
+    
+    return render_template('admin_dashboard.html', **data)
+
+@bp.route('/add_club', methods=['GET', 'POST'])
+@database.retry_on_busy
+def add_club():
+    if 'admin_id' not in session or session.get('user_type') != 'admin':
+        return redirect(url_for('admin.admin_login'))
+    
+    if request.method == 'POST':
+        club_name = request.form['club_name']
+        password = request.form['password']
+        
+        if not club_name or not password:
+            flash('All fields are required!', 'error')
+        elif Club.query.filter_by(club_name=club_name).first():
+            flash('Club already exists!', 'error')
+        else:
+            club = Club(club_name=club_name)
+            club.set_password(password)
+            db.session.add(club)
+            fragments.bump_catalog_version()
+            db.session.commit()
+            invalidate_catalog()
+            flash('Club added successfully!', 'success')
+            return redirect(url_for('admin.admin_dashboard'))
+    
+    return render_template('add_club.html')
+
+@bp.route('/import_data', methods=['GET', 'POST'])
+def import_data():
+    if 'admin_id' not in session or session.get('user_type') != 'admin':
+        return redirect(url_for('admin.admin_login'))
+    
+    report = None
+    if request.method == 'POST':
+        kind = request.form.get('kind')
+        upload = request.files.get('file')
+        file_format = importer.detect_format(upload.filename) if upload else None
+        
+        if kind not in importer.IMPORTERS or not upload or not upload.filename:
+            flash('Choose what to import and a file!', 'error')
+        elif file_format is None:
+            flash('Upload a .csv, .json or .jsonl file!', 'error')
+        else:
+            # Parse straight from the upload stream instead of reading it into memory
+            stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+            report = importer.import_stream(kind, stream, file_format,
+                                            batch_size=current_app.config['IMPORT_BATCH_SIZE'],
+                                            workers=current_app.config['IMPORT_HASH_WORKERS'])
+            if report.inserted:
+                invalidate_catalog()
+            flash(report.summary(), 'success' if report.ok else 'error')
+    
+    return render_template('import_data.html', report=report, max_errors=200)
+
+@bp.route('/delete_club/<int:club_id>')
+@database.retry_on_busy
+def delete_club(club_id):
+    if 'admin_id' not in session or session.get('user_type') != 'admin':
+        return redirect(url_for('admin.admin_login'))
+    
+    club = Club.query.get_or_404(club_id)
+    
+    # The cascade runs on a job worker (tasks.delete_club). The key makes a
+    # double-clicked delete one job; the catalog version keeps it from matching
+    # an old job for a club that was deleted before and whose id was reused.
+    job = jobs.enqueue('delete_club', {'club_id': club.id}, owner=job_owner(),
+                       idempotency_key=f'delete_club:{club.id}:{fragments.current_catalog_version()}')
+    db.session.commit()
+    
+    flash(f'Deleting {club.club_name} in the background (job {job.id}).', 'info')
+    return redirect(url_for('admin.admin_dashboard'))
+
+@bp.route('/chatbot_cache_stats')
+def chatbot_cache_stats():
+    if 'admin_id' not in session or session.get('user_type') != 'admin':
+        return jsonify({'error': 'Admin login required'}), 403
+    
+    return jsonify(chatbot_cache.stats())
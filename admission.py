@@ -0,0 +1,325 @@
+"""Admission control: per-user rate limits and per-route concurrency caps.
+
+When registration for a popular event opens, logins, registrations and
+chatbot messages arrive faster than the database can take them. Left
+alone, every request queues behind SQLite's write lock and all of them
+get slow together. Instead each request to a limited endpoint is admitted
+or turned away before its view runs:
+
+  * Rate limits: a token bucket per user and endpoint, RATE_LIMITS
+    = {endpoint: (requests, seconds)}, holds that many requests and
+    refills over that many seconds. A request that finds it empty gets
+    429. Users are keyed by session['student_id'] when a student is
+    logged in, else by client IP.
+  * Account limits: ACCOUNT_RATE_LIMITS = {endpoint: (field, requests,
+    seconds)} is a second bucket per submitted form field and client IP,
+    so password guesses against one account are throttled while a whole
+    campus behind one NAT address can still log in under the looser IP
+    limit.
+  * Concurrency caps: CONCURRENCY_LIMITS = {endpoint: (running, queued)}
+    lets that many requests run at once and up to `queued` more wait for
+    a slot, each for at most ADMISSION_QUEUE_TIMEOUT seconds. A request
+    that finds the queue full, or times out, gets 503.
+
+Both answers carry Retry-After and cost next to nothing, so the admitted
+requests stay fast and goodput stays flat past saturation. Keys are
+endpoint names, optionally prefixed with a method ('POST student.student_login').
+Behind a reverse proxy, set PROXY_FIX_HOPS (see app.py) so the client IP
+is the one the proxy saw rather than the proxy's own.
+
+Token buckets live in a backend chosen by RATE_LIMIT_STORAGE_URL:
+memory:// (the default) keeps them in this process, and redis://host/0
+shares them between all the workers of a deployment (pip install redis).
+Other backends register a URL scheme in BACKENDS. If the shared backend
+fails (Redis is down or slow), the error is logged and the request is
+counted in this process's memory instead, until the backend answers
+again; admission never turns an outage into a 500. Concurrency caps are
+always per process, as they bound this process's threads and connection
+pool; divide them by the number of workers.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+from flask import g, jsonify, request, session, Response
+
+try:
+    import redis
+except ImportError:  # optional: only the shared backend needs it
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ADMISSION_ENABLED': True,
+    'RATE_LIMIT_STORAGE_URL': 'memory://',
+    'RATE_LIMITS': {
+        # Anonymous logins share their client IP's bucket, so it only bounds a flood
+        'POST student.student_login': (300, 60),
+        'POST student.register_event': (20, 60),
+        'chatbot.chatbot_process': (30, 60),
+        'chatbot.chatbot_stream': (30, 60),
+    },
+    # Attempts per register number and client IP: a student mistyping their
+    # password is never refused, guessing it is slowed to 10 tries per 5 minutes
+    'ACCOUNT_RATE_LIMITS': {
+        'POST student.student_login': ('reg_no', 10, 300),
+    },
+    'CONCURRENCY_LIMITS': {
+        'POST student.student_login': (4, 32),
+        'POST student.register_event': (4, 32),
+        'chatbot.chatbot_process': (8, 32),
+        'chatbot.chatbot_stream': (8, 32),
+    },
+    'ADMISSION_QUEUE_TIMEOUT': 2.0,   # seconds a queued request waits for a slot before its 503
+    'ADMISSION_RETRY_AFTER': 1,       # Retry-After seconds on a 503
+}
+
+MESSAGES = {
+    429: 'Too many requests. Please wait a moment and try again.',
+    503: 'The server is busy. Please try again in a moment.',
+}
+
+
+class MemoryBackend:
+    """Token buckets in this process, the least recently used dropped beyond maxsize"""
+
+    remote = False
+
+    def __init__(self, url=None, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, monotonic time of the last update)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Take a token from key's bucket: 0 if there was one, else seconds until there is"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisBackend:
+    """Token buckets in Redis (5 or later), shared by every worker using the same server"""
+
+    remote = True
+
+    # The same arithmetic as MemoryBackend.take, atomically and on the Redis server's clock
+    TAKE = """
+        local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = tonumber(bucket[1]) or burst
+        local updated = tonumber(bucket[2]) or now
+        tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+        local wait = 0
+        if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+        redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+        return tostring(wait)
+    """
+
+    # Seconds to wait for Redis before counting the request in memory instead
+    TIMEOUT = 0.25
+
+    def __init__(self, url, prefix='admission:'):
+        if redis is None:
+            raise RuntimeError('RATE_LIMIT_STORAGE_URL=redis://... needs the redis package: pip install redis')
+        self.prefix = prefix
+        client = redis.Redis.from_url(url, socket_timeout=self.TIMEOUT, socket_connect_timeout=self.TIMEOUT)
+        self._take = client.register_script(self.TAKE)
+
+    def take(self, key, rate, burst):
+        return float(self._take(keys=[self.prefix + key], args=[rate, burst]))
+
+
+# URL scheme of RATE_LIMIT_STORAGE_URL -> backend class, constructed with the URL
+BACKENDS = {'memory': MemoryBackend, 'redis': RedisBackend, 'rediss': RedisBackend, 'unix': RedisBackend}
+
+
+def backend_from_url(url):
+    scheme = urlsplit(url).scheme
+    if scheme not in BACKENDS:
+        raise ValueError(f'Unknown RATE_LIMIT_STORAGE_URL scheme {scheme!r} (expected one of {sorted(BACKENDS)})')
+    return BACKENDS[scheme](url)
+
+
+class Gate:
+    """At most limit requests at once, and at most queue more waiting for a slot"""
+
+    def __init__(self, limit, queue):
+        self.limit = limit
+        self.queue = queue
+        self.active = 0
+        self.waiting = 0
+        self._slots = threading.Condition()
+
+    def acquire(self, timeout):
+        """Take a slot, waiting up to timeout seconds; False if the queue is full or the wait times out"""
+        with self._slots:
+            if self.active >= self.limit:
+                if self.waiting >= self.queue:
+                    return False
+                self.waiting += 1
+                try:
+                    if not self._slots.wait_for(lambda: self.active < self.limit, timeout):
+                        return False
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._slots:
+            self.active -= 1
+            self._slots.notify()
+
+
+class AsyncGate(Gate):
+    """Gate for requests served on an event loop (see asgi.py)"""
+
+    def __init__(self, limit, queue):
+        super().__init__(limit, queue)
+        self._slots = asyncio.Condition()
+
+    async def acquire(self, timeout):
+        async with self._slots:
+            if self.active >= self.limit:
+                if self.waiting >= self.queue:
+                    return False
+                self.waiting += 1
+                try:
+                    await asyncio.wait_for(self._slots.wait_for(lambda: self.active < self.limit), timeout)
+                except asyncio.TimeoutError:
+                    return False
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            return True
+
+    async def release(self):
+        async with self._slots:
+            self.active -= 1
+            self._slots.notify()
+
+
+def _rule(rules, method, endpoint):
+    """(key, value) of the rule for a request, the method-specific one first; (None, None) if none"""
+    for key in (f'{method} {endpoint}', endpoint):
+        if key in rules:
+            return key, rules[key]
+    return None, None
+
+
+class Admission:
+    """The rate limits and concurrency caps of one app's config"""
+
+    def __init__(self, config, backend=None, gate_class=Gate):
+        self.enabled = config['ADMISSION_ENABLED']
+        self.rate_limits = config['RATE_LIMITS']
+        self.account_limits = config['ACCOUNT_RATE_LIMITS']
+        self.queue_timeout = config['ADMISSION_QUEUE_TIMEOUT']
+        self.retry_after = config['ADMISSION_RETRY_AFTER']
+        self.backend = backend or backend_from_url(config['RATE_LIMIT_STORAGE_URL'])
+        self.fallback = MemoryBackend()  # while self.backend is failing
+        self.failing = False
+        self.gates = {key: gate_class(limit, queue) for key, (limit, queue) in config['CONCURRENCY_LIMITS'].items()}
+
+    def rate_limited(self, method, endpoint, identity):
+        """Seconds until identity may make this request again, 0 if it may now"""
+        key, limit = _rule(self.rate_limits, method, endpoint)
+        if key is None:
+            return 0
+        requests, seconds = limit
+        return self._take(f'{key}|{identity}', requests / seconds, requests)
+
+    def account_limited(self, method, endpoint, form, address):
+        """Seconds until the account named in form may be tried again from address, 0 if it may now"""
+        key, limit = _rule(self.account_limits, method, endpoint)
+        if key is None:
+            return 0
+        field, requests, seconds = limit
+        return self._take(f'{key}|{field}:{form.get(field, "")}|ip:{address}', requests / seconds, requests)
+
+    def _take(self, key, rate, burst):
+        """backend.take, or the in-memory bucket while the backend raises"""
+        try:
+            wait = self.backend.take(key, rate, burst)
+        except Exception:
+            if not self.failing:
+                logger.exception('Rate limit backend failed; counting requests in memory until it recovers')
+                self.failing = True
+            return self.fallback.take(key, rate, burst)
+        if self.failing:
+            logger.warning('Rate limit backend recovered')
+            self.failing = False
+        return wait
+
+    def gate(self, method, endpoint):
+        return _rule(self.gates, method, endpoint)[1]
+
+
+def retry_after(seconds):
+    """The Retry-After header value: whole seconds, at least 1"""
+    return str(max(1, math.ceil(seconds)))
+
+
+def _identity():
+    if session.get('user_type') == 'student' and 'student_id' in session:
+        return f"student:{session['student_id']}"
+    return f'ip:{request.remote_addr}'
+
+
+def _refuse(status, seconds):
+    if request.is_json or request.path.startswith('/api/'):
+        response = jsonify({'error': MESSAGES[status]})
+        response.status_code = status
+    else:
+        response = Response(MESSAGES[status], status, mimetype='text/plain')
+    response.headers['Retry-After'] = retry_after(seconds)
+    return response
+
+
+def _release(exc):
+    gate = g.pop('_admission_gate', None)
+    if gate is not None:
+        gate.release()
+
+
+def init_app(app):
+    """Check every request of app against its rate limits and concurrency caps"""
+    for key, value in DEFAULTS.items():
+        app.config.setdefault(key, value)
+    admission = app.extensions['admission'] = Admission(app.config)
+
+    @app.before_request
+    def admit():
+        if not admission.enabled or request.endpoint is None:
+            return None
+        wait = (admission.rate_limited(request.method, request.endpoint, _identity())
+                or admission.account_limited(request.method, request.endpoint, request.form, request.remote_addr))
+        if wait:
+            return _refuse(429, wait)
+        gate = admission.gate(request.method, request.endpoint)
+        if gate is not None:
+            if not gate.acquire(admission.queue_timeout):
+                return _refuse(503, admission.retry_after)
+            # Released once the response is sent, or once a streamed response ends
+            g._admission_gate = gate
+        return None
+
+    app.teardown_request(_release)
@@ -0,0 +1,297 @@
+"""Chatbot answers, written once for the threaded and the async server.
+
+An answer is a generator. It yields its text piece by piece, one heading
+or one event at a time. When it needs the database it yields a step
+instead: a function taking a SQLAlchemy Session, whose return value is
+sent back into the generator.
+
+    events = yield lambda session: session.execute(EVENTS).all()
+
+render() runs an answer's steps on a Session and yields its text, for the
+Flask views. stream() runs the steps on an AsyncSession through
+run_sync(), so the event loop serves other requests while a step waits
+on the database (see asgi.py). Either caller can send each piece as soon
+as it is produced, e.g. as one server-sent event per piece with sse().
+
+A step that raises is thrown back into the answer at its yield, so an
+answer handles database errors with an ordinary try/except.
+"""
+import json
+import random
+
+from sqlalchemy import select
+
+import intents
+import recommend
+from caching import cached_answer, chatbot_cache, UncachedAnswer
+from fragments import current_catalog_version
+from models import Club, Student, Event
+from search import search_events, highlight_markdown
+
+EMPTY_MESSAGE = 'Please ask me something about clubs, events, or registrations!'
+ERROR_MESSAGE = 'Sorry, I encountered an error. Please try again.'
+
+# Events with their club's name, for the answers that list events
+EVENT_ROWS = (select(Event.event_name, Event.description, Event.credits, Club.club_name)
+              .join(Club, Club.id == Event.club_id)
+              .order_by(Event.id))
+
+
+def render(answer, session):
+    """Yield the text of an answer, running its steps on session as they come"""
+    value = error = None
+    while True:
+        try:
+            item = answer.send(value) if error is None else answer.throw(error)
+        except StopIteration:
+            return
+        value = error = None
+        if isinstance(item, str):
+            yield item
+            continue
+        try:
+            value = item(session)
+        except Exception as e:
+            session.rollback()
+            error = e
+
+
+async def stream(answer, session):
+    """render() for an AsyncSession: each step runs through session.run_sync()"""
+    value = error = None
+    while True:
+        try:
+            item = answer.send(value) if error is None else answer.throw(error)
+        except StopIteration:
+            return
+        value = error = None
+        if isinstance(item, str):
+            yield item
+            continue
+        try:
+            value = await session.run_sync(item)
+        except Exception as e:
+            await session.rollback()
+            error = e
+
+
+def sse(data, event=None):
+    """One server-sent event carrying data as JSON"""
+    head = f'event: {event}\n' if event else ''
+    return f'{head}data: {json.dumps(data)}\n\n'
+
+
+def answer(message, student_id=None):
+    """The answer to a chatbot message from the student with student_id (None if not a student)"""
+    message = message.lower().strip()
+    if not message:
+        yield EMPTY_MESSAGE
+        return
+
+    # Single pass over the message: intent plus credits / club slots
+    intent = intents.classify(message, (yield from club_names()))
+
+    if intent.name == intents.CLUBS:
+        yield from clubs_information()
+    elif intent.name == intents.EVENTS_BY_CREDITS:
+        yield from events_by_credits(intent.credits)
+    elif intent.name == intents.EVENTS_BY_CLUB:
+        yield from events_by_club(intent.club_name)
+    elif intent.name == intents.ALL_EVENTS:
+        yield from all_events()
+    elif intent.name == intents.REGISTRATION_HELP:
+        yield from registration_help()
+    elif intent.name == intents.RECOMMENDATIONS:
+        yield from event_recommendations(student_id, intent.credits)
+    elif intent.name == intents.SEARCH:
+        yield from events_about(intent.topic)
+    elif intent.name == intents.MY_CREDITS:
+        yield from student_credits(student_id)
+    else:
+        yield fallback_response()
+
+
+def club_names():
+    """Names of all clubs, used to recognise club mentions in chatbot messages"""
+    key = ('club_names', (yield current_catalog_version))
+    found, names = chatbot_cache.get(key)
+    if not found:
+        names = yield lambda session: tuple(session.scalars(select(Club.club_name).order_by(Club.id)))
+        chatbot_cache.set(key, names)
+    return names
+
+
+def student_credits(student_id):
+    """The logged-in student's running credit total (per user, so never cached)"""
+    credits = None
+    if student_id is not None:
+        credits = yield lambda session: session.scalar(
+            select(Student.credits_earned).where(Student.id == student_id))
+    if credits is None:
+        yield "Log in as a student to see the credits you have earned."
+        return
+    yield (f"🎓 **Your credits:** you have earned **{credits} credits** "
+           f"from accepted event registrations.")
+
+
+@cached_answer('clubs', current_catalog_version)
+def clubs_information():
+    """Get information about all available clubs"""
+    try:
+        clubs = yield lambda session: session.execute(
+            select(Club.club_name, Club.event_count).order_by(Club.id)).all()
+    except Exception:
+        yield UncachedAnswer("Sorry, I couldn't retrieve club information right now.")
+        return
+    if not clubs:
+        yield "No clubs are currently available in the system."
+        return
+
+    yield "🏢 **Available Clubs:**\n\n"
+    for club in clubs:
+        yield f"• **{club.club_name}** - {club.event_count} event(s)\n"
+    yield f"\nTotal: {len(clubs)} clubs available"
+
+
+@cached_answer('all_events', current_catalog_version)
+def all_events():
+    """Get information about all events"""
+    try:
+        events = yield lambda session: session.execute(EVENT_ROWS).all()
+    except Exception:
+        yield UncachedAnswer("Sorry, I couldn't retrieve event information right now.")
+        return
+    if not events:
+        yield "No events are currently available."
+        return
+
+    yield "🎪 **All Available Events:**\n\n"
+    for event in events:
+        yield (f"• **{event.event_name}**\n"
+               f"  📝 {event.description}\n"
+               f"  💳 {event.credits} credits\n"
+               f"  🏢 by {event.club_name}\n\n")
+    yield f"Total: {len(events)} events available"
+
+
+@cached_answer('events_by_credits', current_catalog_version)
+def events_by_credits(credits):
+    """Get events filtered by credit value"""
+    try:
+        events = yield lambda session: session.execute(EVENT_ROWS.where(Event.credits == credits)).all()
+    except Exception:
+        yield UncachedAnswer(f"Sorry, I couldn't search for events with {credits} credits.")
+        return
+    if not events:
+        yield f"No events found that offer {credits} credits."
+        return
+
+    yield f"💳 **Events with {credits} credits:**\n\n"
+    for event in events:
+        yield (f"• **{event.event_name}**\n"
+               f"  📝 {event.description}\n"
+               f"  🏢 by {event.club_name}\n\n")
+    yield f"Found: {len(events)} event(s) with {credits} credits"
+
+
+@cached_answer('events_by_club', current_catalog_version)
+def events_by_club(club_name):
+    """Get events conducted by a specific club"""
+    try:
+        club_id = yield lambda session: session.scalar(select(Club.id).where(Club.club_name == club_name))
+        if club_id is None:
+            yield f"Club '{club_name}' not found."
+            return
+        events = yield lambda session: session.execute(EVENT_ROWS.where(Event.club_id == club_id)).all()
+    except Exception:
+        yield UncachedAnswer(f"Sorry, I couldn't retrieve events for {club_name}.")
+        return
+    if not events:
+        yield f"{club_name} hasn't created any events yet."
+        return
+
+    yield f"🏢 **Events by {club_name}:**\n\n"
+    for event in events:
+        yield (f"• **{event.event_name}**\n"
+               f"  📝 {event.description}\n"
+               f"  💳 {event.credits} credits\n\n")
+    yield f"Total: {len(events)} event(s) by {club_name}"
+
+
+@cached_answer('events_about', current_catalog_version)
+def events_about(topic):
+    """Get events whose name or description matches a topic, best match first"""
+    try:
+        results = yield lambda session: search_events(session, topic, limit=5)
+    except Exception:
+        yield UncachedAnswer(f"Sorry, I couldn't search for events about '{topic}'.")
+        return
+    if not results:
+        yield f"No events found about '{topic}'."
+        return
+
+    yield f"🔎 **Events about {topic}:**\n\n"
+    for result in results:
+        yield (f"• **{result['event_name']}**\n"
+               f"  📝 {highlight_markdown(result['snippet'])}\n"
+               f"  💳 {result['credits']} credits\n"
+               f"  🏢 by {result['club_name']}\n\n")
+    yield f"Showing the {len(results)} best match(es)"
+
+
+def registration_help():
+    """Get help information about the registration process"""
+    yield "📝 **How to Register for Events:**\n\n"
+    yield ("1. **Create Student Account:**\n"
+           "   • Go to Student Login\n"
+           "   • Click 'Register here'\n"
+           "   • Fill in your details (name, reg no, email, password)\n\n")
+    yield ("2. **Login to Your Account:**\n"
+           "   • Use your register number and password\n\n")
+    yield ("3. **Browse Events:**\n"
+           "   • View all available events on your dashboard\n"
+           "   • See event details, credits, and organizing clubs\n\n")
+    yield ("4. **Register for Events:**\n"
+           "   • Click 'Register for Event' button\n"
+           "   • Submit the registration form\n"
+           "   • Wait for club approval (Pending → Accepted/Rejected)\n\n")
+    yield ("5. **Track Your Status:**\n"
+           "   • Check your dashboard for registration status\n"
+           "   • Accepted registrations are confirmed\n\n")
+    yield ("💡 **Tip:** Register early! Events may have limited seats; once they fill up, "
+           "new registrations join a waitlist and move up when a seat frees.")
+
+
+def event_recommendations(student_id, credits=None):
+    """Events similar to the student's registrations, else the most popular ones (per user, so never cached)"""
+    events = yield lambda session: recommend.for_student(student_id, limit=3, min_credits=credits, session=session)
+
+    if not events:
+        yield "No events available for recommendation at the moment."
+        return
+
+    yield "⭐ **Event Recommendations:**\n\n"
+    for i, event in enumerate(events, 1):
+        yield (f"{i}. **{event.event_name}**\n"
+               f"   📝 {event.description}\n"
+               f"   💳 {event.credits} credits\n"
+               f"   🏢 by {event.club_name}\n\n")
+
+    if student_id is None:
+        yield "💡 **Recommendation Tip:** Log in as a student to get recommendations based on your registrations!"
+    elif events[0].source == recommend.NEIGHBOURS:
+        yield "💡 **Recommendation Tip:** These are popular with students who registered for the same events as you!"
+    else:
+        yield ("💡 **Recommendation Tip:** These are the most popular events right now. Register for a few "
+               "to get recommendations based on your registrations!")
+
+
+def fallback_response():
+    """Fallback response for unrecognized queries"""
+    responses = [
+        "I can help you with information about clubs, events, and registrations. Try asking about available clubs or events!",
+        "I'm here to assist with event-related questions. Ask me about clubs, events, credits, or the registration process.",
+        "I can provide information about available clubs, events, and how to register. What would you like to know?",
+        "Try asking me: 'What clubs are available?' or 'Show me all events' or 'How do I register for an event?'"
+    ]
+    return random.choice(responses)
@@ -0,0 +1,217 @@
+"""Versioned JSON API (/api/v1) over clubs, events and registrations.
+
+List and detail views select only the requested columns (?fields=id,event_name)
+plus the joins those columns need, and build dictionaries straight from the
+result rows, so no ORM objects are loaded. Lists are keyset paginated like
+the /api/events listing. Exports stream every matching row as one JSON
+array: rows are fetched EXPORT_BATCH_SIZE at a time and each batch is
+encoded and sent before the next one is read.
+"""
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import select
+
+from models import db, Club, Student, Event, Registration
+from pagination import (Page, after_cursor, clamp_page_size, encode_cursor,
+                        encode_id_cursor, decode_id_cursor, parse_filters)
+
+EXPORT_BATCH_SIZE = 1000
+
+# A selectable column and the joins (by name, in join order) it needs
+Field = namedtuple('Field', ['column', 'joins'])
+# timestamp is the newest-first sort column; None means ordered by id ascending
+Resource = namedtuple('Resource', ['table', 'fields', 'default_fields', 'joins', 'filters', 'timestamp'])
+
+
+class InvalidFields(ValueError):
+    """Raised when ?fields= names a field the resource does not have"""
+
+
+CLUB_FIELDS = {
+    'id': Field(Club.id, ()),
+    'club_name': Field(Club.club_name, ()),
+    'event_count': Field(Club.event_count, ()),
+}
+
+EVENT_FIELDS = {
+    'id': Field(Event.id, ()),
+    'event_name': Field(Event.event_name, ()),
+    'description': Field(Event.description, ()),
+    'credits': Field(Event.credits, ()),
+    'capacity': Field(Event.capacity, ()),
+    'seats_taken': Field(Event.seats_taken, ()),
+    'registrations_total': Field(Event.registrations_total, ()),
+    'club_id': Field(Event.club_id, ()),
+    'club_name': Field(Club.club_name, ('club',)),
+    'created_at': Field(Event.created_at, ()),
+}
+
+REGISTRATION_FIELDS = {
+    'id': Field(Registration.id, ()),
+    'status': Field(Registration.status, ()),
+    'registered_at': Field(Registration.registered_at, ()),
+    'student_id': Field(Registration.student_id, ()),
+    'student_name': Field(Student.name, ('student',)),
+    'reg_no': Field(Student.reg_no, ('student',)),
+    'event_id': Field(Registration.event_id, ()),
+    'event_name': Field(Event.event_name, ('event',)),
+    'club_id': Field(Event.club_id, ('event',)),
+    'club_name': Field(Club.club_name, ('event', 'club')),
+}
+
+RESOURCES = {
+    'clubs': Resource(
+        table=Club,
+        fields=CLUB_FIELDS,
+        default_fields=tuple(CLUB_FIELDS),
+        joins={},
+        filters={},
+        timestamp=None),
+    'events': Resource(
+        table=Event,
+        fields=EVENT_FIELDS,
+        default_fields=tuple(EVENT_FIELDS),
+        joins={'club': (Club, Event.club_id == Club.id)},
+        filters={'club_id': EVENT_FIELDS['club_id'], 'credits': EVENT_FIELDS['credits']},
+        timestamp=Event.created_at),
+    'registrations': Resource(
+        table=Registration,
+        fields=REGISTRATION_FIELDS,
+        default_fields=tuple(REGISTRATION_FIELDS),
+        joins={'student': (Student, Registration.student_id == Student.id),
+               'event': (Event, Registration.event_id == Event.id),
+               'club': (Club, Event.club_id == Club.id)},
+        filters={'club_id': REGISTRATION_FIELDS['club_id'],
+                 'credits': Field(Event.credits, ('event',)),
+                 'status': REGISTRATION_FIELDS['status'],
+                 'event_id': REGISTRATION_FIELDS['event_id'],
+                 'student_id': REGISTRATION_FIELDS['student_id']},
+        timestamp=Registration.registered_at),
+}
+
+
+def parse_fields(resource_name, raw):
+    """Field names from a comma-separated ?fields= value, or the resource's defaults"""
+    resource = RESOURCES[resource_name]
+    fields = list(dict.fromkeys(name.strip() for name in (raw or '').split(',') if name.strip()))
+    if not fields:
+        return list(resource.default_fields)
+    unknown = [name for name in fields if name not in resource.fields]
+    if unknown:
+        raise InvalidFields(f"Unknown field(s) {', '.join(unknown)}; choose from {', '.join(resource.fields)}")
+    return fields
+
+
+def request_filters(resource_name, args, user):
+    """Filters from the query string args, narrowed to what the logged-in user (their session) may read"""
+    filters = parse_filters(args)
+    for key in ('event_id', 'student_id'):
+        value = args.get(key, type=int)
+        if value is not None:
+            filters[key] = value
+    if resource_name == 'registrations':
+        # Clubs and students only ever see their own registrations
+        if user.get('user_type') == 'club':
+            filters['club_id'] = user['club_id']
+        elif user.get('user_type') == 'student':
+            filters['student_id'] = user['student_id']
+    return {k: v for k, v in filters.items() if k in RESOURCES[resource_name].filters}
+
+
+def _select(resource, fields, filters, extra=()):
+    """SELECT the given fields (and extra columns) with only the joins they and the filters need"""
+    needed = set()
+    conditions = []
+    for name in fields:
+        needed.update(resource.fields[name].joins)
+    for name, value in filters.items():
+        field = resource.filters[name]
+        needed.update(field.joins)
+        conditions.append(field.column == value)
+
+    columns = [resource.fields[name].column.label(name) for name in fields]
+    stmt = select(*columns, *extra).select_from(resource.table)
+    for name, (target, onclause) in resource.joins.items():
+        if name in needed:
+            stmt = stmt.join(target, onclause)
+    return stmt.where(*conditions)
+
+
+def _ordered(resource, stmt):
+    if resource.timestamp is None:
+        return stmt.order_by(resource.table.id)
+    return stmt.order_by(resource.timestamp.desc(), resource.table.id.desc())
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def encode(obj):
+    """JSON text for rows built by this module (datetimes as ISO 8601)"""
+    return json.dumps(obj, default=_json_default, separators=(',', ':'))
+
+
+def list_rows(resource_name, fields, filters=None, cursor=None, limit=None, session=None):
+    """One page of rows as dicts of the requested fields, plus the next cursor (on session, by default the request's)"""
+    resource = RESOURCES[resource_name]
+    limit = clamp_page_size(limit)
+    # The sort key is selected alongside so the next cursor never depends on ?fields=
+    sort_key = [resource.table.id.label('_cursor_id')]
+    if resource.timestamp is not None:
+        sort_key.append(resource.timestamp.label('_cursor_at'))
+    stmt = _ordered(resource, _select(resource, fields, filters or {}, extra=sort_key))
+    if cursor:
+        if resource.timestamp is None:
+            stmt = stmt.where(resource.table.id > decode_id_cursor(cursor))
+        else:
+            stmt = stmt.where(after_cursor(resource.timestamp, resource.table.id, cursor))
+
+    rows = (session or db.session).execute(stmt.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if resource.timestamp is None:
+            next_cursor = encode_id_cursor(last._cursor_id)
+        else:
+            next_cursor = encode_cursor(last._cursor_at, last._cursor_id)
+    width = len(fields)
+    return Page([dict(zip(fields, row[:width])) for row in rows], next_cursor)
+
+
+def get_row(resource_name, row_id, fields, filters=None, session=None):
+    """The row with this id as a dict of the requested fields, or None if filtered out or missing"""
+    resource = RESOURCES[resource_name]
+    stmt = _select(resource, fields, filters or {}).where(resource.table.id == row_id)
+    row = (session or db.session).execute(stmt).first()
+    return dict(zip(fields, row)) if row is not None else None
+
+
+def export_query(resource_name, fields, filters=None):
+    """Every matching row of the requested fields, in listing order, fetched EXPORT_BATCH_SIZE at a time"""
+    resource = RESOURCES[resource_name]
+    stmt = _ordered(resource, _select(resource, fields, filters or {}))
+    return stmt.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def export_chunk(fields, batch, first):
+    """One batch of export rows as a chunk of the JSON array"""
+    return ('' if first else ',') + ','.join(encode(dict(zip(fields, row))) for row in batch)
+
+
+def export_rows(resource_name, fields, filters=None):
+    """Yield every matching row as chunks of one JSON array, in listing order.
+
+    The query runs when iteration starts, so wrap the generator in
+    stream_with_context to keep the request's session while it streams.
+    """
+    result = db.session.execute(export_query(resource_name, fields, filters))
+    yield '['
+    for i, batch in enumerate(result.partitions()):
+        yield export_chunk(fields, batch, i == 0)
+    yield ']'
@@ -0,0 +1,94 @@
+"""JSON listing endpoints and the versioned /api/v1 API."""
+from flask import Blueprint, request, session, jsonify, Response, stream_with_context
+from queries import EVENT_FILTERS
+from pagination import (paginate_events, paginate_registrations, parse_filters, InvalidCursor,
+                        event_to_dict, registration_to_dict)
+import api
+
+bp = Blueprint('api', __name__)
+
+# JSON listing endpoints (keyset paginated)
+@bp.route('/api/events')
+def api_events():
+    if not session.get('user_type'):
+        return jsonify({'error': 'Login required'}), 401
+    
+    filters = {k: v for k, v in parse_filters(request.args).items() if k in EVENT_FILTERS}
+    try:
+        page = paginate_events(request.args.get('cursor'), request.args.get('limit'), **filters)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'items': [event_to_dict(e) for e in page.items], 'next_cursor': page.next_cursor})
+
+@bp.route('/api/registrations')
+def api_registrations():
+    user_type = session.get('user_type')
+    if not user_type:
+        return jsonify({'error': 'Login required'}), 401
+    
+    filters = parse_filters(request.args)
+    event_id = request.args.get('event_id', type=int)
+    if event_id is not None:
+        filters['event_id'] = event_id
+    
+    # Clubs and students only ever see their own registrations
+    if user_type == 'club':
+        filters['club_id'] = session['club_id']
+    elif user_type == 'student':
+        filters['student_id'] = session['student_id']
+    
+    try:
+        page = paginate_registrations(request.args.get('cursor'), request.args.get('limit'), **filters)
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'items': [registration_to_dict(r) for r in page.items], 'next_cursor': page.next_cursor})
+
+# Versioned JSON API: column-projected rows, ?fields= selection and keyset cursors
+def api_v1_filters(resource):
+    """Filters from the query string, narrowed to what the logged-in user may read"""
+    return api.request_filters(resource, request.args, session)
+
+@bp.route('/api/v1/<any(clubs, events, registrations):resource>')
+def api_v1_list(resource):
+    if not session.get('user_type'):
+        return jsonify({'error': 'Login required'}), 401
+    
+    try:
+        fields = api.parse_fields(resource, request.args.get('fields'))
+        page = api.list_rows(resource, fields, api_v1_filters(resource),
+                             request.args.get('cursor'), request.args.get('limit'))
+    except (api.InvalidFields, InvalidCursor) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return Response(api.encode({'items': page.items, 'next_cursor': page.next_cursor}),
+                    mimetype='application/json')
+
+@bp.route('/api/v1/<any(clubs, events, registrations):resource>/<int:row_id>')
+def api_v1_detail(resource, row_id):
+    if not session.get('user_type'):
+        return jsonify({'error': 'Login required'}), 401
+    
+    try:
+        fields = api.parse_fields(resource, request.args.get('fields'))
+    except api.InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    
+    item = api.get_row(resource, row_id, fields, api_v1_filters(resource))
+    if item is None:
+        return jsonify({'error': 'Not found'}), 404
+    return Response(api.encode(item), mimetype='application/json')
+
+@bp.route('/api/v1/<any(clubs, events, registrations):resource>/export')
+def api_v1_export(resource):
+    if not session.get('user_type'):
+        return jsonify({'error': 'Login required'}), 401
+    
+    try:
+        fields = api.parse_fields(resource, request.args.get('fields'))
+    except api.InvalidFields as e:
+        return jsonify({'error': str(e)}), 400
+    
+    rows = api.export_rows(resource, fields, api_v1_filters(resource))
+    return Response(stream_with_context(rows), mimetype='application/json')
@@ -0,0 +1,273 @@
+"""Async serving mode: an ASGI application around the Flask app.
+
+The chatbot and the read-only /api/v1 routes run natively on the event
+loop, with an AsyncSession (aiosqlite or asyncpg) in place of the request
+thread. A request waiting on the database or on a slow client then holds
+no thread. Every other request is passed to the Flask app through asgiref's
+WSGI adapter, which runs it in a thread as before.
+
+    pip install uvicorn asgiref aiosqlite     # plus asyncpg on PostgreSQL
+    uvicorn --factory asgi:create_asgi_app --port 5000
+
+Both servers share the database code: the chatbot answers are generators
+(see answers.py) and the API runs api.py's queries through run_sync().
+Long answers go out one piece at a time: POST /chatbot_stream answers as
+server-sent events, and /api/v1/<resource>/export streams its JSON array
+in batches. The session cookie is the Flask app's, so a login on either
+server counts on both, and so do the rate limits (see admission.py).
+Requests served here are not part of /metrics.
+"""
+import asyncio
+import json
+import re
+from urllib.parse import parse_qsl
+
+from itsdangerous import BadSignature
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_cookie
+
+import admission
+import answers
+import api
+import database
+from app import create_app
+from pagination import InvalidCursor
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+except ImportError:  # optional: only the async serving mode needs them
+    WsgiToAsgi = async_sessionmaker = None
+
+RESOURCE = r'(?P<resource>clubs|events|registrations)'
+SSE_HEADERS = [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'),
+               (b'x-accel-buffering', b'no')]
+JSON_HEADERS = [(b'content-type', b'application/json')]
+
+
+class Request:
+    """The parts of an ASGI HTTP request the async routes read"""
+
+    def __init__(self, scope, receive, user):
+        self.scope = scope
+        self.receive = receive
+        self.args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1')))
+        self.user = user  # the Flask session's contents
+
+    async def json(self):
+        """The request body parsed as JSON, or None"""
+        body = b''
+        while True:
+            message = await self.receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        try:
+            return json.loads(body or b'null')
+        except ValueError:
+            return None
+
+    @property
+    def student_id(self):
+        return self.user.get('student_id') if self.user.get('user_type') == 'student' else None
+
+    @property
+    def identity(self):
+        """Who the rate limits count this request against, as in admission.py"""
+        if self.student_id is not None:
+            return f'student:{self.student_id}'
+        return f"ip:{self.scope['client'][0] if self.scope.get('client') else None}"
+
+
+async def respond(send, status, body, headers=JSON_HEADERS):
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body.encode()})
+
+
+async def respond_json(send, status, obj):
+    await respond(send, status, json.dumps(obj))
+
+
+async def refuse(send, status, seconds):
+    """A 429 or 503 from admission control, with Retry-After"""
+    await respond(send, status, json.dumps({'error': admission.MESSAGES[status]}),
+                  JSON_HEADERS + [(b'retry-after', admission.retry_after(seconds).encode())])
+
+
+async def respond_stream(send, chunks, headers):
+    """Send each chunk of an async iterable as soon as it is produced"""
+    await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+    async for chunk in chunks:
+        await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+class AsyncApp:
+    """ASGI application: the routes below on the event loop, anything else through Flask"""
+
+    def __init__(self, flask_app):
+        if WsgiToAsgi is None:
+            raise RuntimeError('The async serving mode needs asgiref and SQLAlchemy\'s asyncio extra: '
+                               'pip install uvicorn asgiref aiosqlite')
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.engine = database.create_async_engine(flask_app)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.cookie_name = flask_app.config['SESSION_COOKIE_NAME']
+        self.serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+        self.session_max_age = int(flask_app.permanent_session_lifetime.total_seconds())
+        # The Flask app's rate limit buckets, with concurrency caps that wait on the event loop
+        self.admission = admission.Admission(flask_app.config, backend=flask_app.extensions['admission'].backend,
+                                             gate_class=admission.AsyncGate)
+        # (method, path, handler, the Flask endpoint it stands in for)
+        self.routes = [
+            ('POST', re.compile('/chatbot_process'), self.chatbot_process, 'chatbot.chatbot_process'),
+            ('POST', re.compile('/chatbot_stream'), self.chatbot_stream, 'chatbot.chatbot_stream'),
+            ('GET', re.compile(f'/api/v1/{RESOURCE}'), self.api_v1_list, 'api.api_v1_list'),
+            ('GET', re.compile(f'/api/v1/{RESOURCE}/(?P<row_id>[0-9]+)'), self.api_v1_detail, 'api.api_v1_detail'),
+            ('GET', re.compile(f'/api/v1/{RESOURCE}/export'), self.api_v1_export, 'api.api_v1_export'),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http':
+            for method, pattern, route, endpoint in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match and scope['method'] == method:
+                    request = Request(scope, receive, self.user(scope))
+                    return await self.admit(request, send, endpoint, route, match.groupdict())
+        await self.wsgi(scope, receive, send)
+
+    async def admit(self, request, send, endpoint, route, params):
+        """Run route under the Flask app's rate limits and concurrency caps (see admission.py)"""
+        if not self.admission.enabled:
+            return await route(request, send, **params)
+        method = request.scope['method']
+        # A shared backend is a network round trip: keep it off the event loop
+        if self.admission.backend.remote:
+            wait = await asyncio.to_thread(self.admission.rate_limited, method, endpoint, request.identity)
+        else:
+            wait = self.admission.rate_limited(method, endpoint, request.identity)
+        if wait:
+            return await refuse(send, 429, wait)
+        gate = self.admission.gate(method, endpoint)
+        if gate is None:
+            return await route(request, send, **params)
+        if not await gate.acquire(self.admission.queue_timeout):
+            return await refuse(send, 503, self.admission.retry_after)
+        try:
+            return await route(request, send, **params)
+        finally:
+            await gate.release()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def user(self, scope):
+        """The contents of the Flask session cookie, or {} without a valid one"""
+        cookies = [value.decode('latin-1') for name, value in scope['headers'] if name == b'cookie']
+        cookie = parse_cookie('; '.join(cookies)).get(self.cookie_name)
+        if not cookie:
+            return {}
+        try:
+            return self.serializer.loads(cookie, max_age=self.session_max_age)
+        except BadSignature:
+            return {}
+
+    async def chatbot_process(self, request, send):
+        data = await request.json()
+        try:
+            if data is None:
+                raise ValueError('expected a JSON body')
+            async with self.sessions() as session:
+                pieces = [piece async for piece in
+                          answers.stream(answers.answer(data.get('message', ''), request.student_id), session)]
+            response = ''.join(pieces)
+        except Exception:
+            response = answers.ERROR_MESSAGE
+        await respond_json(send, 200, {'response': response})
+
+    async def chatbot_stream(self, request, send):
+        """The answer as server-sent events: one "data" event per piece, then "done" (or "error")"""
+        data = await request.json() or {}
+
+        async def events():
+            async with self.sessions() as session:
+                try:
+                    async for piece in answers.stream(answers.answer(data.get('message', ''), request.student_id),
+                                                      session):
+                        yield answers.sse(piece)
+                except Exception:
+                    yield answers.sse(answers.ERROR_MESSAGE, event='error')
+                    return
+            yield answers.sse('', event='done')
+
+        await respond_stream(send, events(), SSE_HEADERS)
+
+    async def _fields(self, request, send, resource):
+        """The requested fields, or None after answering 401/400"""
+        if not request.user.get('user_type'):
+            await respond_json(send, 401, {'error': 'Login required'})
+            return None
+        try:
+            return api.parse_fields(resource, request.args.get('fields'))
+        except api.InvalidFields as e:
+            await respond_json(send, 400, {'error': str(e)})
+            return None
+
+    async def api_v1_list(self, request, send, resource):
+        fields = await self._fields(request, send, resource)
+        if fields is None:
+            return
+        filters = api.request_filters(resource, request.args, request.user)
+        try:
+            async with self.sessions() as session:
+                page = await session.run_sync(lambda sync_session: api.list_rows(
+                    resource, fields, filters, request.args.get('cursor'), request.args.get('limit'),
+                    session=sync_session))
+        except InvalidCursor as e:
+            return await respond_json(send, 400, {'error': str(e)})
+        await respond(send, 200, api.encode({'items': page.items, 'next_cursor': page.next_cursor}))
+
+    async def api_v1_detail(self, request, send, resource, row_id):
+        fields = await self._fields(request, send, resource)
+        if fields is None:
+            return
+        filters = api.request_filters(resource, request.args, request.user)
+        async with self.sessions() as session:
+            item = await session.run_sync(lambda sync_session: api.get_row(
+                resource, int(row_id), fields, filters, session=sync_session))
+        if item is None:
+            return await respond_json(send, 404, {'error': 'Not found'})
+        await respond(send, 200, api.encode(item))
+
+    async def api_v1_export(self, request, send, resource):
+        fields = await self._fields(request, send, resource)
+        if fields is None:
+            return
+        filters = api.request_filters(resource, request.args, request.user)
+
+        async def chunks():
+            async with self.sessions() as session:
+                result = await session.stream(api.export_query(resource, fields, filters))
+                yield '['
+                first = True
+                async for batch in result.partitions():
+                    yield api.export_chunk(fields, batch, first)
+                    first = False
+                yield ']'
+
+        await respond_stream(send, chunks(), JSON_HEADERS)
+
+
+def create_asgi_app(config=None):
+    """The ASGI application for create_app(config); uvicorn calls it with --factory"""
+    return AsyncApp(create_app(config))
@@ -0,0 +1,179 @@
+"""Load test a registration rush with and without admission control (admission.py).
+
+Seeds a temporary SQLite file with datagen, then runs the threaded Flask
+server in a subprocess twice, with ADMISSION_ENABLED off and on. At each
+--clients level every client is a different logged-in student looping
+without pause over what a rush sends:
+
+    50%  POST /register_event/<id> for one of the 20 most popular events
+    30%  POST /chatbot_process
+    20%  POST /student_login (a password hash each)
+
+and reports, per level, the offered load and the goodput (successful
+responses within --slo seconds, per second) with the latency of the
+successes and how many requests were refused (429/503) or failed
+(timeouts, connection errors, 500s). Without admission control goodput
+falls once the server saturates, as every request queues behind the
+others; with it the excess is refused at once and goodput stays flat.
+
+Rate limits are off in both runs unless --rate-limits is given: each
+client sends far more than a student would, so they would refuse most of
+the load before the concurrency caps see it. The per-IP login limit stays
+off even then, as every client logs in from the same address; the
+per-account one applies.
+
+    python benchmarks/bench_admission.py [--registrations N] [--clients 4,16,64,128] [--duration S]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import datagen  # noqa: E402
+from bench_async import fetch, free_port, login, percentile  # noqa: E402
+from bench_intents import CORPUS  # noqa: E402
+
+SERVER = ('import json, logging, sys\n'
+          'from werkzeug.serving import make_server\n'
+          'from app import create_app\n'
+          "logging.getLogger('werkzeug').setLevel(logging.WARNING)\n"
+          "app = create_app(json.loads(sys.argv[2]))\n"
+          "make_server('127.0.0.1', int(sys.argv[1]), app, threaded=True).serve_forever()\n")
+POPULAR_EVENTS = 20
+
+
+async def rush_request(port, student, rng, timeout):
+    """One request of the mix as this student; returns its status, or None if it failed outright"""
+    reg_no, cookie = student
+    roll = rng.random()
+    headers = {'Cookie': cookie}
+    if roll < 0.5:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        request = fetch(port, 'POST', f'/register_event/{rng.randint(1, POPULAR_EVENTS)}', b'', headers)
+    elif roll < 0.8:
+        headers['Content-Type'] = 'application/json'
+        body = json.dumps({'message': rng.choice(CORPUS)}).encode()
+        request = fetch(port, 'POST', '/chatbot_process', body, headers)
+    else:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        body = urlencode({'reg_no': reg_no, 'password': datagen.PASSWORD}).encode()
+        request = fetch(port, 'POST', '/student_login', body, headers)
+    try:
+        status, _ = await asyncio.wait_for(request, timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    return status
+
+
+async def rush(port, students, duration, slo, seed):
+    """Every student looping over the mix for duration seconds"""
+    good, outcomes = [], {'refused': 0, 'failed': 0, 'slow': 0}
+    deadline = time.perf_counter() + duration
+
+    async def client(student, rng):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = await rush_request(port, student, rng, timeout=max(slo * 10, 30))
+            elapsed = time.perf_counter() - start
+            if status in (200, 302):
+                if elapsed <= slo:
+                    good.append(elapsed)
+                else:
+                    outcomes['slow'] += 1
+            elif status in (429, 503):
+                outcomes['refused'] += 1
+            else:
+                outcomes['failed'] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(student, random.Random(seed + n)) for n, student in enumerate(students)))
+    seconds = time.perf_counter() - start
+    sent = len(good) + sum(outcomes.values())
+    return sent / seconds, len(good) / seconds, sorted(good), outcomes
+
+
+def start_server(env, config):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, '-c', SERVER, str(port), json.dumps(config)], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server, port
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('the server did not start')
+
+
+async def bench(port, reg_nos, args):
+    # Logged in one at a time, before the rush, so every client starts with a session
+    students = [(reg_no, await login(port, reg_no)) for reg_no in reg_nos]
+    await rush(port, students[:4], 2, args.slo, args.seed)  # warm the caches and the pool
+    print(f"  {'clients':>7} {'offered/s':>10} {'goodput/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'refused':>8} {'slow':>6} {'failed':>7}")
+    for clients in args.clients:
+        offered, goodput, latencies, outcomes = await rush(port, students[:clients], args.duration, args.slo,
+                                                           args.seed)
+        print(f'  {clients:>7} {offered:>10.1f} {goodput:>10.1f} {percentile(latencies, 0.5):>8.1f} '
+              f"{percentile(latencies, 0.99):>8.1f} {outcomes['refused']:>8} {outcomes['slow']:>6} "
+              f"{outcomes['failed']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--registrations', type=int, default=20000)
+    parser.add_argument('--clients', default='4,16,64,128', help='comma-separated concurrent students')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per level')
+    parser.add_argument('--slo', type=float, default=2.0, help='slowest response that still counts as goodput')
+    parser.add_argument('--rate-limits', action='store_true', help='keep the per-student rate limits on')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    args.clients = [int(n) for n in args.clients.split(',')]
+
+    tmp = tempfile.TemporaryDirectory()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp.name, 'bench.db')}", JOB_WORKER_THREADS='0')
+    os.environ.update(env)
+    import admission
+    from app import create_app
+    from migrations import upgrade
+    from models import Student
+
+    with create_app().app_context():
+        upgrade()
+        counts = datagen.generate(args.registrations, seed=args.seed)
+        reg_nos = [reg_no for (reg_no,) in Student.query.with_entities(Student.reg_no)
+                   .order_by(Student.id.desc()).limit(max(args.clients))]
+    print(', '.join(f'{count} {name}' for name, count in counts.items()),
+          f'- goodput counts successes within {args.slo:g}s')
+
+    for enabled in (False, True):
+        # Every client logs in from 127.0.0.1, so the per-IP login limit would refuse nearly all of them
+        config = {'ADMISSION_ENABLED': enabled, 'RATE_LIMITS': {
+            key: limit for key, limit in admission.DEFAULTS['RATE_LIMITS'].items()
+            if args.rate_limits and not key.endswith('student_login')},
+            'ACCOUNT_RATE_LIMITS': admission.DEFAULTS['ACCOUNT_RATE_LIMITS'] if args.rate_limits else {}}
+        print(f"\nadmission control {'on' if enabled else 'off'}")
+        server, port = start_server(env, config)
+        try:
+            asyncio.run(bench(port, reg_nos, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
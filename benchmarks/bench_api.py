@@ -0,0 +1,138 @@
+"""Benchmark: rows/sec served by the HTML dashboards, /api/events and /api/v1.
+
+Seeds a fresh SQLite file with --events events and --registrations
+registrations, logs in as admin through the test client and reads the
+same events and registrations through each route for --seconds:
+
+    html admin       /admin_dashboard (a page of events and of registrations)
+    html student     /student_dashboard with the fragment cache cleared each time
+    api events       /api/events, ORM rows walked page by page
+    v1 events        /api/v1/events, projected rows walked page by page
+    v1 events (3)    the same with ?fields=id,event_name,credits
+    v1 export        /api/v1/events/export and /api/v1/registrations/export
+
+    python benchmarks/bench_api.py [--events N] [--registrations N] [--seconds N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TMP.name, 'bench.db')}"
+
+import counters  # noqa: E402
+import fragments  # noqa: E402
+from app import create_app  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from models import db, Club, Student, Event, Registration  # noqa: E402
+
+app = create_app()
+
+CLUBS = 20
+STUDENTS = 2000
+
+
+def seed(events, registrations):
+    with app.app_context():
+        upgrade()
+        db.session.execute(db.insert(Club), [
+            {'club_name': f'Club {i}', 'password': 'x'} for i in range(CLUBS)])
+        db.session.execute(db.insert(Student), [
+            {'name': f'Student {i}', 'reg_no': f'B{i:06d}', 'email': f's{i}@bench.test', 'password': 'x'}
+            for i in range(STUDENTS)])
+        db.session.execute(db.insert(Event), [
+            {'club_id': 1 + i % CLUBS, 'event_name': f'Event {i}', 'description': 'Benchmark event ' * 8,
+             'credits': 1 + i % 5}
+            for i in range(events)])
+        pairs = ((1 + i % STUDENTS, 1 + i // STUDENTS % events) for i in range(registrations))
+        db.session.execute(db.insert(Registration), [
+            {'student_id': student_id, 'event_id': event_id, 'status': ('Pending', 'Accepted', 'Rejected')[i % 3]}
+            for i, (student_id, event_id) in enumerate(pairs)])
+        counters.recount(db.session.connection())
+        db.session.commit()
+
+
+def login(client, user_type):
+    with client.session_transaction() as session:
+        session.clear()
+        session['user_type'] = user_type
+        if user_type == 'admin':
+            session['admin_id'] = 1
+        else:
+            session['student_id'] = 1
+
+
+def page_walker(url):
+    """Fetch url page by page; returns the rows read"""
+    def run(client):
+        rows = 0
+        cursor = None
+        while True:
+            response = client.get(url + (f'&cursor={cursor}' if cursor else ''))
+            body = response.get_json()
+            rows += len(body['items'])
+            cursor = body['next_cursor']
+            if not cursor:
+                return rows
+    return run
+
+
+def html_admin(client):
+    response = client.get('/admin_dashboard')
+    assert response.status_code == 200
+    return 40  # one page of events and one of registrations
+
+
+def html_student(client):
+    fragments.fragment_cache.clear()
+    response = client.get('/student_dashboard')
+    assert response.status_code == 200
+    return 20
+
+
+def export(url):
+    def run(client):
+        response = client.get(url)
+        return len(response.get_json())
+    return run
+
+
+SCENARIOS = (
+    ('html admin', 'admin', html_admin),
+    ('html student', 'student', html_student),
+    ('api events', 'admin', page_walker('/api/events?limit=100')),
+    ('v1 events', 'admin', page_walker('/api/v1/events?limit=100')),
+    ('v1 events (3)', 'admin', page_walker('/api/v1/events?limit=100&fields=id,event_name,credits')),
+    ('v1 export events', 'admin', export('/api/v1/events/export')),
+    ('v1 export regs', 'admin', export('/api/v1/registrations/export')),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=5000)
+    parser.add_argument('--registrations', type=int, default=50000)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    seed(args.events, args.registrations)
+    print(f'{args.events} events, {args.registrations} registrations, {args.seconds:g}s per route\n')
+    print(f"{'route':<18}{'runs':>9}{'rows':>10}{'rows/s':>10}")
+    client = app.test_client()
+    for label, user_type, run in SCENARIOS:
+        login(client, user_type)
+        runs = rows = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < args.seconds:
+            rows += run(client)
+            runs += 1
+        elapsed = time.perf_counter() - start
+        print(f'{label:<18}{runs:>9}{rows:>10}{rows / elapsed:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
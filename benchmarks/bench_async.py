@@ -0,0 +1,249 @@
+"""Benchmark the async serving mode (asgi.py) against the threaded Flask server.
+
+Seeds a temporary SQLite file with datagen, then starts each server in a
+subprocess on the same database:
+
+    threaded  werkzeug's threaded WSGI server (one thread per connection),
+              as loadtest.py --server runs it
+    async     uvicorn --factory asgi:create_asgi_app (one event loop)
+
+and measures, over HTTP from an asyncio client:
+
+  * throughput and p50/p99 latency of a logged-in student's mix of
+    /chatbot_process and /api/v1/events at each --concurrency level;
+  * open-connection capacity: --idle connections are opened and held
+    (as slow or idle clients would), and a probe client keeps timing the
+    same mix meanwhile; reports how many stayed open, the probe's p99,
+    and the server's threads and resident memory;
+  * time to first byte against total time of a long streamed answer
+    (POST /chatbot_stream for every event).
+
+The client shares the machine with the server, so absolute numbers are low
+on small machines; compare the two servers against each other.
+
+    python benchmarks/bench_async.py [--registrations N] [--concurrency 1,10,50,200] [--idle 200,1000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import datagen  # noqa: E402
+from bench_intents import CORPUS  # noqa: E402
+
+SERVERS = {
+    'threaded': [sys.executable, '-c',
+                 'import logging, sys\n'
+                 'from werkzeug.serving import make_server\n'
+                 'from app import create_app\n'
+                 "logging.getLogger('werkzeug').setLevel(logging.WARNING)\n"
+                 "make_server('127.0.0.1', int(sys.argv[1]), create_app(), threaded=True).serve_forever()\n"],
+    'async': [sys.executable, '-m', 'uvicorn', '--factory', 'asgi:create_asgi_app', '--log-level', 'warning',
+              '--timeout-keep-alive', '600', '--backlog', '2048', '--port'],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def fetch(port, method, path, body=None, headers=None, first_byte=None):
+    """One request on a fresh connection; returns (status, raw response)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        head = [f'{method} {path} HTTP/1.1', 'Host: 127.0.0.1', 'Connection: close']
+        head += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        if body is not None:
+            head.append(f'Content-Length: {len(body)}')
+        writer.write('\r\n'.join(head).encode() + b'\r\n\r\n' + (body or b''))
+        chunks = []
+        while True:
+            chunk = await reader.read(65536)
+            if not chunk:
+                break
+            if first_byte is not None and not first_byte and b'data:' in b''.join(chunks + [chunk]):
+                first_byte.append(time.perf_counter())
+            chunks.append(chunk)
+        response = b''.join(chunks)
+        return int(response.split(b' ', 2)[1]), response
+    finally:
+        writer.close()
+
+
+async def login(port, reg_no):
+    """The Set-Cookie value of a student login"""
+    status, response = await fetch(port, 'POST', '/student_login',
+                                   urlencode({'reg_no': reg_no, 'password': datagen.PASSWORD}).encode(),
+                                   {'Content-Type': 'application/x-www-form-urlencoded'})
+    for line in response.split(b'\r\n\r\n', 1)[0].split(b'\r\n'):
+        if line.lower().startswith(b'set-cookie: session='):
+            return line.split(b': ', 1)[1].split(b';', 1)[0].decode()
+    raise RuntimeError(f'login failed with {status}')
+
+
+async def mixed_request(port, cookie, rng):
+    """A chatbot message or a page of events, as a logged-in student; returns True on a 200"""
+    headers = {'Cookie': cookie}
+    try:
+        if rng.random() < 0.5:
+            headers['Content-Type'] = 'application/json'
+            body = ('{"message": "%s"}' % rng.choice(CORPUS).replace('"', '')).encode()
+            status, _ = await fetch(port, 'POST', '/chatbot_process', body, headers)
+        else:
+            status, _ = await fetch(port, 'GET', '/api/v1/events?limit=20', headers=headers)
+    except OSError:
+        return False
+    return status == 200
+
+
+async def load(port, cookie, clients, duration, seed):
+    """clients looping over the mix for duration seconds; returns (latencies, errors, seconds)"""
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+
+    async def client(rng):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            ok = await mixed_request(port, cookie, rng)
+            (latencies if ok else errors).append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(random.Random(seed + n)) for n in range(clients)))
+    return sorted(latencies), len(errors), time.perf_counter() - start
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000 if ordered else float('nan')
+
+
+def process_status(pid):
+    """(threads, resident MB) of a process, from /proc (Linux only)"""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            fields = dict(line.split(':', 1) for line in status)
+    except OSError:
+        return None, None
+    return int(fields['Threads']), int(fields['VmRSS'].split()[0]) / 1024
+
+
+async def idle_capacity(port, pid, cookie, idle, duration, seed):
+    """Hold idle connections open while a probe client times the mix"""
+    held = []
+    for _ in range(idle):
+        try:
+            held.append(await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), 5))
+        except (OSError, asyncio.TimeoutError):
+            break
+        # A request line with no end of headers: the server has to keep waiting for the rest
+        held[-1][1].write(b'GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n')
+    await asyncio.sleep(1)
+    threads, rss = process_status(pid)
+    latencies, errors, _ = await load(port, cookie, 4, duration, seed)
+    still_open = 0
+    for reader, writer in held:
+        if not reader.at_eof():
+            still_open += 1
+        writer.close()
+    return still_open, latencies, errors, threads, rss
+
+
+async def streamed(port, cookie):
+    """(time to first event, total time, bytes) of the long 'all events' answer as server-sent events"""
+    first = []
+    start = time.perf_counter()
+    status, response = await fetch(port, 'POST', '/chatbot_stream', b'{"message": "show me all events"}',
+                                   {'Cookie': cookie, 'Content-Type': 'application/json'}, first_byte=first)
+    total = time.perf_counter() - start
+    if status != 200 or not first:
+        raise RuntimeError(f'/chatbot_stream answered {status}')
+    return first[0] - start, total, len(response)
+
+
+async def bench(name, port, pid, args, reg_no):
+    cookie = await login(port, reg_no)
+    print(f'\n{name} server')
+    for _ in range(2):
+        await load(port, cookie, 4, 1, args.seed)  # warm the caches and the pool
+    print(f"  {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for clients in args.concurrency:
+        latencies, errors, seconds = await load(port, cookie, clients, args.duration, args.seed)
+        print(f'  {clients:>7} {len(latencies) / seconds:>8.1f} {percentile(latencies, 0.5):>8.1f} '
+              f'{percentile(latencies, 0.99):>8.1f} {errors:>7}')
+    print(f"  {'idle':>7} {'open':>7} {'probe p99 ms':>13} {'errors':>7} {'threads':>8} {'RSS MB':>7}")
+    for idle in args.idle:
+        still_open, latencies, errors, threads, rss = await idle_capacity(
+            port, pid, cookie, idle, args.duration, args.seed)
+        print(f'  {idle:>7} {still_open:>7} {percentile(latencies, 0.99):>13.1f} {errors:>7} '
+              f"{threads if threads is not None else '-':>8} {f'{rss:.0f}' if rss is not None else '-':>7}")
+        await asyncio.sleep(1)
+    first, total, size = await streamed(port, cookie)
+    print(f'  streamed answer: {size / 1024:.0f} KiB, first event after {first * 1000:.1f} ms, '
+          f'complete after {total * 1000:.1f} ms')
+
+
+def start_server(name, env):
+    port = free_port()
+    server = subprocess.Popen(SERVERS[name] + [str(port)], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server, port
+        except OSError:
+            if server.poll() is not None:
+                break
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'the {name} server did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--registrations', type=int, default=20000)
+    parser.add_argument('--concurrency', default='1,10,50,200', help='comma-separated client counts')
+    parser.add_argument('--idle', default='200,1000', help='comma-separated idle connection counts')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per measurement')
+    parser.add_argument('--servers', default='threaded,async')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    args.concurrency = [int(n) for n in args.concurrency.split(',')]
+    args.idle = [int(n) for n in args.idle.split(',')]
+
+    tmp = tempfile.TemporaryDirectory()
+    # Without admission control: one student sends every request here, far past any rate limit
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp.name, 'bench.db')}", JOB_WORKER_THREADS='0',
+               ADMISSION_ENABLED='0')
+    os.environ.update(env)
+    from app import create_app
+    from migrations import upgrade
+    from models import Student
+
+    with create_app().app_context():
+        upgrade()
+        counts = datagen.generate(args.registrations, seed=args.seed)
+        reg_no = Student.query.order_by(Student.id).first().reg_no
+    print(', '.join(f'{count} {name}' for name, count in counts.items()))
+
+    for name in args.servers.split(','):
+        server, port = start_server(name, env)
+        try:
+            asyncio.run(bench(name, port, server.pid, args, reg_no))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
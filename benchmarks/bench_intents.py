@@ -0,0 +1,102 @@
+"""Micro-benchmark: compiled intent classifier vs the old keyword cascade.
+
+Both classifiers are timed on the same corpus of realistic chatbot messages
+without touching the database, and the script reports messages/sec for each
+plus any messages where the two disagree.
+
+    python benchmarks/bench_intents.py [--rounds N]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import intents  # noqa: E402
+
+CLUB_NAMES = ('Club A', 'Club B', 'Club C', 'Club D', 'Club E')
+
+CORPUS = [
+    'What clubs are available?',
+    'show me all clubs',
+    'list clubs',
+    'Show me all events',
+    'what events are available this week',
+    'list all events please',
+    'show 5 credit events',
+    'Are there any events with 3 credits?',
+    'what events give 2 credits',
+    'show events by club a',
+    'what events does Club C have',
+    'events from club e',
+    'How do I register for an event?',
+    'how to sign up',
+    'what is the registration process',
+    'can you recommend something good',
+    'suggest the best events for 4 credits',
+    'recommend events',
+    'hi there',
+    'thanks!',
+    'who organizes the tech workshop',
+    'when does the cultural festival start',
+    'I want to join a club',
+    'is registration open for 5 credit events',
+]
+
+
+def legacy_classify(message):
+    """The keyword cascade process_chatbot_query used before intents.py"""
+    message = re.sub(r'[^\w\s\?\!\.\,\-]', '', message.lower())
+    if any(keyword in message for keyword in ['club', 'clubs', 'available', 'list']):
+        if any(keyword in message for keyword in ['what', 'show', 'list', 'available']):
+            return intents.CLUBS
+    if any(keyword in message for keyword in ['event', 'events', 'show', 'what']):
+        if re.search(r'(\d+)\s*credit', message):
+            return intents.EVENTS_BY_CREDITS
+        if re.search(r'club\s+([a-e])', message, re.IGNORECASE):
+            return intents.EVENTS_BY_CLUB
+        if any(keyword in message for keyword in ['what', 'show', 'list', 'available', 'all']):
+            return intents.ALL_EVENTS
+    if any(keyword in message for keyword in ['register', 'registration', 'sign up', 'how to', 'process']):
+        return intents.REGISTRATION_HELP
+    if any(keyword in message for keyword in ['recommend', 'best', 'suggest', 'good']):
+        re.search(r'(\d+)\s*credit', message)
+        return intents.RECOMMENDATIONS
+    return intents.FALLBACK
+
+
+def compiled_classify(message):
+    return intents.classify(message, CLUB_NAMES).name
+
+
+def measure(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in CORPUS:
+            func(message)
+    elapsed = time.perf_counter() - start
+    return rounds * len(CORPUS) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    legacy = measure(legacy_classify, args.rounds)
+    compiled = measure(compiled_classify, args.rounds)
+    print(f'legacy cascade : {legacy:12,.0f} messages/sec')
+    print(f'compiled engine: {compiled:12,.0f} messages/sec ({compiled / legacy:.2f}x)')
+
+    changed = [(m, legacy_classify(m), compiled_classify(m)) for m in CORPUS
+               if legacy_classify(m) != compiled_classify(m)]
+    if changed:
+        print('\nMessages classified differently:')
+        for message, old, new in changed:
+            print(f'  {message!r}: {old} -> {new}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Benchmark: request latency with slow work moved to the job queue, and worker throughput.
+
+Seeds a fresh SQLite file with one large club (--events events holding
+--registrations registrations) and reports:
+
+  * how long the /delete_club request takes now that it only enqueues,
+    against how long the cascade itself takes on a worker;
+  * notification fan-out throughput with --threads worker threads: one
+    notify_status job per --batch Accepted registrations, each fanning out
+    to a send_notification job per student. Every student must be
+    notified exactly once.
+
+    python benchmarks/bench_jobs.py [--events N] [--registrations N] [--threads N]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TMP.name, 'bench.db')}"
+
+import counters  # noqa: E402
+import jobs  # noqa: E402
+from app import create_app  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from models import db, Club, Student, Event, Registration, Job  # noqa: E402
+
+app = create_app()
+
+
+class CountingHandler(logging.Handler):
+    """Counts the notification emails tasks.send_email logs without a mail server"""
+
+    def __init__(self):
+        super().__init__()
+        self.recipients = []
+
+    def emit(self, record):
+        # Handler.handle() already holds the handler's lock
+        self.recipients.append(record.args[0])
+
+
+def seed(events, registrations):
+    students = -(-registrations // events)
+    with app.app_context():
+        upgrade()
+        db.session.execute(db.insert(Club), [
+            {'club_name': 'Large Club', 'password': 'x'}, {'club_name': 'Small Club', 'password': 'x'}])
+        db.session.execute(db.insert(Student), [
+            {'name': f'Student {i}', 'reg_no': f'B{i:07d}', 'email': f's{i}@bench.test', 'password': 'x'}
+            for i in range(students)])
+        db.session.execute(db.insert(Event), [
+            {'club_id': 1 + (i == 0), 'event_name': f'Event {i}', 'description': 'bench', 'credits': 2}
+            for i in range(events + 1)])
+        # Event 1 belongs to the small club and gets the fan-out registrations
+        db.session.execute(db.insert(Registration), [
+            {'student_id': 1 + i % students, 'event_id': 2 + i // students, 'status': 'Accepted'}
+            for i in range(registrations)])
+        db.session.execute(db.insert(Registration), [
+            {'student_id': 1 + i, 'event_id': 1, 'status': 'Accepted'} for i in range(students)])
+        counters.recount(db.session.connection())
+        db.session.commit()
+    return students
+
+
+def wait_for_queue(poll=0.05):
+    while True:
+        with app.app_context():
+            if not Job.query.filter(Job.status.in_((jobs.QUEUED, jobs.RUNNING))).count():
+                return
+        time.sleep(poll)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--registrations', type=int, default=100000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+
+    app.config['JOB_POLL_INTERVAL'] = 0.01
+    students = seed(args.events, args.registrations)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_type'] = 'admin'
+        session['admin_id'] = 1
+
+    start = time.perf_counter()
+    response = client.get('/delete_club/1')
+    request_time = time.perf_counter() - start
+    assert response.status_code == 302
+    start = time.perf_counter()
+    jobs.Worker(app).drain()
+    cascade_time = time.perf_counter() - start
+    print(f'delete_club with {args.registrations} registrations: request {request_time * 1000:.1f} ms, '
+          f'cascade on the worker {cascade_time * 1000:.0f} ms')
+
+    mail = CountingHandler()
+    logger = logging.getLogger('tasks.mail')
+    logger.addHandler(mail)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    with app.app_context():
+        ids = [registration_id for (registration_id,) in
+               db.session.query(Registration.id).filter(Registration.event_id == 1).order_by(Registration.id)]
+        for offset in range(0, len(ids), args.batch):
+            jobs.enqueue('notify_status', {'registration_ids': ids[offset:offset + args.batch], 'status': 'Accepted'})
+        db.session.commit()
+
+    worker = jobs.Worker(app, threads=args.threads)
+    start = time.perf_counter()
+    worker.start()
+    wait_for_queue()
+    elapsed = time.perf_counter() - start
+    worker.stop()
+    with app.app_context():
+        ran = Job.query.filter(Job.kind == 'send_notification', Job.status == jobs.DONE).count()
+    print(f'fan-out to {students} students on {args.threads} thread(s): {ran} notification jobs, '
+          f'{ran / elapsed:.0f} jobs/s')
+    duplicates = len(mail.recipients) - len(set(mail.recipients))
+    if len(set(mail.recipients)) != students or duplicates:
+        print(f'MISMATCH: {len(set(mail.recipients))} students notified, {duplicates} duplicate(s)')
+        sys.exit(1)
+    print('Every student was notified exactly once.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Verify the incremental credit ledger against a full recompute on a large dataset.
+
+Seeds a fresh SQLite file with --students students and --registrations
+Pending registrations across clubs' events, then drives the real routes
+through the test client: --reviews single and bulk accept/reject decisions
+from the owning clubs, followed by deleting --delete-clubs clubs. Every
+step maintains Student.credits_earned incrementally; at the end
+ledger.verify() recomputes every total from the registrations and the
+script exits 1 if any student drifted. Also reports the cost of each
+incremental review against one full recompute.
+
+    python benchmarks/bench_ledger.py [--students N] [--registrations N] [--reviews N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TMP.name, 'bench.db')}"
+
+import counters  # noqa: E402
+import ledger  # noqa: E402
+from app import create_app  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from models import db, Club, Student, Event, Registration  # noqa: E402
+
+app = create_app()
+
+CLUBS = 20
+EVENTS = 1000
+
+
+def seed(students, registrations, rng):
+    with app.app_context():
+        upgrade()
+        db.session.execute(db.insert(Club), [
+            {'club_name': f'Club {i}', 'password': 'x'} for i in range(CLUBS)])
+        db.session.execute(db.insert(Student), [
+            {'name': f'Student {i}', 'reg_no': f'B{i:07d}', 'email': f's{i}@bench.test', 'password': 'x'}
+            for i in range(students)])
+        db.session.execute(db.insert(Event), [
+            {'club_id': 1 + i % CLUBS, 'event_name': f'Event {i}', 'description': 'bench', 'credits': 1 + i % 5}
+            for i in range(EVENTS)])
+        # Distinct (student, event) pairs spread over every event
+        db.session.execute(db.insert(Registration), [
+            {'student_id': 1 + pair // EVENTS, 'event_id': 1 + pair % EVENTS, 'status': 'Pending'}
+            for pair in rng.sample(range(students * EVENTS), registrations)])
+        counters.recount(db.session.connection())
+        db.session.commit()
+
+
+def login(client, user_type, **ids):
+    with client.session_transaction() as session:
+        session.clear()
+        session['user_type'] = user_type
+        session.update(ids)
+
+
+def review(client, rng):
+    """One decision from the owning club: a single registration or a bulk batch"""
+    with app.app_context():
+        event_id = rng.randint(1, EVENTS)
+        club_id = db.session.get(Event, event_id).club_id
+        ids = [registration_id for (registration_id,) in
+               db.session.query(Registration.id).filter(Registration.event_id == event_id).limit(50)]
+    if not ids:
+        return
+    login(client, 'club', club_id=club_id)
+    status = rng.choice(('Accepted', 'Rejected'))
+    if rng.random() < 0.5:
+        client.get(f'/update_registration/{rng.choice(ids)}/{status}')
+    else:
+        client.post('/bulk_update_registrations',
+                    json={'status': status, 'registration_ids': rng.sample(ids, min(len(ids), 20))})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--registrations', type=int, default=200000)
+    parser.add_argument('--reviews', type=int, default=2000)
+    parser.add_argument('--delete-clubs', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    if args.registrations > args.students * EVENTS:
+        parser.error(f'at most {args.students * EVENTS} registrations')
+
+    rng = random.Random(args.seed)
+    seed(args.students, args.registrations, rng)
+    client = app.test_client()
+
+    start = time.perf_counter()
+    for _ in range(args.reviews):
+        review(client, rng)
+    reviewing = time.perf_counter() - start
+    login(client, 'admin', admin_id=1)
+    for club_id in rng.sample(range(1, CLUBS + 1), args.delete_clubs):
+        client.get(f'/delete_club/{club_id}')
+
+    with app.app_context():
+        accepted = Registration.query.filter_by(status='Accepted').count()
+        start = time.perf_counter()
+        drift = ledger.verify(db.session.connection())
+        verifying = time.perf_counter() - start
+        start = time.perf_counter()
+        ledger.recompute(db.session.connection())
+        recomputing = time.perf_counter() - start
+        db.session.rollback()
+
+    print(f'{args.students} students, {args.registrations} registrations, {accepted} accepted after '
+          f'{args.reviews} reviews and {args.delete_clubs} club deletions')
+    print(f'review request (incremental): {reviewing / args.reviews * 1000:.2f} ms')
+    print(f'full recompute:               {recomputing * 1000:.0f} ms')
+    print(f'verify:                       {verifying * 1000:.0f} ms')
+    if drift:
+        print(f'DRIFT: {len(drift)} student total(s) differ, e.g. {drift[:5]}')
+        sys.exit(1)
+    print('All incremental totals match the recompute.')
+
+
+if __name__ == '__main__':
+    main()
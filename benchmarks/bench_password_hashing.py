@@ -0,0 +1,58 @@
+"""Benchmark: password verifications (logins) per second per core at each hash cost.
+
+A login is CPU-bound on one check_password_hash call, so single-core
+verification throughput is the ceiling on logins/sec per core. Use it to pick
+PASSWORD_HASH_METHOD for a deployment.
+
+    python benchmarks/bench_password_hashing.py [--seconds N] [--method METHOD ...]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash, check_password_hash  # noqa: E402
+
+from passwords import DEFAULT_METHOD, canonical_method  # noqa: E402
+
+METHODS = [
+    'pbkdf2:sha256:100000',
+    'pbkdf2:sha256:260000',
+    DEFAULT_METHOD,
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+]
+
+
+def logins_per_second(method, seconds):
+    """Verify one hash repeatedly for about `seconds`; return (verifications/sec, ms each)"""
+    stored_hash = generate_password_hash('correct horse battery staple', method=method)
+    count = 0
+    start = time.perf_counter()
+    while True:
+        check_password_hash(stored_hash, 'correct horse battery staple')
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds and count >= 3:
+            return count / elapsed, elapsed * 1000 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0, help='time spent per method')
+    parser.add_argument('--method', action='append', help='method to measure (repeatable)')
+    args = parser.parse_args()
+
+    methods = [canonical_method(method) for method in args.method or METHODS]
+    print(f'{os.cpu_count()} CPU(s); figures are for one core\n')
+    print(f"{'method':<26}{'ms/login':>10}{'logins/s/core':>15}")
+    for method in methods:
+        rate, ms = logins_per_second(method, args.seconds)
+        marker = '  (default)' if method == DEFAULT_METHOD else ''
+        print(f'{method:<26}{ms:>10.1f}{rate:>15.1f}{marker}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Benchmark the event recommendation index (recommend.py) on a large dataset.
+
+Seeds a fresh SQLite file with datagen (--students students, --events
+events, --registrations skewed registrations), then reports:
+
+  * a full rebuild, vectorized with NumPy/SciPy and in pure Python, and
+    exits 1 if the two disagree on any event's neighbours;
+  * 10 and then --new registrations made through seats.register(), each
+    followed by the incremental refresh of the events they touched, and
+    how closely the refreshed index matches a rebuild (the refresh is
+    approximate for the events that were not themselves refreshed);
+  * recommend.for_student() latency per call (median and p99) over
+    --lookups students, against the sub-millisecond target.
+
+    python benchmarks/bench_recommend.py [--students N] [--events N] [--registrations N]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP = tempfile.TemporaryDirectory()
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TMP.name, 'bench.db')}"
+
+import datagen  # noqa: E402
+import recommend  # noqa: E402
+import seats  # noqa: E402
+from app import create_app  # noqa: E402
+from migrations import upgrade  # noqa: E402
+from models import db, Event, EventNeighbour, Registration  # noqa: E402
+
+app = create_app()
+
+
+def snapshot():
+    """{event id: {neighbour id: score}} of the whole index"""
+    index = {}
+    for event_id, neighbour_id, score in db.session.execute(
+            db.select(EventNeighbour.event_id, EventNeighbour.neighbour_id, EventNeighbour.score)):
+        index.setdefault(event_id, {})[neighbour_id] = score
+    db.session.rollback()
+    return index
+
+
+def timed_rebuild(vectorized):
+    start = time.perf_counter()
+    with db.engine.begin() as conn:
+        recommend.rebuild(conn, vectorized=vectorized)
+    return time.perf_counter() - start
+
+
+def overlap(index, exact, event_ids):
+    """Mean share of each event's exact neighbours that the index also lists"""
+    shares = [len(index.get(event_id, {}).keys() & exact[event_id].keys()) / len(exact[event_id])
+              for event_id in event_ids if exact.get(event_id)]
+    return statistics.mean(shares) if shares else 1.0
+
+
+def register(count, students, events, rng):
+    """Register count random new (student, event) pairs as the route does; returns the seconds taken"""
+    made = 0
+    start = time.perf_counter()
+    while made < count:
+        student_id, event_id = rng.randint(1, students), rng.randint(1, events)
+        if db.session.query(Registration.id).filter_by(student_id=student_id, event_id=event_id).first():
+            continue
+        seats.register(student_id, event_id)
+        recommend.schedule_refresh()
+        db.session.commit()
+        made += 1
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=100000)
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--registrations', type=int, default=500000)
+    parser.add_argument('--new', type=int, default=1000, help='registrations made before the incremental refresh')
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        upgrade()
+        start = time.perf_counter()
+        counts = datagen.generate(args.registrations, seed=args.seed, students=args.students, events=args.events)
+        print(', '.join(f'{count} {name}' for name, count in counts.items()),
+              f'seeded in {time.perf_counter() - start:.0f}s')
+
+        failed = False
+        if recommend.sparse is not None:
+            vectorized = timed_rebuild(True)
+            index = snapshot()
+        else:
+            print('NumPy/SciPy not installed: skipping the vectorized rebuild')
+        python = timed_rebuild(False)
+        exact = snapshot()
+        pairs = sum(len(neighbours) for neighbours in exact.values())
+        print(f'\nFull rebuild ({len(exact)} events, {pairs} neighbour pairs, top {recommend.TOP_K}):')
+        if recommend.sparse is not None:
+            print(f'  vectorized (NumPy/SciPy): {vectorized:8.2f} s')
+        print(f'  pure Python:              {python:8.2f} s')
+        if recommend.sparse is not None and index != exact:
+            differ = [event_id for event_id in exact.keys() | index.keys() if index.get(event_id) != exact.get(event_id)]
+            print(f'  MISMATCH: {len(differ)} event(s) differ between the two rebuilds, e.g. {differ[:5]}')
+            failed = True
+
+        # New registrations, then a refresh: a quiet interval's worth, then --new
+        students, events = counts['students'], counts['events']
+        for new in (10, args.new):
+            registering = register(new, students, events, rng)
+            with db.engine.connect() as conn:
+                stale = [event_id for (event_id,) in conn.execute(
+                    db.select(Event.id).where(Event.registrations_total != Event.neighbours_total))]
+            start = time.perf_counter()
+            with db.engine.begin() as conn:
+                refreshed = recommend.refresh(conn)
+            refreshing = time.perf_counter() - start
+            incremental = snapshot()
+            timed_rebuild(None)
+            exact = snapshot()
+            print(f'\nIncremental refresh after {new} new registrations '
+                  f'({registering / new * 1000:.2f} ms each to register and schedule):')
+            print(f'  {refreshed} stale event(s) refreshed in {refreshing:.2f} s '
+                  f'({refreshing / max(refreshed, 1) * 1000:.1f} ms each)')
+            print(f'  neighbours matching a rebuild: refreshed events {overlap(incremental, exact, stale):.1%}, '
+                  f'all events {overlap(incremental, exact, exact.keys()):.1%}')
+
+        latencies = []
+        for student_id in rng.sample(range(1, students + 1), min(args.lookups, students)):
+            start = time.perf_counter()
+            recommend.for_student(student_id)
+            latencies.append(time.perf_counter() - start)
+            db.session.rollback()
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        print(f'\nfor_student over {len(latencies)} students: median {p50:.3f} ms, p99 {p99:.3f} ms '
+              f'({"within" if p50 < 1 else "OVER"} the 1 ms target)')
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
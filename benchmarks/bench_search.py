@@ -0,0 +1,96 @@
+"""Benchmark: FTS5 event search vs LIKE '%term%' at catalog scale.
+
+Seeds a throwaway SQLite database with --events synthetic events (100k by
+default), keeping the FTS index in sync through its triggers exactly as the
+app does, then times ranked FTS queries against the equivalent LIKE scans.
+
+    python benchmarks/bench_search.py [--events N] [--repeat N]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from models import db  # noqa: E402
+from search import create_search_index, search_events  # noqa: E402
+
+TOPICS = ['robotics', 'music', 'dance', 'drama', 'python', 'machine learning', 'photography',
+          'debate', 'chess', 'football', 'startup', 'design', 'poetry', 'astronomy', 'cooking']
+KINDS = ['workshop', 'festival', 'seminar', 'hackathon', 'meetup', 'competition', 'bootcamp']
+FILLER = ('students will learn practical skills hands on sessions guest speakers networking '
+          'certificates refreshments teamwork project showcase beginners welcome advanced track').split()
+
+QUERIES = ['robotics', 'machine learning workshop', 'poetry', 'astro', 'chess competition', 'beginners']
+
+
+def seed(engine, events, seed_value=42):
+    rng = random.Random(seed_value)
+    with engine.begin() as conn:
+        db.metadata.create_all(conn)
+        create_search_index(conn)
+        conn.execute(text("INSERT INTO clubs (club_name, password) VALUES (:n, 'x')"),
+                     [{'n': f'Club {i}'} for i in range(50)])
+        rows = []
+        for i in range(events):
+            topic, kind = rng.choice(TOPICS), rng.choice(KINDS)
+            rows.append({
+                'club_id': rng.randint(1, 50),
+                'event_name': f'{topic.title()} {kind.title()} {i}',
+                'description': f'A {kind} about {topic}. ' + ' '.join(rng.sample(FILLER, 8)),
+                'credits': rng.randint(1, 5),
+            })
+        conn.execute(text("""INSERT INTO events (club_id, event_name, description, credits, created_at)
+                             VALUES (:club_id, :event_name, :description, :credits, CURRENT_TIMESTAMP)"""),
+                     rows)
+
+
+def like_search(conn, query):
+    """Naive alternative: every matching row has to be read before it can be ranked"""
+    clauses, params = [], {}
+    for i, term in enumerate(query.split()):
+        clauses.append(f'(event_name LIKE :t{i} OR description LIKE :t{i})')
+        params[f't{i}'] = f'%{term}%'
+    sql = f"SELECT id, event_name, description FROM events WHERE {' AND '.join(clauses)}"
+    return conn.execute(text(sql), params).fetchall()
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        start = time.perf_counter()
+        seed(engine, args.events)
+        print(f'Seeded {args.events:,} events (with FTS triggers) in {time.perf_counter() - start:.1f}s\n')
+
+        print(f"{'query':<28}{'matches':>8}{'fts median':>13}{'fts max':>10}{'like median':>13}")
+        with engine.connect() as conn:
+            for query in QUERIES:
+                matches = len(like_search(conn, query))
+                fts_median, fts_max = timed(lambda: search_events(conn, query), args.repeat)
+                like_median, _ = timed(lambda: like_search(conn, query), max(3, args.repeat // 4))
+                print(f'{query:<28}{matches:>8}{fts_median:>11.2f}ms{fts_max:>8.2f}ms{like_median:>11.2f}ms')
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""Load test: concurrent registration against limited-capacity events.
+
+Phase 1 sends --students students (each submitting twice, as a double click
+would) at one event with --capacity seats from --threads threads, while
+clubs reject some seated registrations. Afterwards it checks that the
+event was never overbooked: seats_taken equals the Pending + Accepted
+registrations, never exceeds capacity, no student is registered twice and
+nobody is left waitlisted while a seat is free.
+
+Phase 2 compares throughput of registrations aimed at one hot event with
+the same number spread over many events. Allocation only contends on the
+event row, so spreading registrations should not be slower. On SQLite the
+database write lock serializes all writers anyway; pass --url to run
+against a server database where row locks let distinct events proceed in
+parallel.
+
+    python benchmarks/bench_seat_allocation.py [--students N] [--capacity N] [--threads N] [--url URL]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+from sqlalchemy.exc import IntegrityError  # noqa: E402
+
+import seats  # noqa: E402
+from models import db, Club, Student, Event, Registration  # noqa: E402
+
+
+def make_app(url):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if url.startswith('sqlite'):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 60}}
+    db.init_app(app)
+    return app
+
+
+def seed(app, students, events, capacity):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        club = Club(club_name='Bench Club', password='x')
+        db.session.add(club)
+        db.session.flush()
+        db.session.execute(db.insert(Student), [
+            {'name': f'Student {i}', 'reg_no': f'B{i:06d}', 'email': f's{i}@bench.test', 'password': 'x'}
+            for i in range(students)])
+        db.session.execute(db.insert(Event), [
+            {'club_id': club.id, 'event_name': f'Event {i}', 'description': 'bench', 'credits': 1,
+             'capacity': capacity, 'seats_taken': 0}
+            for i in range(events)])
+        db.session.commit()
+        student_ids = [i for (i,) in db.session.query(Student.id).order_by(Student.id)]
+        event_ids = [i for (i,) in db.session.query(Event.id).order_by(Event.id)]
+    return student_ids, event_ids
+
+
+def run_threads(app, threads, work, worker):
+    """Run worker(item) for every item of work from threads threads; returns elapsed seconds"""
+    lock = threading.Lock()
+    items = iter(work)
+    barrier = threading.Barrier(threads)
+    errors = []
+
+    def loop():
+        with app.app_context():
+            barrier.wait()
+            while True:
+                with lock:
+                    item = next(items, None)
+                if item is None:
+                    return
+                try:
+                    worker(item)
+                except Exception as e:  # reported after the run
+                    db.session.rollback()
+                    errors.append(repr(e))
+
+    pool = [threading.Thread(target=loop) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    if errors:
+        raise RuntimeError(f'{len(errors)} worker error(s), first: {errors[0]}')
+    return time.perf_counter() - start
+
+
+def register(item):
+    student_id, event_id = item
+    try:
+        seats.register(student_id, event_id)
+        db.session.commit()
+        return 'registered'
+    except IntegrityError:
+        db.session.rollback()
+        return 'duplicate'
+
+
+def reject_one(event_id):
+    """Reject a random seated registration of the event, as a club reviewer would"""
+    registration = (Registration.query
+                    .filter(Registration.event_id == event_id, Registration.status.in_(seats.HOLDS_SEAT))
+                    .order_by(func.random()).first())
+    if registration is not None:
+        seats.set_status(registration, 'Rejected')
+        db.session.commit()
+
+
+def check_invariants(app, event_id):
+    with app.app_context():
+        event = db.session.get(Event, event_id)
+        counts = dict(db.session.query(Registration.status, func.count())
+                      .filter(Registration.event_id == event_id)
+                      .group_by(Registration.status))
+        duplicates = (db.session.query(Registration.student_id)
+                      .filter(Registration.event_id == event_id)
+                      .group_by(Registration.student_id)
+                      .having(func.count() > 1).count())
+    held = counts.get('Pending', 0) + counts.get('Accepted', 0)
+    waitlisted = counts.get(seats.WAITLISTED, 0)
+    problems = []
+    if held != event.seats_taken:
+        problems.append(f'seats_taken={event.seats_taken} but {held} registrations hold seats')
+    if held > event.capacity:
+        problems.append(f'overbooked: {held} seated for {event.capacity} seats')
+    if waitlisted and held < event.capacity:
+        problems.append(f'{waitlisted} waitlisted while {event.capacity - held} seat(s) are free')
+    if duplicates:
+        problems.append(f'{duplicates} student(s) registered twice')
+    return counts, problems
+
+
+def phase_contention(app, args):
+    student_ids, (event_id,) = seed(app, args.students, 1, args.capacity)
+    rng = random.Random(7)
+    # Every student submits twice; one reviewer rejection per 10 registrations
+    work = [('register', (student_id, event_id)) for student_id in student_ids for _ in range(2)]
+    work += [('reject', event_id)] * (args.students // 10)
+    rng.shuffle(work)
+
+    def worker(item):
+        kind, payload = item
+        if kind == 'register':
+            register(payload)
+        else:
+            reject_one(payload)
+
+    elapsed = run_threads(app, args.threads, work, worker)
+    counts, problems = check_invariants(app, event_id)
+    print(f'Phase 1: {len(work)} operations on one event with {args.capacity} seats '
+          f'from {args.threads} threads in {elapsed:.2f}s')
+    print('  final statuses: ' + ', '.join(f'{status}={count}' for status, count in sorted(counts.items())))
+    for problem in problems:
+        print(f'  FAIL: {problem}')
+    if not problems:
+        print('  OK: never overbooked, counter matches, no duplicates, waitlist promoted into free seats')
+    return not problems
+
+
+def phase_throughput(app, args):
+    results = {}
+    for label, events in (('one hot event', 1), (f'{args.events} events', args.events)):
+        student_ids, event_ids = seed(app, args.students, events, args.capacity)
+        work = [(student_id, event_ids[i % len(event_ids)]) for i, student_id in enumerate(student_ids)]
+        elapsed = run_threads(app, args.threads, work, register)
+        results[label] = len(work) / elapsed
+    print(f'Phase 2: {args.students} registrations from {args.threads} threads')
+    for label, rate in results.items():
+        print(f'  {label:<16}{rate:>10.0f} registrations/s')
+    hot, spread = results.values()
+    ok = spread >= hot * 0.8
+    print('  OK: spreading load is not slower, so there is no global allocation lock' if ok else
+          '  FAIL: registrations for distinct events are slower than one hot event')
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=400)
+    parser.add_argument('--capacity', type=int, default=50)
+    parser.add_argument('--events', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--url', help='database URL (default: a throwaway SQLite file)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app = make_app(url)
+        ok = phase_contention(app, args)
+        ok = phase_throughput(app, args) and ok
+        with app.app_context():
+            db.engine.dispose()
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""Benchmark: mixed read/write load on SQLite, default engine vs database.py tuning.
+
+Runs the same workload twice against a fresh SQLite file: --threads threads
+issue dashboard-style reads (a page of events with their registration
+counts) and registration writes in a --write-ratio mix for --seconds each.
+"before" uses the default engine (rollback journal, default pool and
+timeout); "after" uses database.engine_options(), the WAL/pragma connect
+hook and retry_on_busy. Reports throughput, p50/p95 latency and how many
+operations failed with "database is locked".
+
+    python benchmarks/bench_sqlite_tuning.py [--threads N] [--seconds N] [--write-ratio R]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+from sqlalchemy.exc import IntegrityError, OperationalError  # noqa: E402
+
+import database  # noqa: E402
+import seats  # noqa: E402
+from models import db, Club, Student, Event, Registration  # noqa: E402
+
+STUDENTS = 5000
+EVENTS = 500
+
+
+def make_app(path, tuned):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    if tuned:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database.engine_options(app.config)
+    db.init_app(app)
+    if tuned:
+        database.init_app(app)
+    return app
+
+
+def seed(app):
+    with app.app_context():
+        db.create_all()
+        db.session.add(Club(club_name='Bench Club', password='x'))
+        db.session.flush()
+        db.session.execute(db.insert(Student), [
+            {'name': f'Student {i}', 'reg_no': f'B{i:06d}', 'email': f's{i}@bench.test', 'password': 'x'}
+            for i in range(STUDENTS)])
+        db.session.execute(db.insert(Event), [
+            {'club_id': 1, 'event_name': f'Event {i}', 'description': 'bench', 'credits': 1 + i % 5,
+             'capacity': 200, 'seats_taken': 0}
+            for i in range(EVENTS)])
+        db.session.commit()
+
+
+def read_dashboard():
+    events = Event.query.order_by(Event.created_at.desc(), Event.id.desc()).limit(20).all()
+    (db.session.query(Registration.event_id, func.count(Registration.id))
+     .filter(Registration.event_id.in_([event.id for event in events]))
+     .group_by(Registration.event_id).all())
+    db.session.rollback()
+
+
+def write_registration(rng):
+    try:
+        seats.register(rng.randint(1, STUDENTS), rng.randint(1, EVENTS))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+
+
+def run(app, args, tuned):
+    stop = time.perf_counter() + args.seconds
+    latencies = {'read': [], 'write': []}
+    locked = []
+    lock = threading.Lock()
+    write = database.retry_on_busy(write_registration) if tuned else write_registration
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        with app.app_context():
+            while time.perf_counter() < stop:
+                kind = 'write' if rng.random() < args.write_ratio else 'read'
+                start = time.perf_counter()
+                try:
+                    write(rng) if kind == 'write' else read_dashboard()
+                except OperationalError as e:
+                    db.session.rollback()
+                    if not database.is_busy_error(e):
+                        raise
+                    with lock:
+                        locked.append(kind)
+                    continue
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies[kind].append(elapsed)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with app.app_context():
+        db.engine.dispose()
+    return latencies, locked
+
+
+def percentile(samples, q):
+    if not samples:
+        return float('nan')
+    if len(samples) == 1:
+        return samples[0] * 1000
+    return statistics.quantiles(samples, n=100)[q - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    print(f'{args.threads} threads, {args.write_ratio:.0%} writes, {args.seconds:g}s per run\n')
+    print(f"{'engine':<8}{'ops/s':>9}{'read p50':>10}{'read p95':>10}{'write p50':>11}{'write p95':>11}{'locked':>8}")
+    for label, tuned in (('before', False), ('after', True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = make_app(os.path.join(tmp, 'bench.db'), tuned)
+            seed(app)
+            latencies, locked = run(app, args, tuned)
+        ops = len(latencies['read']) + len(latencies['write'])
+        print(f"{label:<8}{ops / args.seconds:>9.0f}"
+              f"{percentile(latencies['read'], 50):>8.1f}ms{percentile(latencies['read'], 95):>8.1f}ms"
+              f"{percentile(latencies['write'], 50):>9.1f}ms{percentile(latencies['write'], 95):>9.1f}ms"
+              f"{len(locked):>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Benchmark: cold start of web workers, from process launch to first response.
+
+Starts --workers fresh Python processes at once, as a pre-forking server
+without --preload would, each doing what a worker does on boot: import
+app, create_app(), init_database() and serve a first request. Run twice:
+
+  * first boot, on an empty database: one worker migrates and seeds under
+    the migration lock while the others wait for it;
+  * warm boot, on the now initialized database: every worker only checks.
+
+Reports each phase per worker (median and slowest) plus the SQL statements
+init_database issued, and exits 1 if a worker failed or the database does
+not end up with the latest schema and exactly one copy of each seed club.
+
+    python benchmarks/bench_startup.py [--workers N] [--rounds N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PHASES = ('interpreter', 'import', 'create_app', 'init_database', 'first_request', 'total')
+
+
+def child(launched):
+    """One worker's boot; prints its phase timings in milliseconds as JSON"""
+    started = time.perf_counter()
+    interpreter = time.time() - launched
+    sys.path.insert(0, ROOT)
+    from app import create_app, init_database
+    imported = time.perf_counter()
+    app = create_app()
+    created = time.perf_counter()
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', record)
+    init_database(app)
+    initialized = time.perf_counter()
+    event.remove(Engine, 'before_cursor_execute', record)
+
+    response = app.test_client().get('/student_login')
+    served = time.perf_counter()
+    assert response.status_code == 200, response.status_code
+    print(json.dumps({
+        'interpreter': interpreter * 1000,
+        'import': (imported - started) * 1000,
+        'create_app': (created - imported) * 1000,
+        'init_database': (initialized - created) * 1000,
+        'first_request': (served - initialized) * 1000,
+        'total': (time.time() - launched) * 1000,
+        'queries': len(statements),
+    }))
+
+
+def boot(workers, env):
+    launched = time.time()
+    processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child', repr(launched)],
+                                  env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                 for _ in range(workers)]
+    results, failures = [], []
+    for process in processes:
+        out, err = process.communicate()
+        if process.returncode:
+            failures.append(err.strip().splitlines()[-1] if err.strip() else f'exit {process.returncode}')
+        else:
+            results.append(json.loads(out.strip().splitlines()[-1]))
+    return results, failures
+
+
+def report(label, results, failures):
+    print(f'\n{label}: {len(results)} worker(s) up, {len(failures)} failed')
+    for failure in failures:
+        print(f'  FAILED: {failure}')
+    if not results:
+        return
+    print(f"  {'phase':15} {'median ms':>10} {'max ms':>10}")
+    for phase in PHASES:
+        values = [result[phase] for result in results]
+        print(f'  {phase:15} {statistics.median(values):10.0f} {max(values):10.0f}')
+    queries = sorted(result['queries'] for result in results)
+    print(f'  init_database SQL statements per worker: min {queries[0]}, max {queries[-1]}')
+
+
+def check(env):
+    """The schema version and seed clubs the workers left behind"""
+    script = ('import sys; sys.path.insert(0, %r)\n'
+              'from app import create_app, SEED_CLUBS\n'
+              'from migrations import get_schema_version, latest_version\n'
+              'from models import db, Club\n'
+              'with create_app(views=False).app_context():\n'
+              '    with db.engine.connect() as conn:\n'
+              '        version = get_schema_version(conn)\n'
+              '    clubs = Club.query.filter(Club.club_name.in_(SEED_CLUBS)).count()\n'
+              '    print(version == latest_version() and clubs == len(SEED_CLUBS), version, clubs)\n' % ROOT)
+    out = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True).stdout.split()
+    return out[0] == 'True', out[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=2, help='warm boots after the first boot')
+    parser.add_argument('--child', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        child(args.child)
+        return
+
+    tmp = tempfile.TemporaryDirectory()
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp.name, 'startup.db')}", JOB_WORKER_THREADS='0')
+    env.pop('INIT_DATABASE', None)
+
+    failed = False
+    results, failures = boot(args.workers, env)
+    report(f'First boot, empty database, {args.workers} workers at once', results, failures)
+    failed |= bool(failures)
+    warm, warm_failures = [], []
+    for _ in range(args.rounds):
+        results, failures = boot(args.workers, env)
+        warm += results
+        warm_failures += failures
+    report(f'Warm boot, {args.rounds} round(s) of {args.workers} workers', warm, warm_failures)
+    failed |= bool(warm_failures)
+
+    ok, (version, clubs) = check(env)
+    print(f'\nSchema version {version}, {clubs} seed club(s)')
+    if failed or not ok:
+        print('FAILED: a worker crashed or the database was not initialized exactly once')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
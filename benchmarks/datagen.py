@@ -0,0 +1,172 @@
+"""Synthetic campus data with realistic skew, for load tests and benchmarks.
+
+Generates clubs, events, students and --registrations registrations
+(10^3 to 10^6) into the database at DATABASE_URL (or --database):
+
+  * a few big clubs run most events (Zipf over clubs);
+  * a few popular events draw most registrations (Zipf over events), and
+    the most popular ones have a seat limit and a waitlist;
+  * most students register a handful of times, a few register a lot;
+  * statuses are mostly Pending/Accepted with some Rejected, registration
+    times spread over the last DAYS days.
+
+All accounts share one password (PASSWORD), hashed once with the current
+PASSWORD_HASH_METHOD so logins cost what they cost in production. Counters,
+credit totals and the recommendation index are recomputed at the end.
+
+    python benchmarks/datagen.py --registrations 100000 [--database sqlite:////tmp/load.db]
+"""
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'bench-password'
+DAYS = 120
+BATCH_SIZE = 10000
+ZIPF_EXPONENT = 1.1
+
+TOPICS = ['robotics', 'music', 'dance', 'drama', 'python', 'machine learning', 'photography',
+          'debate', 'chess', 'football', 'startup', 'design', 'poetry', 'astronomy', 'cooking']
+KINDS = ['workshop', 'festival', 'seminar', 'hackathon', 'meetup', 'competition', 'bootcamp']
+
+
+def sizes(registrations, students=None, events=None):
+    """(clubs, events, students) for a dataset of this many registrations, unless given"""
+    students = students or max(50, registrations // 6)
+    events = events or max(20, min(registrations // 40, 20000))
+    clubs = max(5, min(events // 15, 500))
+    return clubs, events, students
+
+
+def zipf_cum_weights(count, exponent=ZIPF_EXPONENT):
+    return list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def _insert(db, model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + BATCH_SIZE])
+
+
+def generate(registrations, seed=42, verbose=False, students=None, events=None):
+    """Fill the (empty, upgraded) database of the current app context; returns the sizes"""
+    import counters
+    import ledger
+    import passwords
+    import recommend
+    from models import db, Club, Student, Event, Registration
+
+    rng = random.Random(seed)
+    clubs, events, students = sizes(registrations, students, events)
+    registrations = min(registrations, events * students // 2)
+    now = datetime.utcnow()
+    password_hash = passwords.hash_password(PASSWORD)
+    started = time.perf_counter()
+
+    def log(message):
+        if verbose:
+            print(f'[{time.perf_counter() - started:6.1f}s] {message}')
+
+    _insert(db, Club, [{'club_name': f'Club {i + 1}', 'password': password_hash} for i in range(clubs)])
+    _insert(db, Student, [
+        {'name': f'Student {i + 1}', 'reg_no': f'S{i + 1:07d}', 'email': f'student{i + 1}@campus.test',
+         'password': password_hash}
+        for i in range(students)])
+    log(f'{clubs} clubs, {students} students')
+
+    # Event i is the i-th most popular; popular events belong to any club
+    club_weights = zipf_cum_weights(clubs)
+    event_weights = zipf_cum_weights(events)
+    expected = [registrations * (weight - previous) / event_weights[-1]
+                for previous, weight in zip([0] + event_weights, event_weights)]
+    event_rows = []
+    for i in range(events):
+        topic, kind = rng.choice(TOPICS), rng.choice(KINDS)
+        event_rows.append({
+            'club_id': 1 + bisect.bisect(club_weights, rng.random() * club_weights[-1]),
+            'event_name': f'{topic.title()} {kind.title()} {i + 1}',
+            'description': f'A {kind} about {topic} for students of every year. '
+                           f'Hands-on sessions, guest speakers and networking.',
+            'credits': rng.choice((1, 2, 2, 3, 3, 3, 4, 5)),
+            'created_at': now - timedelta(days=DAYS + rng.random() * 60),
+            # The most popular tenth fills up, so registering there joins the waitlist
+            'capacity': max(5, int(expected[i] * 0.8)) if i < events // 10 else None,
+        })
+    _insert(db, Event, event_rows)
+    log(f'{events} events')
+
+    # Student activity is skewed too: a few students register for many events
+    student_weights = zipf_cum_weights(students, exponent=0.6)
+    seen = set()
+    per_event = [[] for _ in range(events)]
+    while len(seen) < registrations:
+        needed = registrations - len(seen)
+        picked_events = rng.choices(range(events), cum_weights=event_weights, k=needed)
+        picked_students = rng.choices(range(students), cum_weights=student_weights, k=needed)
+        for event_index, student_index in zip(picked_events, picked_students):
+            key = student_index * events + event_index
+            if key not in seen:
+                seen.add(key)
+                per_event[event_index].append((now - timedelta(seconds=rng.random() * DAYS * 86400), student_index))
+    del seen
+
+    rows = []
+    for event_index, entries in enumerate(per_event):
+        capacity = event_rows[event_index]['capacity']
+        entries.sort()
+        for position, (registered_at, student_index) in enumerate(entries):
+            if capacity is not None and position >= capacity:
+                status = 'Waitlisted'
+            else:
+                status = rng.choices(('Pending', 'Accepted', 'Rejected'), weights=(50, 35, 15))[0]
+            rows.append({'student_id': student_index + 1, 'event_id': event_index + 1,
+                         'status': status, 'registered_at': registered_at})
+        if len(rows) >= BATCH_SIZE:
+            _insert(db, Registration, rows)
+            rows = []
+    _insert(db, Registration, rows)
+    log(f'{registrations} registrations')
+
+    counters.recount(db.session.connection())
+    ledger.recompute(db.session.connection())
+    db.session.commit()
+    log('counters and credit totals recomputed')
+    recommend.rebuild(db.session.connection())
+    db.session.commit()
+    log('recommendations rebuilt')
+    return {'clubs': clubs, 'events': events, 'students': students, 'registrations': registrations}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--registrations', type=int, default=100000)
+    parser.add_argument('--database', help='database URL (default DATABASE_URL)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--students', type=int, help='default: scaled from --registrations')
+    parser.add_argument('--events', type=int, help='default: scaled from --registrations')
+    args = parser.parse_args()
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+
+    from app import create_app
+    from migrations import upgrade
+    from models import Registration
+
+    app = create_app()
+    with app.app_context():
+        upgrade()
+        if Registration.query.first() is not None:
+            parser.error('the database already has registrations; point --database at an empty one')
+        counts = generate(args.registrations, seed=args.seed, verbose=True,
+                          students=args.students, events=args.events)
+    print(', '.join(f'{count} {name}' for name, count in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
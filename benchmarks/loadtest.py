@@ -0,0 +1,432 @@
+"""Load test: concurrent students, clubs and admins against the real routes.
+
+Generates a skewed dataset with datagen.py (--registrations, into a
+temporary SQLite file) or reuses one it generated earlier (--database),
+then runs --users virtual users for --duration seconds after --warmup.
+Each user logs in through the login form and loops over its role's flows:
+
+    student  dashboard, register for a (popular) event, chatbot, search,
+             /api/v1/events, log out and back in
+    club     dashboard, accept/reject one registration or a batch,
+             CSV export of its roster
+    admin    dashboard, /api/v1/registrations, /metrics
+
+Requests go through the Flask test client, or with --server over HTTP to a
+threaded local WSGI server. The script prints count, errors, throughput and
+p50/p95/p99 latency per route and writes them with the commit, arguments
+and dataset size to a JSON file (benchmarks/results/ by default). With
+--compare OLD.json it also reports each route's change against that run
+and exits 1 if any p95 or throughput regressed by more than --threshold.
+
+    python benchmarks/loadtest.py [--registrations N | --database URL] [--users N]
+        [--duration S] [--server] [--compare OLD.json]
+"""
+import argparse
+import bisect
+import http.cookiejar
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datagen  # noqa: E402
+from bench_intents import CORPUS  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+ROLES = {'student': 80, 'club': 15, 'admin': 5}
+SEARCHES = ['robotics', 'music workshop', 'python', 'hackathon', 'dance festival', 'machine learning',
+            'chess', 'startup meetup', 'astronomy', 'poetry competition']
+CHATBOT_MESSAGES = CORPUS + ['how many credits do i have', 'what are my credits']
+
+
+class TestClientTransport:
+    """Requests through the Flask test client, in the load test's own threads"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None, json_body=None):
+        response = self.client.open(path, method=method, data=form, json=json_body)
+        response.get_data()
+        return response.status_code
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPTransport:
+    """Requests over HTTP with a cookie jar; redirects are returned, not followed"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, form=None, json_body=None):
+        headers = {}
+        data = None
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            data = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+class Recorder:
+    """Latency samples per route, kept only once the warmup is over"""
+
+    def __init__(self, record_from):
+        self.record_from = record_from
+        self.samples = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def add(self, route, started, elapsed, ok):
+        if started < self.record_from:
+            return
+        with self.lock:
+            self.samples.setdefault(route, []).append(elapsed)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+
+class Dataset:
+    """Ids the virtual users pick from, read once from the generated database"""
+
+    def __init__(self, app, rng):
+        from models import db, Club, Student, Event, Registration
+
+        self.rng = rng
+        with app.app_context():
+            self.counts = {
+                'clubs': Club.query.count(), 'events': Event.query.count(),
+                'students': Student.query.count(), 'registrations': Registration.query.count(),
+            }
+            # datagen numbers events by popularity and clubs by size
+            self.event_ids = [event_id for (event_id,) in db.session.query(Event.id).order_by(Event.id)]
+            self.club_names = [name for (name,) in db.session.query(Club.club_name).order_by(Club.id)]
+            self.reg_nos = [reg_no for (reg_no,) in db.session.query(Student.reg_no)]
+        self.event_weights = datagen.zipf_cum_weights(len(self.event_ids))
+        self.club_weights = datagen.zipf_cum_weights(len(self.club_names))
+
+    def popular_event(self):
+        return self.event_ids[bisect.bisect(self.event_weights, self.rng.random() * self.event_weights[-1])]
+
+    def club_name(self):
+        return self.club_names[bisect.bisect(self.club_weights, self.rng.random() * self.club_weights[-1])]
+
+
+class VirtualUser:
+    """One logged-in user looping over its role's weighted actions"""
+
+    def __init__(self, role, transport, dataset, recorder, app, rng, think):
+        self.role = role
+        self.transport = transport
+        self.dataset = dataset
+        self.recorder = recorder
+        self.app = app
+        self.rng = rng
+        self.think = think
+        self.actions = {
+            'student': [(self.student_dashboard, 35), (self.register_event, 15), (self.chatbot, 20),
+                        (self.search, 12), (self.api_events, 13), (self.login, 5)],
+            'club': [(self.club_dashboard, 50), (self.update_registration, 25), (self.bulk_review, 20),
+                     (self.export_csv, 5)],
+            'admin': [(self.admin_dashboard, 70), (self.api_registrations, 20), (self.metrics, 10)],
+        }[role]
+        self.pending = []
+
+    def call(self, route, method, path, expected=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            status = self.transport.request(method, path, **kwargs)
+        except Exception:
+            status = None
+        self.recorder.add(route, started, time.perf_counter() - started, status in expected)
+        return status
+
+    def login(self):
+        if self.role == 'student':
+            self.transport.request('GET', '/logout')
+            self.reg_no = getattr(self, 'reg_no', None) or self.rng.choice(self.dataset.reg_nos)
+            self.call('student_login', 'POST', '/student_login', expected=(302,),
+                      form={'reg_no': self.reg_no, 'password': datagen.PASSWORD})
+        elif self.role == 'club':
+            self.club_name = self.dataset.club_name()
+            self.call('club_login', 'POST', '/club_login', expected=(302,),
+                      form={'club_name': self.club_name, 'password': datagen.PASSWORD})
+        else:
+            self.call('admin_login', 'POST', '/admin_login', expected=(302,),
+                      form={'username': 'admin', 'password': 'admin123'})
+
+    def student_dashboard(self):
+        self.call('student_dashboard', 'GET', '/student_dashboard', expected=(200, 304))
+
+    def register_event(self):
+        event_id = self.dataset.popular_event()
+        # Already registered redirects on the GET; otherwise the form is posted
+        if self.call('register_event_form', 'GET', f'/register_event/{event_id}', expected=(200, 302)) == 200:
+            self.call('register_event', 'POST', f'/register_event/{event_id}', expected=(302,))
+
+    def chatbot(self):
+        self.call('chatbot', 'POST', '/chatbot_process', json_body={'message': self.rng.choice(CHATBOT_MESSAGES)})
+
+    def search(self):
+        self.call('search', 'GET', f'/search?q={urllib.parse.quote(self.rng.choice(SEARCHES))}')
+
+    def api_events(self):
+        self.call('api_v1_events', 'GET', '/api/v1/events')
+
+    def club_dashboard(self):
+        self.call('club_dashboard', 'GET', '/club_dashboard')
+
+    def _pending_ids(self):
+        """Registrations this club can still review (read directly, not timed)"""
+        if not self.pending:
+            from models import db, Club, Event, Registration
+
+            with self.app.app_context():
+                self.pending = [registration_id for (registration_id,) in
+                                db.session.query(Registration.id)
+                                .join(Event, Registration.event_id == Event.id)
+                                .join(Club, Event.club_id == Club.id)
+                                .filter(Club.club_name == self.club_name, Registration.status == 'Pending')
+                                .limit(500)]
+            self.rng.shuffle(self.pending)
+        return self.pending
+
+    def update_registration(self):
+        pending = self._pending_ids()
+        if pending:
+            status = self.rng.choice(('Accepted', 'Rejected'))
+            self.call('update_registration', 'GET', f'/update_registration/{pending.pop()}/{status}',
+                      expected=(302,))
+
+    def bulk_review(self):
+        pending = self._pending_ids()
+        if pending:
+            batch = [pending.pop() for _ in range(min(10, len(pending)))]
+            self.call('bulk_update_registrations', 'POST', '/bulk_update_registrations',
+                      json_body={'status': self.rng.choice(('Accepted', 'Rejected')), 'registration_ids': batch})
+
+    def export_csv(self):
+        self.call('export_csv', 'GET', '/export_registrations.csv')
+
+    def admin_dashboard(self):
+        self.call('admin_dashboard', 'GET', '/admin_dashboard')
+
+    def api_registrations(self):
+        self.call('api_v1_registrations', 'GET', '/api/v1/registrations')
+
+    def metrics(self):
+        self.call('metrics', 'GET', '/metrics')
+
+    def run(self, deadline):
+        actions, weights = zip(*self.actions)
+        self.login()
+        while time.perf_counter() < deadline:
+            self.rng.choices(actions, weights=weights)[0]()
+            if self.think:
+                time.sleep(self.rng.expovariate(1 / self.think))
+
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an ascending list"""
+    return ordered[max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(samples, errors, seconds):
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'errors': errors,
+        'throughput': round(len(ordered) / seconds, 2),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 2),
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 2),
+        'max_ms': round(ordered[-1] * 1000, 2),
+    }
+
+
+def git_commit():
+    try:
+        sha = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        return None, None
+    return sha or None, dirty
+
+
+def print_table(routes, total):
+    print(f"{'route':28} {'count':>7} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, stats in sorted(routes.items()) + [('TOTAL', total)]:
+        print(f"{route:28} {stats['count']:7d} {stats['errors']:6d} {stats['throughput']:8.1f} "
+              f"{stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f}")
+
+
+def compare(results, baseline, threshold, min_samples):
+    """Print each route's change against a previous run; returns the regressed routes"""
+    print(f"\nAgainst {(baseline['meta'].get('commit') or 'unknown')[:12]} "
+          f"(regression = p95 up or req/s down by more than {threshold:.0%}):")
+    for key in ('transport', 'dataset', 'args', 'cpus'):
+        if results['meta'].get(key) != baseline['meta'].get(key):
+            print(f'  warning: the runs differ in {key}; changes may not come from the code')
+    print(f"{'route':28} {'p95 ms':>17} {'change':>8} {'req/s':>15} {'change':>8}")
+    regressed = []
+    rows = sorted(results['routes'].items()) + [('TOTAL', results['total'])]
+    for route, stats in rows:
+        old = baseline['total'] if route == 'TOTAL' else baseline['routes'].get(route)
+        if not old:
+            print(f'{route:28} (not in the baseline)')
+            continue
+        p95_change = stats['p95_ms'] / old['p95_ms'] - 1 if old['p95_ms'] else 0
+        rate_change = stats['throughput'] / old['throughput'] - 1 if old['throughput'] else 0
+        flag = ''
+        if min(stats['count'], old['count']) < min_samples:
+            flag = '  (too few samples)'
+        elif p95_change > threshold or rate_change < -threshold:
+            regressed.append(route)
+            flag = '  REGRESSION'
+        print(f"{route:28} {old['p95_ms']:8.1f}->{stats['p95_ms']:<8.1f} {p95_change:+8.0%} "
+              f"{old['throughput']:7.1f}->{stats['throughput']:<7.1f} {rate_change:+8.0%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--registrations', type=int, default=10000,
+                        help='size of the generated dataset (10^3 to 10^6)')
+    parser.add_argument('--database', help='reuse a database generated by datagen.py instead')
+    parser.add_argument('--users', type=int, default=8, help='concurrent virtual users')
+    parser.add_argument('--duration', type=float, default=30, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds before measuring starts')
+    parser.add_argument('--think', type=float, default=0, help='mean think time between actions, seconds')
+    parser.add_argument('--server', action='store_true', help='go over HTTP to a local threaded WSGI server')
+    parser.add_argument('--admission', action='store_true',
+                        help='keep rate limits and concurrency caps on (virtual users never pause, so they trip them)')
+    parser.add_argument('--job-threads', type=int, default=0, help='run a job worker alongside (default none)')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='results file (default benchmarks/results/loadtest-<commit>-<time>.json)')
+    parser.add_argument('--compare', metavar='OLD_JSON', help='compare against a previous results file')
+    parser.add_argument('--threshold', type=float, default=0.10, help='regression threshold (default 0.10)')
+    parser.add_argument('--min-samples', type=int, default=20,
+                        help='routes with fewer samples in either run are not judged (default 20)')
+    args = parser.parse_args()
+
+    tmp = None
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp.name, 'load.db')}"
+
+    import jobs
+    from app import create_app
+    from migrations import upgrade
+
+    app = create_app({'EXPORT_DIR': os.path.join(tmp.name if tmp else tempfile.gettempdir(), 'exports'),
+                      'ADMISSION_ENABLED': args.admission})
+    with app.app_context():
+        upgrade()
+        if not args.database:
+            print(f'Generating {args.registrations} registrations...')
+            datagen.generate(args.registrations, seed=args.seed)
+    rng = random.Random(args.seed)
+    dataset = Dataset(app, rng)
+
+    server = None
+    if args.server:
+        from werkzeug.serving import make_server
+
+        # One access log line per request would cost more than some of the routes
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+    worker = jobs.Worker(app, threads=args.job_threads).start() if args.job_threads else None
+
+    start = time.perf_counter()
+    recorder = Recorder(record_from=start + args.warmup)
+    deadline = start + args.warmup + args.duration
+    roles, weights = zip(*ROLES.items())
+    users = []
+    for number in range(args.users):
+        # At least one user of every role when there are enough users
+        role = roles[number] if number < len(roles) and args.users >= len(roles) else rng.choices(roles, weights)[0]
+        transport = HTTPTransport(base_url) if server else TestClientTransport(app)
+        user = VirtualUser(role, transport, dataset, recorder, app, random.Random(rng.random()), args.think)
+        users.append(threading.Thread(target=user.run, args=(deadline,), name=f'{role}-{number}'))
+    print(f'{args.users} users for {args.duration:g}s (+{args.warmup:g}s warmup) over '
+          f"{'HTTP' if server else 'the test client'}, {dataset.counts['registrations']} registrations")
+    for thread in users:
+        thread.start()
+    for thread in users:
+        thread.join()
+    measured = time.perf_counter() - recorder.record_from
+    if worker:
+        worker.stop()
+    if server:
+        server.shutdown()
+
+    routes = {route: summarize(samples, recorder.errors.get(route, 0), measured)
+              for route, samples in recorder.samples.items()}
+    total = summarize([sample for samples in recorder.samples.values() for sample in samples],
+                      sum(recorder.errors.values()), measured)
+    commit, dirty = git_commit()
+    results = {
+        'meta': {
+            'commit': commit, 'dirty': dirty, 'timestamp': datetime.utcnow().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'transport': 'http' if server else 'test_client', 'dataset': dataset.counts,
+            'password_hash_method': app.config['PASSWORD_HASH_METHOD'],
+            'args': {key: value for key, value in vars(args).items()
+                     if key not in ('output', 'compare', 'threshold', 'min_samples')},
+        },
+        'routes': routes,
+        'total': total,
+    }
+    print_table(routes, total)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"loadtest-{(commit or 'nogit')[:8]}-{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as out:
+        json.dump(results, out, indent=2)
+    print(f'\nResults written to {output}')
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressed = compare(results, json.load(baseline_file), args.threshold, args.min_samples)
+        if regressed:
+            print(f"\n{len(regressed)} route(s) regressed: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
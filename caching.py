@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache whose entries also expire after ttl seconds"""
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def configure(self, maxsize=None, ttl=None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._evict()
+
+    def get(self, key):
+        """Return (True, value) on a fresh hit, (False, None) otherwise"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def _evict(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+class UncachedAnswer(str):
+    """A chatbot answer that must not be cached (e.g. an error message)"""
+
+
+# Chatbot answers keyed on (intent, parameters)
+chatbot_cache = LRUCache()
+
+
+def _tee(answer, pieces):
+    """yield from answer (see answers.py), also appending the text it yields to pieces"""
+    value = error = None
+    while True:
+        try:
+            item = answer.send(value) if error is None else answer.throw(error)
+        except StopIteration as stop:
+            return stop.value
+        if isinstance(item, str):
+            pieces.append(item)
+        value = error = None
+        try:
+            value = yield item
+        except Exception as e:
+            error = e
+
+
+def cached_answer(intent, version):
+    """Cache the text of a chatbot answer generator under (intent, version, *normalized args).
+
+    version is a step (see answers.py) reading the version of the data the
+    answer shows. A write that moves it on retires the old entries in every
+    process, even one that never runs invalidate_catalog(). A hit replays
+    the cached pieces after that one read; an answer that yields an
+    UncachedAnswer piece is not cached.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args):
+            key = ((intent, (yield version))
+                   + tuple(a.strip().lower() if isinstance(a, str) else a for a in args))
+            found, pieces = chatbot_cache.get(key)
+            if found:
+                yield from pieces
+                return
+            pieces = []
+            yield from _tee(func(*args), pieces)
+            if not any(isinstance(piece, UncachedAnswer) for piece in pieces):
+                chatbot_cache.set(key, tuple(pieces))
+        return wrapper
+    return decorator
+
+
+def invalidate_catalog():
+    """Drop this process's cached answers after a commit that changed clubs, events or registrations"""
+    chatbot_cache.clear()
@@ -0,0 +1,47 @@
+"""Chatbot page and the routes that answer it (the answers themselves are in answers.py)."""
+from flask import Blueprint, render_template, request, session, jsonify, Response, stream_with_context
+from models import db
+import answers
+
+bp = Blueprint('chatbot', __name__)
+
+@bp.route('/chatbot')
+def chatbot():
+    return render_template('chatbot.html')
+
+@bp.route('/chatbot_process', methods=['POST'])
+def chatbot_process():
+    try:
+        data = request.get_json()
+        user_message = data.get('message', '')
+        
+        # Process the query using NLP logic
+        response = ''.join(answers.render(answers.answer(user_message, current_student_id()), db.session))
+        
+        return jsonify({'response': response})
+    except Exception as e:
+        return jsonify({'response': answers.ERROR_MESSAGE})
+
+@bp.route('/chatbot_stream', methods=['POST'])
+def chatbot_stream():
+    """The answer as server-sent events: one "data" event per piece, then "done" (or "error")"""
+    data = request.get_json(silent=True) or {}
+    student_id = current_student_id()
+    
+    def events():
+        try:
+            if not isinstance(data, dict):
+                raise ValueError('expected a JSON object')
+            for piece in answers.render(answers.answer(data.get('message', ''), student_id), db.session):
+                yield answers.sse(piece)
+        except Exception:
+            yield answers.sse(answers.ERROR_MESSAGE, event='error')
+            return
+        yield answers.sse('', event='done')
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def current_student_id():
+    """The logged-in student's id, or None for anyone else"""
+    return session.get('student_id') if session.get('user_type') == 'student' else None
@@ -0,0 +1,186 @@
+"""Club routes: login, dashboard, events and registration reviews."""
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, session, flash, jsonify
+from models import db, Club, Event, Registration
+from queries import query_budget, get_club_dashboard_data
+from pagination import InvalidCursor
+import reviews
+import seats
+import counters
+import fragments
+import jobs
+import passwords
+import database
+from caching import invalidate_catalog
+
+bp = Blueprint('club', __name__)
+
+@bp.route('/club_login', methods=['GET', 'POST'])
+def club_login():
+    if request.method == 'POST':
+        club_name = request.form['club_name']
+        password = request.form['password']
+        
+        club = Club.query.filter_by(club_name=club_name).first()
+        if club and club.check_password(password):
+            if passwords.needs_rehash(club.password):
+                passwords.schedule_rehash(current_app._get_current_object(), Club, club.id, club.password, password)
+            session['club_id'] = club.id
+            session['club_name'] = club.club_name
+            session['user_type'] = 'club'
+            flash('Login successful!', 'success')
+            return redirect(url_for('club.club_dashboard'))
+        else:
+            flash('Invalid club name or password', 'error')
+    
+    return render_template('club_login.html')
+
+@bp.route('/club_dashboard')
+@query_budget('club_dashboard')
+def club_dashboard():
+    if 'club_id' not in session or session.get('user_type') != 'club':
+        return redirect(url_for('club.club_login'))
+    
+    # Events and a page of each event's registrations are loaded in a fixed number of queries
+    try:
+        data = get_club_dashboard_data(session['club_id'],
+                                       event_id=request.args.get('event_id', type=int),
+                                       registrations_cursor=request.args.get('registrations_cursor'))
+    except InvalidCursor:
+        return redirect(url_for('club.club_dashboard'))
+    
+    return render_template('club_dashboard.html', **data)
+
+@bp.route('/create_event', methods=['GET', 'POST'])
+@database.retry_on_busy
+def create_event():
+    if 'club_id' not in session or session.get('user_type') != 'club':
+        return redirect(url_for('club.club_login'))
+    
+    if request.method == 'POST':
+        event_name = request.form['event_name']
+        description = request.form['description']
+        credits = request.form['credits']
+        capacity = request.form.get('capacity', type=int)
+        
+        if not event_name or not description or not credits:
+            flash('All fields are required!', 'error')
+        elif capacity is not None and capacity < 1:
+            flash('Capacity must be at least 1, or left blank for unlimited!', 'error')
+        else:
+            event = Event(
+                club_id=session['club_id'],
+                event_name=event_name,
+                description=description,
+                credits=int(credits),
+                capacity=capacity
+            )
+            db.session.add(event)
+            counters.events_added(session['club_id'])
+            fragments.bump_catalog_version()
+            db.session.commit()
+            invalidate_catalog()
+            flash('Event created successfully!', 'success')
+            return redirect(url_for('club.club_dashboard'))
+    
+    return render_template('create_event.html')
+
+@bp.route('/update_registration/<int:registration_id>/<string:status>')
+@database.retry_on_busy
+def update_registration(registration_id, status):
+    if 'club_id' not in session or session.get('user_type') != 'club':
+        return redirect(url_for('club.club_login'))
+    
+    registration = Registration.query.get_or_404(registration_id)
+    event = Event.query.get(registration.event_id)
+    
+    if event.club_id != session['club_id']:
+        flash('Unauthorized action!', 'error')
+        return redirect(url_for('club.club_dashboard'))
+    
+    if status in ['Accepted', 'Rejected']:
+        changed = registration.status != status
+        if seats.set_status(registration, status):
+            if changed:
+                jobs.enqueue('notify_status', {'registration_ids': [registration.id], 'status': status})
+            db.session.commit()
+            invalidate_catalog()
+            flash(f'Registration {status} successfully!', 'success')
+        else:
+            flash('This event is full. Reject another registration to free a seat first.', 'error')
+    
+    return redirect(url_for('club.club_dashboard'))
+
+def _is_id(value):
+    """A JSON integer (bool is a subclass of int in Python, but not an id)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+@bp.route('/bulk_update_registrations', methods=['POST'])
+@database.retry_on_busy
+def bulk_update_registrations():
+    wants_json = request.is_json
+    if 'club_id' not in session or session.get('user_type') != 'club':
+        if wants_json:
+            return jsonify({'error': 'Club login required'}), 401
+        return redirect(url_for('club.club_login'))
+    
+    # JSON: {"status": ..., "registration_ids": [...]} or {"status": ..., "event_id": N}
+    # Form: status plus registration_ids checkboxes, or scope=all_pending with event_id
+    if wants_json:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Send a JSON object with status and registration_ids or event_id'}), 400
+        status = data.get('status')
+        registration_ids = data.get('registration_ids')
+        event_id = data.get('event_id') if registration_ids is None else None
+        if registration_ids is not None and not (isinstance(registration_ids, list)
+                                                 and all(_is_id(i) for i in registration_ids)):
+            return jsonify({'error': 'registration_ids must be a list of integers'}), 400
+        if event_id is not None and not _is_id(event_id):
+            return jsonify({'error': 'event_id must be an integer'}), 400
+    else:
+        status = request.form.get('status')
+        registration_ids = request.form.getlist('registration_ids')
+        event_id = None
+        if request.form.get('scope') == 'all_pending':
+            event_id = request.form.get('event_id', type=int)
+            registration_ids = None
+    
+    if status not in reviews.REVIEW_STATUSES:
+        if wants_json:
+            return jsonify({'error': f'status must be one of {", ".join(reviews.REVIEW_STATUSES)}'}), 400
+        flash('Select registrations and a valid status first!', 'error')
+        return redirect(url_for('club.club_dashboard'))
+    
+    try:
+        if event_id is not None:
+            event_id = int(event_id)
+        outcomes = reviews.bulk_update_registrations(session['club_id'], status,
+                                                     registration_ids=registration_ids,
+                                                     event_id=event_id)
+    except (TypeError, ValueError) as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 400
+        flash('Select registrations and a valid status first!', 'error')
+        return redirect(url_for('club.club_dashboard'))
+    
+    updated_ids = sorted(k for k, outcome in outcomes.items() if outcome == reviews.UPDATED)
+    updated = len(updated_ids)
+    if updated:
+        # One job fans the emails out, so the review does not wait on them
+        jobs.enqueue('notify_status', {'registration_ids': updated_ids, 'status': status})
+        db.session.commit()
+        invalidate_catalog()
+    
+    if wants_json:
+        return jsonify({'status': status, 'updated': updated,
+                        'results': {str(k): v for k, v in sorted(outcomes.items())}})
+    
+    full = sum(1 for outcome in outcomes.values() if outcome == reviews.FULL)
+    skipped = len(outcomes) - updated - full
+    message = f'{updated} registration(s) {status} successfully!'
+    if full:
+        message += f' {full} not accepted: the event is full.'
+    if skipped:
+        message += f' {skipped} skipped.'
+    flash(message, 'success' if updated else 'error')
+    return redirect(url_for('club.club_dashboard'))
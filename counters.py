@@ -0,0 +1,139 @@
+"""Denormalized registration and event counters.
+
+Event.registrations_total and one column per registration status, plus
+Club.event_count (and Event.seats_taken, owned by seats.py), are kept up to date by the write paths themselves:
+each change is an UPDATE ... SET column = column + n in the same
+transaction as the rows it counts, so a reader gets a count from one row
+instead of counting a collection. reconcile() recounts everything from
+the source tables to detect and repair drift:
+
+    python counters.py           # report drift, exit 1 if any
+    python counters.py --repair  # and fix it
+"""
+import argparse
+import sys
+
+from sqlalchemy import func, select, update
+
+from models import db, Club, Event, Registration
+
+# Registration status -> Event counter column
+STATUS_COUNTERS = {
+    'Pending': 'registrations_pending',
+    'Accepted': 'registrations_accepted',
+    'Rejected': 'registrations_rejected',
+    'Waitlisted': 'registrations_waitlisted',
+}
+# Statuses holding a seat, as seats.HOLDS_SEAT (not imported: seats imports this module)
+SEAT_HOLDING = ('Pending', 'Accepted')
+EVENT_COUNTERS = ('registrations_total',) + tuple(STATUS_COUNTERS.values()) + ('seats_taken',)
+
+
+def _bump_event(event_id, deltas):
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if deltas:
+        db.session.execute(
+            update(Event)
+            .where(Event.id == event_id)
+            .values({column: getattr(Event, column) + delta for column, delta in deltas.items()})
+            .execution_options(synchronize_session=False))
+
+
+def registration_added(event_id, status, count=1):
+    _bump_event(event_id, {'registrations_total': count, STATUS_COUNTERS[status]: count})
+
+
+def registrations_moved(event_id, old_status, new_status, count=1):
+    if old_status != new_status:
+        _bump_event(event_id, {STATUS_COUNTERS[old_status]: -count, STATUS_COUNTERS[new_status]: count})
+
+
+def events_added(club_id, count=1):
+    if count:
+        db.session.execute(
+            update(Club)
+            .where(Club.id == club_id)
+            .values(event_count=Club.event_count + count)
+            .execution_options(synchronize_session=False))
+
+
+def _recounts():
+    """Correlated subqueries recounting each Event counter from registrations"""
+    def count(*conditions):
+        return (select(func.count(Registration.id))
+                .where(Registration.event_id == Event.id, *conditions)
+                .scalar_subquery())
+    values = {'registrations_total': count()}
+    for status, column in STATUS_COUNTERS.items():
+        values[column] = count(Registration.status == status)
+    values['seats_taken'] = count(Registration.status.in_(SEAT_HOLDING))
+    return values
+
+
+def recount(conn, event_ids=None, club_ids=None):
+    """Rewrite counters from the source tables, for the given ids or for every row.
+
+    Each table is rewritten by one UPDATE with correlated subqueries, so the
+    recount is atomic even while registrations keep arriving.
+    """
+    if event_ids is None or event_ids:
+        events = update(Event).values(_recounts())
+        if event_ids is not None:
+            events = events.where(Event.id.in_(event_ids))
+        conn.execute(events)
+
+    if club_ids is None or club_ids:
+        club_events = select(func.count(Event.id)).where(Event.club_id == Club.id).scalar_subquery()
+        clubs = update(Club).values(event_count=club_events)
+        if club_ids is not None:
+            clubs = clubs.where(Club.id.in_(club_ids))
+        conn.execute(clubs)
+
+
+def reconcile(conn, repair=False):
+    """Compare every counter with a recount; return [(table, id, column, stored, actual)].
+
+    With repair=True the drifted rows are recounted in place.
+    """
+    recounts = _recounts()
+    stored = [getattr(Event, column) for column in EVENT_COUNTERS]
+    actual = [recounts[column].label(f'actual_{column}') for column in EVENT_COUNTERS]
+    width = len(EVENT_COUNTERS)
+    drift = []
+    for row in conn.execute(select(Event.id, *stored, *actual)):
+        for column, stored_value, actual_value in zip(EVENT_COUNTERS, row[1:1 + width], row[1 + width:]):
+            if stored_value != actual_value:
+                drift.append(('events', row[0], column, stored_value, actual_value))
+
+    club_events = select(func.count(Event.id)).where(Event.club_id == Club.id).scalar_subquery()
+    for club_id, stored_value, actual_value in conn.execute(select(Club.id, Club.event_count, club_events)):
+        if stored_value != actual_value:
+            drift.append(('clubs', club_id, 'event_count', stored_value, actual_value))
+
+    if repair and drift:
+        recount(conn,
+                event_ids={row_id for table, row_id, *_ in drift if table == 'events'},
+                club_ids={row_id for table, row_id, *_ in drift if table == 'clubs'})
+    return drift
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check denormalized counters against a recount.')
+    parser.add_argument('--repair', action='store_true', help='rewrite drifted counters')
+    args = parser.parse_args(argv)
+
+    from app import create_app
+
+    with create_app(views=False).app_context(), db.engine.begin() as conn:
+        drift = reconcile(conn, repair=args.repair)
+    for table, row_id, column, stored, actual in drift:
+        print(f'{table}.{column} for id {row_id}: stored {stored}, actual {actual}')
+    if not drift:
+        print('All counters match.')
+    elif args.repair:
+        print(f'Repaired {len(drift)} counter(s).')
+    return 1 if drift and not args.repair else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
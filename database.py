@@ -0,0 +1,180 @@
+"""Database engine configuration for multi-threaded serving.
+
+The database URL and the DB_* pool settings come from the environment
+(DATABASE_URL, DB_POOL_SIZE, ...), so the same code runs on a local SQLite
+file or on one PostgreSQL database shared by many web workers. Backend
+specific behaviour elsewhere (search.py) dispatches on dialect_name().
+
+SQLite file databases are opened in WAL mode so readers never block behind
+a writer, with synchronous=NORMAL (durable at checkpoints, safe with WAL),
+a larger page cache and memory-mapped reads. The connection pool is sized
+for one connection per serving thread. Writers still take turns: a writer
+waits up to DB_BUSY_TIMEOUT for the write lock, and write routes decorated
+with retry_on_busy are re-run with exponential backoff if it stays busy;
+on PostgreSQL the same applies to serialization failures and deadlocks.
+
+create_async_engine() opens the same database through an asyncio driver
+(aiosqlite or asyncpg) with the same pool settings and pragmas, for the
+async serving mode in asgi.py.
+"""
+import os
+import random
+import time
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+from models import db
+
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -64000),       # KiB when negative: 64 MB per connection
+    ('mmap_size', 268435456),     # 256 MB of the file read through mmap
+    ('temp_store', 'MEMORY'),
+)
+
+DEFAULT_DATABASE_URL = 'sqlite:///database.db'
+
+# Transaction conflicts PostgreSQL resolves by aborting one side: safe to retry
+RETRYABLE_SQLSTATES = ('40001', '40P01')  # serialization_failure, deadlock_detected
+
+# asyncio drivers for the ASGI server (asgi.py), by backend
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+
+DEFAULTS = {
+    'DB_POOL_SIZE': 10,
+    'DB_MAX_OVERFLOW': 20,
+    'DB_POOL_TIMEOUT': 30,
+    'DB_BUSY_TIMEOUT': 5.0,       # seconds SQLite waits for the write lock
+    'DB_BUSY_RETRIES': 5,
+    'DB_BUSY_BACKOFF': 0.05,      # first retry delay in seconds, doubled each time
+}
+
+
+def database_url():
+    """DATABASE_URL from the environment, defaulting to the local SQLite file"""
+    url = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+    # Hosting platforms still hand out the scheme SQLAlchemy 1.4 dropped
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def config_from_env(config):
+    """Set the database URI and every DB_* setting present in the environment"""
+    config['SQLALCHEMY_DATABASE_URI'] = database_url()
+    for key, default in DEFAULTS.items():
+        if key in os.environ:
+            config[key] = type(default)(os.environ[key])
+
+
+def dialect_name(bind):
+    """Dialect name ('sqlite', 'postgresql', ...) of an engine, connection or session"""
+    if hasattr(bind, 'get_bind'):
+        bind = bind.get_bind()
+    return bind.dialect.name
+
+
+def is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for config's database URI and DB_* settings"""
+    for key, value in DEFAULTS.items():
+        config.setdefault(key, value)
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if make_url(uri).get_backend_name() == 'sqlite' and not is_sqlite_file(uri):
+        return {}  # in-memory: Flask-SQLAlchemy uses a single shared StaticPool connection
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+    if is_sqlite_file(uri):
+        options['connect_args'] = {'timeout': config['DB_BUSY_TIMEOUT'], 'check_same_thread': False}
+    else:
+        # Server connections can be dropped while idle in the pool
+        options['pool_pre_ping'] = True
+    return options
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def init_app(app):
+    """Tune every SQLite file engine of app on connect; call after db.init_app(app)"""
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite' and is_sqlite_file(str(engine.url)):
+                event.listen(engine, 'connect', _apply_sqlite_pragmas)
+
+
+def async_url(url):
+    """The same database through its asyncio driver (sqlite+aiosqlite, postgresql+asyncpg)"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No asyncio driver configured for {backend} databases')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+def create_async_engine(app):
+    """An AsyncEngine on app's database, pooled and tuned like its sync engine"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    with app.app_context():
+        # Flask-SQLAlchemy has already resolved a relative SQLite path against the instance folder
+        url = db.engine.url
+    options = {k: v for k, v in app.config['SQLALCHEMY_ENGINE_OPTIONS'].items() if k != 'connect_args'}
+    if is_sqlite_file(url):
+        options['connect_args'] = {'timeout': app.config['DB_BUSY_TIMEOUT']}
+    engine = create_async_engine(async_url(url), **options)
+    if is_sqlite_file(url):
+        event.listen(engine.sync_engine, 'connect', _apply_sqlite_pragmas)
+    return engine
+
+
+def is_busy_error(error):
+    """True for SQLITE_BUSY / SQLITE_LOCKED, or a PostgreSQL serialization failure or deadlock"""
+    if not isinstance(error, OperationalError):
+        return False
+    # psycopg 3 reports the SQLSTATE as sqlstate, psycopg2 as pgcode
+    if (getattr(error.orig, 'sqlstate', None) or getattr(error.orig, 'pgcode', None)) in RETRYABLE_SQLSTATES:
+        return True
+    message = str(error.orig).lower()
+    return 'database is locked' in message or 'database is busy' in message or 'database table is locked' in message
+
+
+def retry_on_busy(view):
+    """Re-run a write route from scratch when the database reports it as busy.
+
+    The session is rolled back before each retry, so the view must not have
+    committed anything before the statement that failed.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        config = current_app.config
+        retries = config.get('DB_BUSY_RETRIES', DEFAULTS['DB_BUSY_RETRIES'])
+        delay = config.get('DB_BUSY_BACKOFF', DEFAULTS['DB_BUSY_BACKOFF'])
+        for attempt in range(retries + 1):
+            try:
+                return view(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if not is_busy_error(e) or attempt == retries:
+                    raise
+                # Full jitter keeps retrying writers from waking up in lockstep
+                time.sleep(random.uniform(0, delay * 2 ** attempt))
+    return wrapper
@@ -0,0 +1,131 @@
+"""EXPLAIN QUERY PLAN report for the SQL each route issues.
+
+Every read-only route is exercised through Flask's test client against the
+configured database. The statements it issues are captured and run again
+under EXPLAIN QUERY PLAN. Plans that scan a whole table ("SCAN <table>"
+without an index) are flagged unless the route is expected to list that
+entire table, and the script exits non-zero if any hot route is flagged.
+
+    python explain_report.py
+
+The plans are SQLite's; on other backends the report exits with status 2.
+"""
+import sys
+
+from sqlalchemy import event
+
+from app import create_app
+from models import db, Club, Student, Event
+from migrations import upgrade
+
+app = create_app()
+
+# Tables that are small and listed in full by design (filter dropdowns, club counts, single-row counters,
+# the few recommendations recommend.for_student picks before joining them to their events)
+ALWAYS_ALLOWED_SCANS = {'clubs', 'schema_version', 'catalog_version', 'best'}
+
+
+def _capture(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    return statements, record
+
+
+def _route_checks(club_id, student_id, event_id):
+    """(label, method, path, session, request kwargs, tables allowed to be scanned)"""
+    admin = {'admin_id': 1, 'user_type': 'admin'}
+    club = {'club_id': club_id, 'club_name': 'report', 'user_type': 'club'}
+    student = {'student_id': student_id, 'student_name': 'report', 'user_type': 'student'}
+    chat = lambda message: {'json': {'message': message}}
+    return [
+        ('admin_dashboard', 'GET', '/admin_dashboard', admin, {}, set()),
+        ('admin_dashboard (filtered)', 'GET', f'/admin_dashboard?club_id={club_id}&status=Pending', admin, {}, set()),
+        ('club_dashboard', 'GET', '/club_dashboard', club, {}, set()),
+        ('student_dashboard', 'GET', '/student_dashboard', student, {}, set()),
+        ('student_dashboard (credits)', 'GET', '/student_dashboard?credits=3', student, {}, set()),
+        ('register_event', 'GET', f'/register_event/{event_id}', student, {}, set()),
+        ('api_events', 'GET', '/api/events', student, {}, set()),
+        ('api_registrations (club)', 'GET', '/api/registrations', club, {}, set()),
+        ('student_login', 'POST', '/student_login', None,
+         {'data': {'reg_no': 'nobody', 'password': 'x'}}, set()),
+        ('club_login', 'POST', '/club_login', None,
+         {'data': {'club_name': 'nobody', 'password': 'x'}}, set()),
+        ('chatbot: events by credits', 'POST', '/chatbot_process', None, chat('show 3 credit events'), set()),
+        ('chatbot: events by club', 'POST', '/chatbot_process', None, chat('show events by club a'), set()),
+        ('chatbot: recommendations', 'POST', '/chatbot_process', None, chat('recommend something good'), set()),
+        ('chatbot: recommendations (student)', 'POST', '/chatbot_process', student,
+         chat('recommend something good'), set()),
+        ('chatbot: clubs', 'POST', '/chatbot_process', None, chat('what clubs are available'), set()),
+        ('chatbot: my credits', 'POST', '/chatbot_process', student, chat('how many credits do i have'), set()),
+        # Lists the whole catalog by design
+        ('chatbot: all events', 'POST', '/chatbot_process', None, chat('show all events'), {'events'}),
+    ]
+
+
+def explain(conn, statement, parameters):
+    rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    """Return table names scanned without an index in the given plan lines"""
+    tables = []
+    for detail in plan:
+        if detail.startswith('SCAN ') and 'USING' not in detail:
+            tables.append(detail.split()[1])
+    return tables
+
+
+def run_report(out=sys.stdout):
+    with app.app_context():
+        upgrade()
+        club_id = db.session.query(Club.id).order_by(Club.id).limit(1).scalar() or 1
+        student_id = db.session.query(Student.id).order_by(Student.id).limit(1).scalar() or 1
+        event_id = db.session.query(Event.id).order_by(Event.id).limit(1).scalar() or 1
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        print(f'explain_report reads SQLite query plans; the database is {engine.dialect.name}', file=out)
+        sys.exit(2)
+
+    client = app.test_client()
+    flagged = []
+    for label, method, path, session_data, kwargs, allowed in _route_checks(club_id, student_id, event_id):
+        with client.session_transaction() as sess:
+            sess.clear()
+            sess.update(session_data or {})
+
+        statements, record = _capture(engine)
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            client.open(path, method=method, **kwargs)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+        print(f'== {label} ({method} {path}): {len(statements)} queries', file=out)
+        with engine.connect() as conn:
+            for statement, parameters in statements:
+                plan = explain(conn, statement, parameters)
+                scans = [t for t in full_scans(plan) if t not in allowed | ALWAYS_ALLOWED_SCANS]
+                print('  ' + ' '.join(statement.split())[:160], file=out)
+                for detail in plan:
+                    print(f'    {detail}', file=out)
+                if scans:
+                    print(f'    !! full table scan on {", ".join(scans)}', file=out)
+                    flagged.append((label, scans))
+
+    print(file=out)
+    if flagged:
+        print(f'{len(flagged)} queries do full table scans:', file=out)
+        for label, scans in flagged:
+            print(f'  {label}: {", ".join(scans)}', file=out)
+    else:
+        print('No unexpected full table scans.', file=out)
+    return flagged
+
+
+if __name__ == '__main__':
+    sys.exit(1 if run_report() else 0)
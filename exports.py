@@ -0,0 +1,214 @@
+"""Streaming registration roster exports (CSV and XLSX).
+
+One query joins each registration to its student, event and club, and is
+read EXPORT_BATCH_SIZE rows at a time (yield_per, a server-side cursor
+where the driver has one). Every batch is encoded and handed to the
+response before the next is fetched, so memory stays flat however many
+registrations match.
+
+XLSX files are written through zipfile onto a sink the generator drains
+after each batch: the worksheet is one deflated zip member streamed row by
+row with inline strings, so no shared-strings table has to be held back
+until the end.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+
+from sqlalchemy import select
+
+from models import db, Club, Student, Event, Registration
+
+EXPORT_BATCH_SIZE = 1000
+
+COLUMNS = (
+    ('Registration ID', Registration.id),
+    ('Student', Student.name),
+    ('Reg No', Student.reg_no),
+    ('Email', Student.email),
+    ('Event', Event.event_name),
+    ('Club', Club.club_name),
+    ('Credits', Event.credits),
+    ('Status', Registration.status),
+    ('Registered At', Registration.registered_at),
+)
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+class InvalidDate(ValueError):
+    """Raised when a date range bound is not YYYY-MM-DD"""
+
+
+def parse_date_range(args):
+    """(start, end) datetimes from ?from= and ?to= (inclusive days); either may be None"""
+    bounds = []
+    for key, shift in (('from', 0), ('to', 1)):
+        value = args.get(key, '').strip()
+        if not value:
+            bounds.append(None)
+            continue
+        try:
+            bounds.append(datetime.strptime(value, '%Y-%m-%d') + timedelta(days=shift))
+        except ValueError as e:
+            raise InvalidDate(f'Invalid {key} date: {value!r} (expected YYYY-MM-DD)') from e
+    return tuple(bounds)
+
+
+def roster_query(club_id=None, event_id=None, status=None, credits=None, start=None, end=None):
+    """Registrations with their student, event and club, oldest first"""
+    stmt = (select(*(column for _, column in COLUMNS))
+            .select_from(Registration)
+            .join(Student, Registration.student_id == Student.id)
+            .join(Event, Registration.event_id == Event.id)
+            .join(Club, Event.club_id == Club.id))
+    if club_id is not None:
+        stmt = stmt.where(Event.club_id == club_id)
+    if event_id is not None:
+        stmt = stmt.where(Registration.event_id == event_id)
+    if status is not None:
+        stmt = stmt.where(Registration.status == status)
+    if credits is not None:
+        stmt = stmt.where(Event.credits == credits)
+    if start is not None:
+        stmt = stmt.where(Registration.registered_at >= start)
+    if end is not None:
+        stmt = stmt.where(Registration.registered_at < end)
+    return stmt.order_by(Registration.registered_at, Registration.id)
+
+
+def _batches(stmt):
+    result = db.session.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    return result.partitions()
+
+
+def _cell_text(value):
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def stream_csv(stmt):
+    """Yield the roster as CSV text, one chunk per batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in COLUMNS])
+    for batch in _batches(stmt):
+        writer.writerows([_cell_text(value) for value in row] for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, unseekable file that keeps bytes until drained; zipfile streams onto it"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+# Characters XML 1.0 does not allow, even escaped
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(number, values):
+    cells = []
+    for index, value in enumerate(values):
+        ref = f'{_column_letter(index)}{number}'
+        if value is None:
+            continue
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            text = escape(_XML_INVALID.sub('', str(_cell_text(value))))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{text}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+XLSX_PARTS = (
+    ('[Content_Types].xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+     '<Override PartName="/xl/worksheets/sheet1.xml" '
+     'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+     '</Types>'),
+    ('_rels/.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+     'Target="xl/workbook.xml"/>'
+     '</Relationships>'),
+    ('xl/workbook.xml',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+     'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+     '<sheets><sheet name="Registrations" sheetId="1" r:id="rId1"/></sheets>'
+     '</workbook>'),
+    ('xl/_rels/workbook.xml.rels',
+     '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" '
+     'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+     'Target="worksheets/sheet1.xml"/>'
+     '</Relationships>'),
+)
+
+
+def stream_xlsx(stmt):
+    """Yield the roster as an XLSX workbook, one chunk of zip bytes per batch"""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS:
+            archive.writestr(name, content)
+        # force_zip64: the sheet's size is unknown until it has been streamed
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                        b'<sheetData>')
+            sheet.write(_xlsx_row(1, [header for header, _ in COLUMNS]).encode())
+            number = 1
+            for batch in _batches(stmt):
+                rows = []
+                for row in batch:
+                    number += 1
+                    rows.append(_xlsx_row(number, row))
+                sheet.write(''.join(rows).encode())
+                yield sink.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+
+STREAMS = {'csv': stream_csv, 'xlsx': stream_xlsx}
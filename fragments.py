@@ -0,0 +1,76 @@
+"""Rendered-fragment cache and conditional responses keyed by the catalog version.
+
+The catalog version is a single-row counter in the database that every
+event or club write bumps in its own transaction (bump_catalog_version),
+so all web workers agree on it. Shared HTML, such as the student
+dashboard's event cards, is cached under (name, version, parameters) and
+never needs explicit invalidation: a write moves the version on and the
+old entries age out of the LRU. Per-user details are spliced into the
+cached HTML at overlay markers on each request.
+"""
+import hashlib
+import re
+
+from flask import Response, request
+from markupsafe import Markup
+
+from caching import LRUCache
+from models import db, catalog_version
+
+fragment_cache = LRUCache(maxsize=512, ttl=3600)
+
+# <!--overlay:42--> in a cached fragment is replaced by event 42's per-user overlay
+OVERLAY_RE = re.compile(r'<!--overlay:(\d+)-->')
+
+
+def overlay_marker(key):
+    return Markup(f'<!--overlay:{key}-->')
+
+
+def bump_catalog_version():
+    """Move the catalog version on; call before committing an event or club write"""
+    db.session.execute(catalog_version.update().values(version=catalog_version.c.version + 1))
+
+
+def current_catalog_version(session=None):
+    """The catalog version, read on session (default: the Flask-SQLAlchemy session)"""
+    return (session or db.session).execute(catalog_version.select()).scalar() or 0
+
+
+def cached_fragment(name, version, params, render):
+    """Return render() for (name, version, params), rendering only on a cache miss.
+
+    render returns a (html, extra) pair; extra holds whatever the caller needs
+    alongside the HTML (such as the ids of the rendered rows) and is cached with it.
+    """
+    key = (name, version, tuple(sorted(params.items())))
+    found, value = fragment_cache.get(key)
+    if not found:
+        value = render()
+        fragment_cache.set(key, value)
+    return value
+
+
+def apply_overlays(html, overlays):
+    """Replace every overlay marker in html with overlays[key] (empty if missing)"""
+    return Markup(OVERLAY_RE.sub(lambda match: overlays.get(int(match.group(1)), ''), html))
+
+
+def etag_for(*parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def not_modified(etag):
+    """A 304 response if the client already has this version of the page, else None"""
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        conditional_headers(response, etag)
+        return response
+    return None
+
+
+def conditional_headers(response, etag):
+    """Let browsers keep the page but revalidate it on every visit"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,355 @@
+"""Bulk import of students, clubs and events from CSV or JSON.
+
+Input is parsed as a stream and validated in batches. Uniqueness is checked
+against sets loaded with one SELECT per import, rows are inserted with
+executemany in one transaction per batch, and passwords are hashed with
+the deployment's hashing policy in a process pool. Every rejected row is reported with its row number.
+
+    python importer.py students students.csv
+    python importer.py events events.json --batch-size 2000 --workers 4
+
+CSV needs a header row. JSON may be a top-level array of objects or one
+object per line (JSON Lines).
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import counters
+import fragments
+import passwords
+from models import db, Club, Student, Event
+
+DEFAULT_BATCH_SIZE = 1000
+JSON_CHUNK_SIZE = 64 * 1024
+
+REQUIRED_FIELDS = {
+    'students': ('name', 'reg_no', 'email', 'password'),
+    'clubs': ('club_name', 'password'),
+    'events': ('club_name', 'event_name', 'description', 'credits'),
+}
+
+
+class ImportFileError(ValueError):
+    """Raised when an import file cannot be parsed at all"""
+
+
+class ImportReport:
+    """Outcome of an import: inserted row count and (row number, message) errors"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows_read = 0
+        self.inserted = 0
+        self.errors = []
+
+    def error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def summary(self):
+        return (f'{self.kind}: read {self.rows_read} row(s), inserted {self.inserted}, '
+                f'rejected {len(self.errors)}')
+
+
+def iter_csv_records(stream):
+    """Yield (row number, dict) for each CSV data row; the header is row 1"""
+    reader = csv.DictReader(stream)
+    for row_number, row in enumerate(reader, start=2):
+        yield row_number, row
+
+
+def _iter_lines(buffer, stream, chunk_size):
+    while True:
+        chunk = stream.read(chunk_size)
+        lines = (buffer + chunk).split('\n')
+        buffer = lines.pop() if chunk else ''
+        yield from lines
+        if not chunk:
+            return
+
+
+def iter_json_records(stream, chunk_size=JSON_CHUNK_SIZE):
+    """Yield (record number, dict) from a JSON array or JSON Lines stream without loading it whole"""
+    buffer = stream.read(chunk_size).lstrip()
+    record_number = 0
+
+    if not buffer.startswith('['):
+        # JSON Lines: one object per line
+        for line in _iter_lines(buffer, stream, chunk_size):
+            if not line.strip():
+                continue
+            record_number += 1
+            try:
+                yield record_number, json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ImportFileError(f'Record {record_number}: invalid JSON ({e.msg})') from e
+        return
+
+    # Top-level array: decode one element at a time, reading more when one is cut off
+    decoder = json.JSONDecoder()
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            record, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ImportFileError(f'Record {record_number + 1}: invalid JSON ({e.msg})') from e
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        record_number += 1
+        yield record_number, record
+        buffer = buffer[end:]
+
+
+def _read_errors(records, label, number):
+    """Yield from records, raising decoding and CSV errors as ImportFileError at the record they hit.
+
+    Text is decoded a chunk at a time, so a byte that is not UTF-8 is
+    reported at the first record not read yet; it may be a few further on.
+    """
+    try:
+        for record in records:
+            yield record
+            number = record[0] + 1
+    except UnicodeDecodeError as e:
+        raise ImportFileError(f'{label} {number}: the file is not UTF-8 text ({e.reason})') from e
+    except csv.Error as e:
+        raise ImportFileError(f'{label} {number}: invalid CSV ({e})') from e
+
+
+def iter_records(stream, file_format):
+    if file_format == 'csv':
+        return _read_errors(iter_csv_records(stream), 'Row', 2)
+    if file_format == 'json':
+        return _read_errors(iter_json_records(stream), 'Record', 1)
+    raise ImportFileError(f'Unsupported format: {file_format}')
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename or '')[1].lower()
+    return {'.csv': 'csv', '.json': 'json', '.jsonl': 'json', '.ndjson': 'json'}.get(extension)
+
+
+def _batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _clean(record, fields):
+    """Return the required fields stripped, or raise ValueError naming the missing ones"""
+    if not isinstance(record, dict):
+        raise ValueError('expected an object with named fields')
+    values = {}
+    for field in fields:
+        value = record.get(field)
+        values[field] = '' if value is None else str(value).strip()
+    missing = [field for field, value in values.items() if not value]
+    if missing:
+        raise ValueError(f'missing {", ".join(missing)}')
+    return values
+
+
+def _password_hasher(pool, workers):
+    """Return a function hashing a list of passwords, in the pool when there is one"""
+    hash_one = passwords.hasher()
+
+    def hash_all(plaintexts):
+        if pool is None:
+            return [hash_one(password) for password in plaintexts]
+        chunksize = max(1, len(plaintexts) // (workers * 4))
+        return list(pool.map(hash_one, plaintexts, chunksize=chunksize))
+    return hash_all
+
+
+def _import_students(batches, report, hash_passwords):
+    # One SELECT for every existing reg_no and email; later checks are set lookups
+    existing = db.session.query(Student.reg_no, Student.email).all()
+    reg_nos = {reg_no for reg_no, _ in existing}
+    emails = {email.lower() for _, email in existing}
+
+    for batch in batches:
+        rows = []
+        for row_number, record in batch:
+            report.rows_read += 1
+            try:
+                values = _clean(record, REQUIRED_FIELDS['students'])
+            except ValueError as e:
+                report.error(row_number, str(e))
+                continue
+            email = values['email'].lower()
+            if values['reg_no'] in reg_nos:
+                report.error(row_number, f"register number {values['reg_no']} already exists")
+                continue
+            if email in emails:
+                report.error(row_number, f"email {values['email']} already exists")
+                continue
+            reg_nos.add(values['reg_no'])
+            emails.add(email)
+            rows.append(values)
+
+        if rows:
+            hashes = hash_passwords([row['password'] for row in rows])
+            for row, password_hash in zip(rows, hashes):
+                row['password'] = password_hash
+            db.session.execute(db.insert(Student), rows)
+            db.session.commit()
+            report.inserted += len(rows)
+
+
+def _import_clubs(batches, report, hash_passwords):
+    names = {name.lower() for (name,) in db.session.query(Club.club_name)}
+
+    for batch in batches:
+        rows = []
+        for row_number, record in batch:
+            report.rows_read += 1
+            try:
+                values = _clean(record, REQUIRED_FIELDS['clubs'])
+            except ValueError as e:
+                report.error(row_number, str(e))
+                continue
+            if values['club_name'].lower() in names:
+                report.error(row_number, f"club {values['club_name']} already exists")
+                continue
+            names.add(values['club_name'].lower())
+            rows.append(values)
+
+        if rows:
+            hashes = hash_passwords([row['password'] for row in rows])
+            for row, password_hash in zip(rows, hashes):
+                row['password'] = password_hash
+            db.session.execute(db.insert(Club), rows)
+            fragments.bump_catalog_version()
+            db.session.commit()
+            report.inserted += len(rows)
+
+
+def _import_events(batches, report, hash_passwords):
+    club_ids = {name.lower(): club_id for club_id, name in db.session.query(Club.id, Club.club_name)}
+
+    for batch in batches:
+        rows = []
+        for row_number, record in batch:
+            report.rows_read += 1
+            try:
+                values = _clean(record, REQUIRED_FIELDS['events'])
+            except ValueError as e:
+                report.error(row_number, str(e))
+                continue
+            try:
+                credits = int(values['credits'])
+            except ValueError:
+                report.error(row_number, 'credits must be a whole number')
+                continue
+            # Optional: blank, null or absent means unlimited. Checked before converting,
+            # so a JSON 0 is refused like "0" instead of reading as blank
+            capacity = record.get('capacity')
+            if isinstance(capacity, str):
+                capacity = capacity.strip() or None
+            if capacity is not None:
+                if isinstance(capacity, bool) or not str(capacity).isdigit() or int(capacity) < 1:
+                    report.error(row_number, 'capacity must be a positive whole number')
+                    continue
+                capacity = int(capacity)
+            club_id = club_ids.get(values['club_name'].lower())
+            if club_id is None:
+                report.error(row_number, f"club {values['club_name']} does not exist")
+                continue
+            rows.append({
+                'club_id': club_id,
+                'event_name': values['event_name'],
+                'description': values['description'],
+                'credits': credits,
+                'capacity': capacity,
+                'seats_taken': 0,
+            })
+
+        if rows:
+            db.session.execute(db.insert(Event), rows)
+            for club_id, count in Counter(row['club_id'] for row in rows).items():
+                counters.events_added(club_id, count)
+            fragments.bump_catalog_version()
+            db.session.commit()
+            report.inserted += len(rows)
+
+
+IMPORTERS = {
+    'students': _import_students,
+    'clubs': _import_clubs,
+    'events': _import_events,
+}
+
+
+def import_stream(kind, stream, file_format, batch_size=DEFAULT_BATCH_SIZE, workers=None):
+    """Import records of kind ('students', 'clubs' or 'events') from a text stream"""
+    if kind not in IMPORTERS:
+        raise ImportFileError(f'Unknown import kind: {kind}')
+    report = ImportReport(kind)
+    batches = _batches(iter_records(stream, file_format), batch_size)
+
+    # Students and clubs carry passwords that need hashing
+    workers = os.cpu_count() if workers is None else workers
+    hashing = kind in ('students', 'clubs')
+    pool = ProcessPoolExecutor(max_workers=workers) if hashing and workers > 1 else None
+    try:
+        IMPORTERS[kind](batches, report, _password_hasher(pool, workers))
+    except ImportFileError as e:
+        db.session.rollback()
+        report.error(None, str(e))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bulk import students, clubs or events.')
+    parser.add_argument('kind', choices=sorted(IMPORTERS))
+    parser.add_argument('path')
+    parser.add_argument('--format', choices=['csv', 'json'], help='defaults to the file extension')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='password hashing processes (default: CPU count, 0 or 1 hashes inline)')
+    args = parser.parse_args(argv)
+
+    file_format = args.format or detect_format(args.path)
+    if file_format is None:
+        parser.error('cannot tell the format from the file name; pass --format')
+
+    from app import create_app
+    from caching import invalidate_catalog
+    from migrations import upgrade
+
+    with create_app(views=False).app_context(), open(args.path, newline='', encoding='utf-8-sig') as stream:
+        upgrade()
+        report = import_stream(args.kind, stream, file_format, args.batch_size, args.workers)
+    invalidate_catalog()
+
+    for row_number, message in report.errors:
+        print(f'row {row_number}: {message}' if row_number else message, file=sys.stderr)
+    print(report.summary())
+    return 0 if report.ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
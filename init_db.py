@@ -1,16 +1,22 @@
-from app import app, db, Club, Student, Event, Registration
+from app import create_app
+from models import db, Club, Student, Event, Registration
+from migrations import upgrade
+import counters
+import ledger
+import recommend
 from werkzeug.security import generate_password_hash
 
 def initialize_database():
-    with app.app_context():
+    with create_app(views=False).app_context():
         # Drop all tables and recreate them
         db.drop_all()
-        db.create_all()
+        upgrade()
         
         # Create initial clubs
         clubs = ['Club A', 'Club B', 'Club C', 'Club D', 'Club E']
         for club_name in clubs:
-            club = Club(club_name=club_name, password='1234')
+            club = Club(club_name=club_name)
+            club.set_password('1234')
             db.session.add(club)
         
         # Create sample students
@@ -67,6 +73,11 @@ def initialize_database():
             reg2 = Registration(student_id=student2.id, event_id=event1.id, status='Accepted')
             db.session.add(reg2)
         
+        # The samples were inserted directly, so count them in one pass
+        db.session.flush()
+        counters.recount(db.session.connection())
+        ledger.recompute(db.session.connection())
+        recommend.rebuild(db.session.connection())
         db.session.commit()
         
         print("Database initialized successfully!")
@@ -0,0 +1,229 @@
+"""Per-endpoint request latency, SQL and template instrumentation.
+
+Request hooks time each request, engine listeners count the SQL statements
+it issues and their total time, and Flask's template signals time rendering.
+Everything is aggregated into in-memory histograms per endpoint and rendered
+in the Prometheus text format by the admin-only /metrics route.
+
+When SLOW_REQUEST_THRESHOLD_MS is set, any request slower than that is
+logged to the 'instrumentation.slow' logger together with the SQL it ran.
+"""
+import logging
+import threading
+import time
+
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_logger = logging.getLogger('instrumentation.slow')
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# Longest SQL text kept per statement in the slow-request log
+MAX_LOGGED_SQL = 2000
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style (not thread-safe by itself)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        """Yield (upper bound, observations <= bound), ending with +Inf"""
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+        yield float('inf'), self.count
+
+
+# (metric name, help text, buckets, per-request value key)
+HISTOGRAMS = (
+    ('campus_request_duration_seconds', 'Request wall time', SECONDS_BUCKETS, 'duration'),
+    ('campus_request_sql_statements', 'SQL statements per request', COUNT_BUCKETS, 'sql_count'),
+    ('campus_request_sql_duration_seconds', 'Total SQL time per request', SECONDS_BUCKETS, 'sql_time'),
+    ('campus_request_template_duration_seconds', 'Template render time per request',
+     SECONDS_BUCKETS, 'template_time'),
+)
+
+
+class Metrics:
+    """Thread-safe registry of per-endpoint histograms and request counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._requests = {}
+            self._slow_requests = 0
+
+    def record(self, endpoint, method, status, values, slow=False):
+        with self._lock:
+            histograms = self._histograms.get(endpoint)
+            if histograms is None:
+                histograms = self._histograms[endpoint] = {
+                    name: Histogram(buckets) for name, _, buckets, _ in HISTOGRAMS}
+            for name, _, _, key in HISTOGRAMS:
+                histograms[name].observe(values[key])
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if slow:
+                self._slow_requests += 1
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, help_text, _, _ in HISTOGRAMS:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for endpoint in sorted(self._histograms):
+                    histogram = self._histograms[endpoint][name]
+                    label = f'endpoint="{_escape(endpoint)}"'
+                    for bound, count in histogram.cumulative():
+                        le = '+Inf' if bound == float('inf') else repr(float(bound))
+                        lines.append(f'{name}_bucket{{{label},le="{le}"}} {count}')
+                    lines.append(f'{name}_sum{{{label}}} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{{{label}}} {histogram.count}')
+
+            lines.append('# HELP campus_requests_total Requests handled')
+            lines.append('# TYPE campus_requests_total counter')
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append(f'campus_requests_total{{endpoint="{_escape(endpoint)}",'
+                             f'method="{method}",status="{status}"}} {count}')
+
+            lines.append('# HELP campus_slow_requests_total Requests over SLOW_REQUEST_THRESHOLD_MS')
+            lines.append('# TYPE campus_slow_requests_total counter')
+            lines.append(f'campus_slow_requests_total {self._slow_requests}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()
+
+
+def _state():
+    """The current request's measurements, or None outside an instrumented request"""
+    if not has_request_context():
+        return None
+    return g.get('_instrumentation')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _state() is not None:
+        context._instrumentation_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    state = _state()
+    start = getattr(context, '_instrumentation_start', None)
+    if state is None or start is None:
+        return
+    elapsed = time.perf_counter() - start
+    state['sql_count'] += 1
+    state['sql_time'] += elapsed
+    if state['statements'] is not None:
+        state['statements'].append((elapsed, statement))
+
+
+def _before_render(sender, template, context, **extra):
+    state = _state()
+    if state is not None:
+        state['render_starts'].append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    state = _state()
+    if state is not None and state['render_starts']:
+        state['template_time'] += time.perf_counter() - state['render_starts'].pop()
+
+
+def _start_request(threshold):
+    g._instrumentation = {
+        'start': time.perf_counter(),
+        'sql_count': 0,
+        'sql_time': 0.0,
+        'template_time': 0.0,
+        'render_starts': [],
+        # SQL text is only kept when the slow-request log is on
+        'statements': [] if threshold is not None else None,
+        'threshold': threshold,
+        'status': None,
+    }
+
+
+def _note_status(response):
+    state = _state()
+    if state is not None:
+        state['status'] = response.status_code
+    return response
+
+
+def _finish_request(exc):
+    state = g.pop('_instrumentation', None)
+    if state is None:
+        return
+    duration = time.perf_counter() - state['start']
+    state['duration'] = duration
+    endpoint = request.endpoint or '<unmatched>'
+    status = state['status'] or 500
+    threshold = state['threshold']
+    slow = threshold is not None and duration * 1000 >= threshold
+    metrics.record(endpoint, request.method, status, state, slow)
+    if slow:
+        _log_slow_request(endpoint, status, state)
+
+
+def _log_slow_request(endpoint, status, state):
+    statements = '\n'.join(f'  {elapsed * 1000:8.2f}ms  {" ".join(sql.split())[:MAX_LOGGED_SQL]}'
+                           for elapsed, sql in state['statements'])
+    slow_logger.warning('Slow request %s %s (%s) %d: %.1fms total, %d SQL statement(s) in %.1fms, '
+                        'templates %.1fms\n%s',
+                        request.method, request.full_path.rstrip('?'), endpoint, status,
+                        state['duration'] * 1000, state['sql_count'], state['sql_time'] * 1000,
+                        state['template_time'] * 1000, statements)
+
+
+_listeners_installed = False
+
+
+def init_app(app):
+    """Instrument every request of app and every SQL statement issued on its engines"""
+    global _listeners_installed
+    app.config.setdefault('SLOW_REQUEST_THRESHOLD_MS', None)
+
+    @app.before_request
+    def start_instrumentation():
+        _start_request(app.config['SLOW_REQUEST_THRESHOLD_MS'])
+
+    app.after_request(_note_status)
+    app.teardown_request(_finish_request)
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    # Listen on the Engine class so every engine (and every pool connection) is covered
+    if not _listeners_installed:
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listeners_installed = True
@@ -0,0 +1,174 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Structured result of classifying a chatbot message
+Intent = namedtuple('Intent', ['name', 'credits', 'club_name', 'topic'], defaults=(None, None, None))
+
+# Intent names, in the order the chatbot used to try them
+CLUBS = 'clubs'
+EVENTS_BY_CREDITS = 'events_by_credits'
+EVENTS_BY_CLUB = 'events_by_club'
+ALL_EVENTS = 'all_events'
+REGISTRATION_HELP = 'registration_help'
+RECOMMENDATIONS = 'recommendations'
+SEARCH = 'search'
+MY_CREDITS = 'my_credits'
+FALLBACK = 'fallback'
+
+# Feature bits set by individual words
+CLUB_TOPIC = 1 << 0      # the message is about clubs
+LIST_CUE = 1 << 1        # asks to show or list something
+EVENT_CUE = 1 << 2       # could be about events ("show", "what" count too)
+EVENT_NOUN = 1 << 3      # mentions events explicitly
+ALL_CUE = 1 << 4         # asks for everything
+REGISTRATION = 1 << 5    # asks about the registration process
+RECOMMEND = 1 << 6       # asks for suggestions
+SEARCH_CUE = 1 << 7      # asks to find events on a topic
+SELF_CUE = 1 << 8        # asks about the user themselves
+CREDIT_NOUN = 1 << 9     # mentions credits
+
+_WORD_FEATURES = {
+    CLUB_TOPIC: ['club', 'clubs', 'available', 'list'],
+    LIST_CUE: ['what', 'show', 'list', 'available'],
+    EVENT_CUE: ['event', 'events', 'show', 'what'],
+    EVENT_NOUN: ['event', 'events'],
+    ALL_CUE: ['what', 'show', 'list', 'available', 'all'],
+    REGISTRATION: ['register', 'registers', 'registered', 'registering', 'registration',
+                   'registrations', 'process', 'signup', 'enroll', 'enrol'],
+    RECOMMEND: ['recommend', 'recommends', 'recommended', 'recommendation', 'recommendations',
+                'best', 'suggest', 'suggestion', 'suggestions', 'good'],
+    SEARCH_CUE: ['find', 'search', 'about', 'regarding', 'involving', 'related'],
+    SELF_CUE: ['i', 'my', 'mine', 'ive'],
+    CREDIT_NOUN: ['credit', 'credits'],
+}
+
+# Token -> feature bits, built once so classification is one dict lookup per word
+TOKEN_FEATURES = {}
+for _feature, _words in _WORD_FEATURES.items():
+    for _word in _words:
+        TOKEN_FEATURES[_word] = TOKEN_FEATURES.get(_word, 0) | _feature
+
+# Two-word phrases, checked against the space-normalized message
+PHRASE_FEATURES = {
+    ' sign up ': REGISTRATION,
+    ' how to ': REGISTRATION,
+}
+
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+# Everything after the last topic marker is the search topic
+TOPIC_RE = re.compile(r'.* (?:about|regarding|involving|related to|search for|search|find) (.+)')
+# Filler words dropped from a search topic
+TOPIC_STOPWORDS = frozenset(['me', 'some', 'any', 'all', 'the', 'a', 'an', 'on', 'for', 'to',
+                             'event', 'events', 'please', 'that', 'are', 'is'])
+CREDITS_RE = re.compile(r'(\d+) ?credit')
+
+
+def normalize(text):
+    """Lowercase and split into alphanumeric tokens"""
+    tokens = []
+    for token in text.lower().split():
+        if token.isalnum():
+            tokens.append(token)
+        else:
+            # Rare path: punctuation attached to or inside the word
+            tokens.extend(NON_WORD_RE.sub(' ', token).split())
+    return tokens
+
+
+@lru_cache(maxsize=16)
+def compile_club_matcher(club_names):
+    """Build (first tokens, pattern, {normalized name: name}) for the known clubs"""
+    if not club_names:
+        return frozenset(), None, {}
+    clubs = {' '.join(normalize(name)): name for name in club_names}
+    first_tokens = frozenset(name.split()[0] for name in clubs)
+    # Longest first so "club ab" wins over "club a"
+    alternation = '|'.join(map(re.escape, sorted(clubs, key=len, reverse=True)))
+    return first_tokens, re.compile(f' ({alternation}) '), clubs
+
+
+def scan(message, club_names=()):
+    """One pass over the message returning (feature bits, credits, club name, normalized text)"""
+    get = TOKEN_FEATURES.get
+    features = 0
+    tokens = []
+    for token in message.lower().split():
+        if not token.isalnum():
+            # Rare path: punctuation attached to or inside the word
+            pieces = NON_WORD_RE.sub(' ', token).split()
+            tokens.extend(pieces)
+            for piece in pieces:
+                features |= get(piece, 0)
+            continue
+        tokens.append(token)
+        features |= get(token, 0)
+
+    text = ' ' + ' '.join(tokens) + ' '
+    for phrase, feature in PHRASE_FEATURES.items():
+        if phrase in text:
+            features |= feature
+
+    credits = None
+    if 'credit' in text:
+        match = CREDITS_RE.search(text)
+        if match:
+            credits = int(match.group(1))
+
+    club_name = None
+    first_tokens, pattern, clubs = compile_club_matcher(tuple(club_names))
+    if pattern is not None and not first_tokens.isdisjoint(tokens):
+        match = pattern.search(text)
+        if match:
+            club_name = clubs[match.group(1)]
+            features |= CLUB_TOPIC
+
+    return features, credits, club_name, text
+
+
+def extract_topic(text):
+    """Return the search topic from a space-normalized message, if it names one"""
+    match = TOPIC_RE.match(text)
+    if not match:
+        return None
+    words = [word for word in match.group(1).split() if word not in TOPIC_STOPWORDS]
+    return ' '.join(words) or None
+
+
+def classify(message, club_names=()):
+    """Classify a chatbot message into an Intent with its credits and club slots"""
+    features, credits, club_name, text = scan(message, club_names)
+
+    # "how many credits do I have", but not "what events can I take for credits"
+    if (features & CREDIT_NOUN and features & SELF_CUE and credits is None and not club_name
+            and not (features & EVENT_NOUN and features & LIST_CUE)):
+        return Intent(MY_CREDITS, None, None)
+
+    # "find events about robotics"
+    if features & SEARCH_CUE and credits is None and not club_name:
+        topic = extract_topic(text)
+        if topic:
+            return Intent(SEARCH, topic=topic)
+
+    # "show events by Club A" asks for that club's events, not the club list
+    if club_name and features & EVENT_NOUN and credits is None:
+        return Intent(EVENTS_BY_CLUB, None, club_name)
+
+    if features & CLUB_TOPIC and features & LIST_CUE:
+        return Intent(CLUBS, None, None)
+
+    if features & EVENT_CUE:
+        if credits is not None:
+            return Intent(EVENTS_BY_CREDITS, credits, None)
+        if club_name:
+            return Intent(EVENTS_BY_CLUB, None, club_name)
+        if features & ALL_CUE:
+            return Intent(ALL_EVENTS, None, None)
+
+    if features & REGISTRATION:
+        return Intent(REGISTRATION_HELP, None, None)
+
+    if features & RECOMMEND:
+        return Intent(RECOMMENDATIONS, credits, None)
+
+    return Intent(FALLBACK, None, None)
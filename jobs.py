@@ -0,0 +1,240 @@
+"""Background jobs stored in the application database.
+
+A request enqueues a job (a row in the jobs table) in its own transaction
+and returns straight away with the job id; a Worker's threads claim due
+jobs and run their handlers, registered with @handler(kind). Run workers
+in the web process (JOB_WORKER_THREADS when started with python app.py)
+or as separate processes:
+
+    python jobs.py [--threads N] [--burst]
+
+Claiming is a conditional UPDATE on the job's attempt count, so two
+workers never run the same attempt. The claim takes a lease of
+JOB_LEASE_SECONDS; if the worker dies the job is claimed again once the
+lease expires. A handler's database writes commit in the same transaction
+that marks the job done, and only if the job still belongs to that
+attempt, so a job's writes apply at most once. Failed attempts are
+retried with exponential backoff until max_attempts, then the job is
+failed. Anything a handler does outside the database (such as sending an
+email) may still repeat after a crash and must tolerate that.
+
+Enqueueing twice with the same idempotency key returns the first job, so
+a double-submitted form or a retried fan-out does not queue duplicates.
+"""
+import argparse
+import json
+import logging
+import signal
+import sys
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+DEFAULTS = {
+    'JOB_WORKER_THREADS': 1,
+    'JOB_POLL_INTERVAL': 0.5,     # seconds an idle worker thread waits between claims
+    'JOB_LEASE_SECONDS': 300,     # a running job is reclaimed if not finished by then
+    'JOB_RETRY_BACKOFF': 2.0,     # first retry delay in seconds, doubled each attempt
+}
+
+# kind -> (function taking the Job and returning a JSON-serializable result, max attempts)
+HANDLERS = {}
+
+
+def handler(kind, max_attempts=5):
+    """Register the decorated function as the handler for jobs of this kind"""
+    def decorator(func):
+        HANDLERS[kind] = (func, max_attempts)
+        return func
+    return decorator
+
+
+def enqueue(kind, payload=None, idempotency_key=None, owner=None, delay=0):
+    """Add a job to the caller's transaction and return it; the caller commits.
+
+    With an idempotency_key, an existing job with that key is returned
+    instead of adding another.
+    """
+    if kind not in HANDLERS:
+        raise ValueError(f'No handler registered for job kind {kind!r}')
+    if idempotency_key is not None:
+        existing = Job.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return existing
+
+    job = Job(kind=kind, payload=json.dumps(payload or {}), owner=owner,
+              idempotency_key=idempotency_key, max_attempts=HANDLERS[kind][1],
+              run_at=datetime.utcnow() + timedelta(seconds=delay))
+    try:
+        # A savepoint, so losing an idempotency race leaves the caller's transaction intact
+        with db.session.begin_nested():
+            db.session.add(job)
+    except IntegrityError:
+        return Job.query.filter_by(idempotency_key=idempotency_key).one()
+    return job
+
+
+def _due(now):
+    return or_(and_(Job.status == QUEUED, Job.run_at <= now),
+               and_(Job.status == RUNNING, Job.locked_until < now))
+
+
+def claim(lease_seconds):
+    """Take the next due job for one attempt and commit; returns (job id, attempt) or None"""
+    now = datetime.utcnow()
+    while True:
+        candidate = db.session.execute(
+            select(Job.id, Job.attempts).where(_due(now)).order_by(Job.run_at, Job.id).limit(1)).first()
+        if candidate is None:
+            db.session.rollback()
+            return None
+        job_id, attempts = candidate
+        result = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.attempts == attempts, _due(now))
+            .values(status=RUNNING, attempts=attempts + 1,
+                    locked_until=now + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False))
+        db.session.commit()
+        if result.rowcount == 1:
+            return job_id, attempts + 1
+        # Another worker claimed it first; try the next one
+
+
+def _settle(job_id, attempt, **values):
+    """Update the job if this attempt still owns it; False if it was reclaimed meanwhile"""
+    result = db.session.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.attempts == attempt, Job.status == RUNNING)
+        .values(**values)
+        .execution_options(synchronize_session=False))
+    return result.rowcount == 1
+
+
+def run_job(job_id, attempt, config):
+    """Run one claimed attempt of a job; call inside an app context"""
+    job = db.session.get(Job, job_id)
+    if job.attempts > job.max_attempts:
+        # Its last worker died mid-attempt
+        _settle(job_id, attempt, status=FAILED, error='Lease expired on the last attempt',
+                finished_at=datetime.utcnow())
+        db.session.commit()
+        return FAILED
+
+    func, _ = HANDLERS.get(job.kind, (None, None))
+    try:
+        if func is None:
+            raise LookupError(f'No handler registered for job kind {job.kind!r}')
+        result = func(job)
+        if not _settle(job_id, attempt, status=DONE, result=json.dumps(result),
+                       error=None, finished_at=datetime.utcnow()):
+            db.session.rollback()
+            logger.warning('Job %s attempt %s was reclaimed before it finished; discarded', job_id, attempt)
+            return None
+        db.session.commit()
+        return DONE
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('Job %s (%s) attempt %s failed', job_id, job.kind, attempt)
+        if attempt >= job.max_attempts:
+            values = {'status': FAILED, 'finished_at': datetime.utcnow()}
+        else:
+            delay = config.get('JOB_RETRY_BACKOFF', DEFAULTS['JOB_RETRY_BACKOFF']) * 2 ** (attempt - 1)
+            values = {'status': QUEUED, 'run_at': datetime.utcnow() + timedelta(seconds=delay)}
+        _settle(job_id, attempt, error=f'{type(e).__name__}: {e}', locked_until=None, **values)
+        db.session.commit()
+        return values['status']
+
+
+def run_next(app):
+    """Claim and run one due job; returns False if none was due"""
+    with app.app_context():
+        lease = app.config.get('JOB_LEASE_SECONDS', DEFAULTS['JOB_LEASE_SECONDS'])
+        claimed = claim(lease)
+        if claimed is None:
+            return False
+        run_job(*claimed, app.config)
+        return True
+
+
+class Worker:
+    """A pool of threads running due jobs until stop() is called"""
+
+    def __init__(self, app, threads=None):
+        self.app = app
+        self.threads = threads or app.config.get('JOB_WORKER_THREADS', DEFAULTS['JOB_WORKER_THREADS'])
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', DEFAULTS['JOB_POLL_INTERVAL'])
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                busy = run_next(self.app)
+            except Exception:
+                # Such as the database being unreachable; the job stays claimable
+                logger.exception('Job worker iteration failed')
+                busy = False
+            if not busy:
+                self._stopping.wait(self.poll_interval)
+
+    def start(self):
+        for number in range(self.threads):
+            thread = threading.Thread(target=self._loop, name=f'job-worker-{number}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def drain(self):
+        """Run due jobs on the calling thread until none are left"""
+        count = 0
+        while run_next(self.app):
+            count += 1
+        return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run background jobs from the jobs table.')
+    parser.add_argument('--threads', type=int, help='worker threads (default JOB_WORKER_THREADS)')
+    parser.add_argument('--burst', action='store_true', help='run the jobs that are due, then exit')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(threadName)s %(levelname)s %(message)s')
+
+    from app import create_app
+
+    worker = Worker(create_app(views=False), threads=args.threads)
+    if args.burst:
+        print(f'Ran {worker.drain()} job(s).')
+        return 0
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    worker.start()
+    logger.info('Running %d worker thread(s); Ctrl+C to stop', worker.threads)
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    worker.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    # Handlers register on the importable jobs module, not on this __main__ copy of it
+    import jobs
+    sys.exit(jobs.main())
@@ -0,0 +1,150 @@
+"""Student credit ledger: credits earned from Accepted registrations.
+
+Student.credits_earned is a running total kept the way counters.py keeps
+its counts: every write path that moves a registration into or out of
+Accepted adds or takes back the event's credits with one UPDATE in the
+same transaction, so reading a student's credits is a primary-key lookup
+instead of a scan of their registrations.
+
+Each credit is recorded as a CreditEntry keyed by the registration, and
+totals only ever change by the entries actually inserted or deleted: a
+registration cannot be credited twice (the second insert violates the
+primary key), and taking back credits it never earned does nothing.
+verify() recomputes every total from the source tables to detect and
+repair drift:
+
+    python ledger.py           # report drifted totals, exit 1 if any
+    python ledger.py --repair  # and fix them
+"""
+import argparse
+import sys
+
+from sqlalchemy import delete, func, insert, select, update
+
+from models import db, CreditEntry, Student, Event, Registration
+
+ACCEPTED = 'Accepted'
+
+
+def credit_registrations(registration_ids):
+    """Credit these registrations, just moved into Accepted, to their students"""
+    if not registration_ids:
+        return
+    db.session.execute(
+        insert(CreditEntry).from_select(
+            ['registration_id', 'student_id', 'credits'],
+            select(Registration.id, Registration.student_id, Event.credits)
+            .join(Event, Registration.event_id == Event.id)
+            .where(Registration.id.in_(registration_ids))))
+    _apply_entries(CreditEntry.registration_id.in_(registration_ids), 1)
+
+
+def debit_registrations(registration_ids):
+    """Take back the credits of these registrations, just moved out of Accepted"""
+    if registration_ids:
+        _take_back(CreditEntry.registration_id.in_(registration_ids))
+
+
+def status_changed(registration_id, old_status, new_status):
+    """Credit or debit a registration's student if a status change crosses Accepted"""
+    if new_status == ACCEPTED and old_status != ACCEPTED:
+        credit_registrations([registration_id])
+    elif old_status == ACCEPTED and new_status != ACCEPTED:
+        debit_registrations([registration_id])
+
+
+def club_deleted(club_id):
+    """Take back the credits of a club's Accepted registrations; call before deleting them"""
+    club_registrations = (select(Registration.id)
+                          .join(Event, Registration.event_id == Event.id)
+                          .where(Event.club_id == club_id))
+    _take_back(CreditEntry.registration_id.in_(club_registrations))
+
+
+def _apply_entries(condition, sign):
+    """Add the credits of the entries matching condition to their students' totals, or take them back"""
+    credits = (select(func.sum(CreditEntry.credits))
+               .where(CreditEntry.student_id == Student.id, condition)
+               .scalar_subquery())
+    total = Student.credits_earned + credits if sign > 0 else Student.credits_earned - credits
+    db.session.execute(
+        update(Student)
+        .where(Student.id.in_(select(CreditEntry.student_id).where(condition)))
+        .values(credits_earned=total)
+        .execution_options(synchronize_session=False))
+
+
+def _take_back(condition):
+    """Debit the entries matching condition and delete them"""
+    _apply_entries(condition, -1)
+    db.session.execute(delete(CreditEntry).where(condition).execution_options(synchronize_session=False))
+
+
+def _earned():
+    """Correlated subquery summing a student's credits from their Accepted registrations"""
+    return (select(func.coalesce(func.sum(Event.credits), 0))
+            .select_from(Registration)
+            .join(Event, Registration.event_id == Event.id)
+            .where(Registration.student_id == Student.id, Registration.status == ACCEPTED)
+            .scalar_subquery())
+
+
+def recompute(conn, student_ids=None):
+    """Rebuild credit entries and totals from the registrations, for the given students or for everyone.
+
+    Runs in the caller's transaction: the entries are deleted and inserted
+    again from the Accepted registrations, then each total is set to the
+    sum of its student's entries.
+    """
+    if student_ids is not None and not student_ids:
+        return
+    delete_entries = delete(CreditEntry)
+    accepted = (select(Registration.id, Registration.student_id, Event.credits)
+                .join(Event, Registration.event_id == Event.id)
+                .where(Registration.status == ACCEPTED))
+    totals = update(Student).values(credits_earned=(
+        select(func.coalesce(func.sum(CreditEntry.credits), 0))
+        .where(CreditEntry.student_id == Student.id)
+        .scalar_subquery()))
+    if student_ids is not None:
+        delete_entries = delete_entries.where(CreditEntry.student_id.in_(student_ids))
+        accepted = accepted.where(Registration.student_id.in_(student_ids))
+        totals = totals.where(Student.id.in_(student_ids))
+    conn.execute(delete_entries)
+    conn.execute(insert(CreditEntry).from_select(['registration_id', 'student_id', 'credits'], accepted))
+    conn.execute(totals)
+
+
+def verify(conn, repair=False):
+    """Compare every running total with a recompute; return [(student_id, stored, actual)].
+
+    With repair=True the drifted totals are recomputed in place.
+    """
+    drift = [(student_id, stored, actual)
+             for student_id, stored, actual in conn.execute(select(Student.id, Student.credits_earned, _earned()))
+             if stored != actual]
+    if repair and drift:
+        recompute(conn, student_ids={student_id for student_id, _, _ in drift})
+    return drift
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check student credit totals against a recompute.')
+    parser.add_argument('--repair', action='store_true', help='rewrite drifted totals')
+    args = parser.parse_args(argv)
+
+    from app import create_app
+
+    with create_app(views=False).app_context(), db.engine.begin() as conn:
+        drift = verify(conn, repair=args.repair)
+    for student_id, stored, actual in drift:
+        print(f'student {student_id}: stored {stored} credits, actual {actual}')
+    if not drift:
+        print('All credit totals match.')
+    elif args.repair:
+        print(f'Repaired {len(drift)} credit total(s).')
+    return 1 if drift and not args.repair else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
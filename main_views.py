@@ -0,0 +1,115 @@
+"""Routes shared by every user: home, search, logout, roster exports, job status and metrics."""
+from flask import (Blueprint, current_app, render_template, request, redirect, url_for, session, flash,
+                   jsonify, Response, stream_with_context, send_file, abort)
+from models import db, Job
+from search import search_events, highlight_html
+from pagination import parse_filters
+import exports
+import jobs
+import tasks
+import instrumentation
+from datetime import datetime
+
+bp = Blueprint('main', __name__)
+
+@bp.route('/')
+def index():
+    return render_template('index.html')
+
+# Registration roster downloads, streamed in batches
+@bp.route('/export_registrations.<any(csv, xlsx):file_format>')
+def export_registrations(file_format):
+    user_type = session.get('user_type')
+    if user_type not in ('admin', 'club'):
+        return redirect(url_for('main.index'))
+    dashboard = 'admin.admin_dashboard' if user_type == 'admin' else 'club.club_dashboard'
+    
+    filters = parse_filters(request.args)
+    event_id = request.args.get('event_id', type=int)
+    if event_id is not None:
+        filters['event_id'] = event_id
+    # Clubs only ever export their own events' registrations
+    if user_type == 'club':
+        filters['club_id'] = session['club_id']
+    try:
+        start, end = exports.parse_date_range(request.args)
+    except exports.InvalidDate as e:
+        flash(str(e), 'error')
+        return redirect(url_for(dashboard))
+    
+    if request.args.get('background'):
+        job = jobs.enqueue('export_registrations', {
+            'file_format': file_format, 'filters': filters,
+            'start': start.isoformat() if start else None, 'end': end.isoformat() if end else None,
+        }, owner=job_owner())
+        db.session.commit()
+        return redirect(url_for('main.job_status', job_id=job.id))
+    
+    stmt = exports.roster_query(start=start, end=end, **filters)
+    filename = f"registrations-{datetime.utcnow().strftime('%Y%m%d')}.{file_format}"
+    return Response(stream_with_context(exports.STREAMS[file_format](stmt)),
+                    mimetype=exports.CONTENT_TYPES[file_format],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+# Background jobs
+def job_owner():
+    """Owner tag for jobs started by the logged-in user, such as club:3"""
+    user_type = session.get('user_type')
+    return f"{user_type}:{session.get(f'{user_type}_id')}" if user_type else None
+
+def get_own_job(job_id):
+    """The job if the logged-in user started it (admins see every job), else 404"""
+    job = Job.query.get_or_404(job_id)
+    if session.get('user_type') != 'admin' and (job.owner is None or job.owner != job_owner()):
+        abort(404)
+    return job
+
+@bp.route('/jobs/<int:job_id>')
+def job_status(job_id):
+    if not session.get('user_type'):
+        return redirect(url_for('main.index'))
+    
+    job = get_own_job(job_id)
+    if request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json':
+        return jsonify({'id': job.id, 'kind': job.kind, 'status': job.status, 'attempts': job.attempts,
+                        'result': job.result_value, 'error': job.error})
+    return render_template('job.html', job=job)
+
+@bp.route('/jobs/<int:job_id>/download')
+def job_download(job_id):
+    if not session.get('user_type'):
+        return redirect(url_for('main.index'))
+    
+    job = get_own_job(job_id)
+    if job.kind != 'export_registrations' or job.status != jobs.DONE:
+        abort(404)
+    file_format = job.args['file_format']
+    return send_file(tasks.export_path(job.id, file_format), as_attachment=True,
+                     download_name=f'registrations-{job.created_at.strftime("%Y%m%d")}.{file_format}',
+                     mimetype=exports.CONTENT_TYPES[file_format])
+
+@bp.route('/metrics')
+def metrics():
+    token = current_app.config['METRICS_TOKEN']
+    scraper = token and request.headers.get('Authorization') == f'Bearer {token}'
+    if not scraper and ('admin_id' not in session or session.get('user_type') != 'admin'):
+        return jsonify({'error': 'Admin login required'}), 403
+    
+    return Response(instrumentation.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Search
+@bp.route('/search')
+def search():
+    query = request.args.get('q', '').strip()
+    results = []
+    if query:
+        results = search_events(db.session, query, limit=current_app.config['SEARCH_RESULTS_LIMIT'])
+    
+    return render_template('search.html', query=query, results=results, highlight=highlight_html)
+
+# Logout
+@bp.route('/logout')
+def logout():
+    session.clear()
+    flash('Logged out successfully!', 'success')
+    return redirect(url_for('main.index'))
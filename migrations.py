@@ -0,0 +1,223 @@
+"""Schema upgrades for existing databases.
+
+init_db.py rebuilds the database from scratch with drop_all, which loses
+every row. upgrade() instead brings an existing database up to the schema
+declared in models.py in place: it creates missing tables, runs numbered
+migration steps that have not been applied yet and records the applied
+version in the schema_version table.
+
+Any number of processes may call upgrade() at once, as web workers do on
+startup. Checking the version is a single read; only when something is
+pending does a process take the migration lock (the SQLite write lock, or
+an advisory lock on PostgreSQL) and check again, so exactly one of them
+migrates while the others wait and then find nothing left to do.
+
+Run directly to upgrade the application database:
+
+    python migrations.py
+"""
+import time
+
+from sqlalchemy import inspect, select, func, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateColumn
+
+import counters
+import database
+import ledger
+import passwords
+from models import db, schema_version, catalog_version, Club, Student, Event, Registration
+from search import create_search_index
+
+MIGRATIONS = []
+
+# Arbitrary application-wide key for pg_advisory_xact_lock
+ADVISORY_LOCK_KEY = 0x63616d70  # "camp"
+LOCK_TIMEOUT = 120  # seconds a process waits for another one's migration
+
+
+def migration(version, description):
+    """Register a numbered migration step; steps must be idempotent"""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda step: step[0])
+        return func
+    return decorator
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def get_schema_version(conn):
+    """Return the applied schema version, or 0 for databases that predate migrations"""
+    if not inspect(conn).has_table('schema_version'):
+        return 0
+    version = conn.execute(schema_version.select()).scalar()
+    return version or 0
+
+
+def acquire_lock(conn, timeout=LOCK_TIMEOUT):
+    """Hold the migration lock until conn's transaction ends; call before any other statement"""
+    dialect = conn.dialect.name
+    if dialect == 'postgresql':
+        conn.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': ADVISORY_LOCK_KEY})
+    elif dialect == 'sqlite':
+        # Take the write lock up front instead of at the first write; each
+        # attempt already waits DB_BUSY_TIMEOUT for the current holder
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                conn.exec_driver_sql('BEGIN IMMEDIATE')
+                return
+            except OperationalError as e:
+                if not database.is_busy_error(e) or time.monotonic() >= deadline:
+                    raise
+
+
+def _set_schema_version(conn, version):
+    conn.execute(schema_version.delete())
+    conn.execute(schema_version.insert().values(version=version))
+
+
+def _create_missing_indexes(conn, table, names):
+    """Create the named indexes of table that the database does not have yet.
+
+    Each migration names its own indexes: an index on a column a later
+    migration adds cannot be created before that migration has run.
+    """
+    existing = {index['name'] for index in inspect(conn).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name in names and index.name not in existing:
+            index.create(conn)
+
+
+def _add_missing_columns(conn, table):
+    """ALTER TABLE ADD COLUMN for every column of table the database does not have yet"""
+    existing = {column['name'] for column in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {ddl}')
+
+
+def _widen_columns(conn, table):
+    """Grow string columns the database declares shorter than the model (SQLite does not enforce lengths)"""
+    if conn.dialect.name == 'sqlite':
+        return
+    for existing in inspect(conn).get_columns(table.name):
+        column = table.columns.get(existing['name'])
+        length = getattr(column.type, 'length', None) if column is not None else None
+        current = getattr(existing['type'], 'length', None)
+        if length and current and current < length:
+            conn.exec_driver_sql(f'ALTER TABLE {table.name} ALTER COLUMN {column.name} '
+                                 f'TYPE {column.type.compile(dialect=conn.dialect)}')
+
+
+@migration(1, 'Add pagination and lookup indexes on events and registrations')
+def _add_query_indexes(conn):
+    _create_missing_indexes(conn, Event.__table__, {
+        'ix_events_created_at_id', 'ix_events_club_created_at_id', 'ix_events_credits_created_at_id'})
+    _create_missing_indexes(conn, Registration.__table__, {
+        'ix_registrations_event_id_status', 'ix_registrations_registered_at_id',
+        'ix_registrations_status_registered_at_id'})
+
+
+@migration(2, 'Add full-text search index over event names and descriptions')
+def _add_event_search_index(conn):
+    create_search_index(conn)
+
+
+@migration(3, 'Hash plaintext club passwords')
+def _hash_club_passwords(conn):
+    clubs = Club.__table__
+    _widen_columns(conn, clubs)  # the first release declared password VARCHAR(100); hashes are longer
+    for club_id, password in conn.execute(clubs.select().with_only_columns(clubs.c.id, clubs.c.password)):
+        if not passwords.is_hashed(password):
+            conn.execute(clubs.update().where(clubs.c.id == club_id)
+                         .values(password=passwords.hash_password(password)))
+
+
+@migration(4, 'Add event capacity and seat counter')
+def _add_event_capacity(conn):
+    events = Event.__table__
+    registrations = Registration.__table__
+    _add_missing_columns(conn, events)
+    held = (select(func.count())
+            .where(registrations.c.event_id == events.c.id,
+                   registrations.c.status.in_(('Pending', 'Accepted')))
+            .scalar_subquery())
+    conn.execute(events.update().values(seats_taken=held))
+
+
+@migration(5, 'Add registration and event counters')
+def _add_counters(conn):
+    _add_missing_columns(conn, Club.__table__)
+    _add_missing_columns(conn, Event.__table__)
+    counters.recount(conn)
+
+
+@migration(6, 'Add catalog version for the rendered-fragment cache')
+def _add_catalog_version(conn):
+    if conn.execute(catalog_version.select()).first() is None:
+        conn.execute(catalog_version.insert().values(version=1))
+
+
+@migration(7, 'Add student credit totals')
+def _add_credit_totals(conn):
+    _add_missing_columns(conn, Student.__table__)
+    ledger.recompute(conn)
+
+
+@migration(8, 'Add background jobs table')
+def _add_jobs(conn):
+    pass  # the jobs table is new, so create_all() above has already created it
+
+
+@migration(9, 'Add event neighbours for recommendations')
+def _add_event_neighbours(conn):
+    # Every event with registrations starts out stale; refresh jobs or
+    # "python recommend.py --rebuild" fill the event_neighbours table
+    _add_missing_columns(conn, Event.__table__)
+    _create_missing_indexes(conn, Event.__table__, {'ix_events_registrations_total_id'})
+
+
+
+@migration(10, 'Add credit entries, one per credited registration')
+def _add_credit_entries(conn):
+    # create_all() above has created the table; fill it and resync the totals
+    ledger.recompute(conn)
+
+def upgrade(engine=None, verbose=False):
+    """Bring the database up to the latest schema version without dropping data"""
+    engine = engine or db.engine
+    with engine.connect() as conn:
+        current = get_schema_version(conn)
+    if current >= latest_version():
+        return current
+
+    with engine.begin() as conn:
+        acquire_lock(conn)
+        # Another process may have migrated while this one waited for the lock
+        current = get_schema_version(conn)
+        if current >= latest_version():
+            return current
+
+        db.metadata.create_all(conn)
+        for version, description, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            if verbose:
+                print(f'Applying migration {version}: {description}')
+            apply(conn)
+            current = version
+        _set_schema_version(conn, current)
+    return current
+
+
+if __name__ == '__main__':
+    from app import create_app
+
+    with create_app(views=False).app_context():
+        version = upgrade(verbose=True)
+        print(f'Database schema is at version {version}')
@@ -1,17 +1,38 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+import passwords
 from datetime import datetime
+import json
 
 db = SQLAlchemy()
 
+# Applied migration version, maintained by migrations.upgrade()
+schema_version = db.Table(
+    'schema_version',
+    db.Column('version', db.Integer, nullable=False),
+)
+
+# Single-row counter bumped by every event/club write; keys the rendered-fragment cache
+catalog_version = db.Table(
+    'catalog_version',
+    db.Column('version', db.Integer, nullable=False),
+)
+
 class Club(db.Model):
     __tablename__ = 'clubs'
     id = db.Column(db.Integer, primary_key=True)
     club_name = db.Column(db.String(100), unique=True, nullable=False)
-    password = db.Column(db.String(100), nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+    # Maintained by counters.py in the same transaction as the events it counts
+    event_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     events = db.relationship('Event', backref='club', lazy=True)
     
+    def set_password(self, password):
+        self.password = passwords.hash_password(password)
+    
+    def check_password(self, password):
+        return passwords.verify_password(self.password, password)
+    
     def __repr__(self):
         return f'<Club {self.club_name}>'
 
@@ -22,14 +43,16 @@ class Student(db.Model):
     reg_no = db.Column(db.String(50), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
+    # Credits from Accepted registrations, maintained by ledger.py
+    credits_earned = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     registrations = db.relationship('Registration', backref='student', lazy=True)
     
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = passwords.hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return passwords.verify_password(self.password, password)
     
     def __repr__(self):
         return f'<Student {self.name}>'
@@ -42,9 +65,37 @@ class Event(db.Model):
     description = db.Column(db.Text, nullable=False)
     credits = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    capacity = db.Column(db.Integer)  # None = unlimited
+    # Registrations currently holding a seat (Pending or Accepted); maintained by seats.py
+    seats_taken = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Registration counts by status, maintained by counters.py
+    registrations_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    registrations_pending = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    registrations_accepted = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    registrations_rejected = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    registrations_waitlisted = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # registrations_total when recommend.py last computed this event's neighbours; stale when they differ
+    neighbours_total = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     registrations = db.relationship('Registration', backref='event', lazy=True)
     
+    # Composite indexes backing keyset pagination (newest first) and its filters.
+    # Their leading columns also serve the club_id lookups on every dashboard
+    # and the chatbot's credits filter / ORDER BY credits.
+    __table_args__ = (
+        db.Index('ix_events_created_at_id', 'created_at', 'id'),
+        db.Index('ix_events_club_created_at_id', 'club_id', 'created_at', 'id'),
+        db.Index('ix_events_credits_created_at_id', 'credits', 'created_at', 'id'),
+        # Most popular first: recommendations for students without much history
+        db.Index('ix_events_registrations_total_id', 'registrations_total', 'id'),
+    )
+    
+    @property
+    def seats_left(self):
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.seats_taken, 0)
+    
     def __repr__(self):
         return f'<Event {self.event_name}>'
 
@@ -53,10 +104,85 @@ class Registration(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
     event_id = db.Column(db.Integer, db.ForeignKey('events.id'), nullable=False)
-    status = db.Column(db.String(20), default='Pending')  # Pending, Accepted, Rejected
+    status = db.Column(db.String(20), default='Pending')  # Pending, Accepted, Rejected, Waitlisted
     registered_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    __table_args__ = (db.UniqueConstraint('student_id', 'event_id', name='unique_student_event'),)
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'event_id', name='unique_student_event'),
+        # Per-event lookups: club dashboard, registration counts, delete_club cascade
+        db.Index('ix_registrations_event_id_status', 'event_id', 'status'),
+        # Composite indexes backing keyset pagination (newest first) and its filters
+        db.Index('ix_registrations_registered_at_id', 'registered_at', 'id'),
+        db.Index('ix_registrations_status_registered_at_id', 'status', 'registered_at', 'id'),
+    )
     
     def __repr__(self):
         return f'<Registration {self.student.name} - {self.event.event_name}>'
+
+class CreditEntry(db.Model):
+    """The credits one Accepted registration has added to its student's total; see ledger.py"""
+    __tablename__ = 'credit_entries'
+    # One entry per registration: crediting the same acceptance twice violates the primary key
+    registration_id = db.Column(db.Integer, db.ForeignKey('registrations.id'), primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
+    credits = db.Column(db.Integer, nullable=False)
+    
+    __table_args__ = (
+        # A student's entries: recompute and club deletion
+        db.Index('ix_credit_entries_student_id', 'student_id'),
+    )
+    
+    def __repr__(self):
+        return f'<CreditEntry {self.registration_id}: {self.credits} credits>'
+
+class EventNeighbour(db.Model):
+    """One of an event's most similar events by co-registration; see recommend.py"""
+    __tablename__ = 'event_neighbours'
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id'), primary_key=True)
+    neighbour_id = db.Column(db.Integer, db.ForeignKey('events.id'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)  # cosine similarity, 0 to 1
+    
+    __table_args__ = (
+        # Which lists an event appears in: incremental refresh and club deletion
+        db.Index('ix_event_neighbours_neighbour_id', 'neighbour_id'),
+    )
+    
+    def __repr__(self):
+        return f'<EventNeighbour {self.event_id} -> {self.neighbour_id} {self.score:.3f}>'
+
+class Job(db.Model):
+    """A background job run by jobs.Worker; see jobs.py for the lifecycle"""
+    __tablename__ = 'jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON arguments for the handler
+    # Who may read the job's status and result, e.g. "admin:1" or "club:3"
+    owner = db.Column(db.String(50))
+    # Enqueueing again with the same key returns the existing job
+    idempotency_key = db.Column(db.String(200), unique=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # A running job whose lease has expired (its worker died) is picked up again
+    locked_until = db.Column(db.DateTime)
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        # The worker's claim query: next due job by status and run_at
+        db.Index('ix_jobs_status_run_at', 'status', 'run_at'),
+    )
+    
+    @property
+    def args(self):
+        return json.loads(self.payload)
+    
+    @property
+    def result_value(self):
+        return json.loads(self.result) if self.result else None
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
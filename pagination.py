@@ -0,0 +1,189 @@
+import base64
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import or_, and_, func
+from sqlalchemy.orm import joinedload
+
+from models import Event, Registration
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+REGISTRATION_STATUSES = ('Pending', 'Accepted', 'Rejected', 'Waitlisted')
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(timestamp, row_id):
+    """Encode a (timestamp, id) position as an opaque URL-safe cursor"""
+    raw = f'{timestamp.isoformat()}|{row_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor back into (timestamp, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}') from e
+
+
+def encode_id_cursor(row_id):
+    """Encode an id position, for listings ordered by id alone"""
+    return base64.urlsafe_b64encode(str(row_id).encode()).decode().rstrip('=')
+
+
+def decode_id_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded).decode())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}') from e
+
+
+def clamp_page_size(limit):
+    """Coerce a user-supplied page size into 1..MAX_PAGE_SIZE"""
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def after_cursor(timestamp_column, id_column, cursor):
+    """Keyset predicate selecting rows that sort after the cursor (newest first)"""
+    timestamp, row_id = decode_cursor(cursor)
+    return or_(timestamp_column < timestamp,
+               and_(timestamp_column == timestamp, id_column < row_id))
+
+
+def _page(query, timestamp_attr, limit):
+    """Fetch one page plus a lookahead row to decide whether there is a next page"""
+    return _to_page(query.limit(limit + 1).all(), timestamp_attr, limit)
+
+
+def _to_page(rows, timestamp_attr, limit):
+    """Cut rows holding up to limit + 1 entries down to a Page"""
+    if len(rows) <= limit:
+        return Page(rows, None)
+    rows = rows[:limit]
+    last = rows[-1]
+    return Page(rows, encode_cursor(getattr(last, timestamp_attr), last.id))
+
+
+def paginate_events(cursor=None, limit=DEFAULT_PAGE_SIZE, club_id=None, credits=None):
+    """Return a page of events ordered newest first, optionally filtered by club and credits"""
+    query = Event.query.options(joinedload(Event.club))
+    if club_id is not None:
+        query = query.filter(Event.club_id == club_id)
+    if credits is not None:
+        query = query.filter(Event.credits == credits)
+    if cursor:
+        query = query.filter(after_cursor(Event.created_at, Event.id, cursor))
+    query = query.order_by(Event.created_at.desc(), Event.id.desc())
+    return _page(query, 'created_at', clamp_page_size(limit))
+
+
+def paginate_registrations(cursor=None, limit=DEFAULT_PAGE_SIZE, club_id=None, credits=None,
+                           status=None, event_id=None, student_id=None):
+    """Return a page of registrations ordered newest first with student, event and club loaded"""
+    query = Registration.query.options(joinedload(Registration.student),
+                                       joinedload(Registration.event).joinedload(Event.club))
+    if club_id is not None or credits is not None:
+        query = query.join(Event, Registration.event_id == Event.id)
+        if club_id is not None:
+            query = query.filter(Event.club_id == club_id)
+        if credits is not None:
+            query = query.filter(Event.credits == credits)
+    if status is not None:
+        query = query.filter(Registration.status == status)
+    if event_id is not None:
+        query = query.filter(Registration.event_id == event_id)
+    if student_id is not None:
+        query = query.filter(Registration.student_id == student_id)
+    if cursor:
+        query = query.filter(after_cursor(Registration.registered_at, Registration.id, cursor))
+    query = query.order_by(Registration.registered_at.desc(), Registration.id.desc())
+    return _page(query, 'registered_at', clamp_page_size(limit))
+
+
+def paginate_registrations_by_event(event_ids, limit=DEFAULT_PAGE_SIZE, cursors=None):
+    """Return {event_id: Page} with one page of each event's registrations, newest first, in one statement
+
+    cursors maps an event id to the cursor its page starts after; other events start at their first page.
+    """
+    limit = clamp_page_size(limit)
+    pages = {event_id: Page([], None) for event_id in event_ids}
+    if not pages:
+        return pages
+    scope = Registration.event_id.in_(pages)
+    for event_id, cursor in (cursors or {}).items():
+        if event_id in pages:
+            scope &= or_(Registration.event_id != event_id,
+                         after_cursor(Registration.registered_at, Registration.id, cursor))
+    # Number each event's registrations newest first and keep a page plus a lookahead row of each
+    position = (func.row_number()
+                .over(partition_by=Registration.event_id,
+                      order_by=(Registration.registered_at.desc(), Registration.id.desc()))
+                .label('position'))
+    ranked = Registration.query.with_entities(Registration.id, position).filter(scope).subquery()
+    rows = (Registration.query
+            .join(ranked, ranked.c.id == Registration.id)
+            .filter(ranked.c.position <= limit + 1)
+            .options(joinedload(Registration.student))
+            .order_by(Registration.registered_at.desc(), Registration.id.desc())
+            .all())
+    grouped = {event_id: [] for event_id in pages}
+    for registration in rows:
+        grouped[registration.event_id].append(registration)
+    return {event_id: _to_page(grouped[event_id], 'registered_at', limit) for event_id in pages}
+
+
+def parse_filters(args):
+    """Extract club, credits and status filters from request args, ignoring bad values"""
+    filters = {}
+    for key in ('club_id', 'credits'):
+        value = args.get(key, type=int)
+        if value is not None:
+            filters[key] = value
+    status = args.get('status')
+    if status in REGISTRATION_STATUSES:
+        filters['status'] = status
+    return filters
+
+
+def event_to_dict(event):
+    """Serialize an event for the JSON listing endpoints"""
+    return {
+        'id': event.id,
+        'event_name': event.event_name,
+        'description': event.description,
+        'credits': event.credits,
+        'capacity': event.capacity,
+        'seats_taken': event.seats_taken,
+        'club_id': event.club_id,
+        'club_name': event.club.club_name,
+        'created_at': event.created_at.isoformat() if event.created_at else None,
+    }
+
+
+def registration_to_dict(registration):
+    """Serialize a registration for the JSON listing endpoints"""
+    return {
+        'id': registration.id,
+        'status': registration.status,
+        'registered_at': registration.registered_at.isoformat() if registration.registered_at else None,
+        'student_id': registration.student_id,
+        'student_name': registration.student.name,
+        'reg_no': registration.student.reg_no,
+        'event_id': registration.event_id,
+        'event_name': registration.event.event_name,
+        'club_name': registration.event.club.club_name,
+    }
@@ -0,0 +1,101 @@
+"""Password hashing policy shared by students and clubs.
+
+The hashing method and its cost come from one deployment-wide setting
+(PASSWORD_HASH_METHOD, e.g. "pbkdf2:sha256:600000" or "scrypt:32768:8:1").
+Hashes are stored in Werkzeug's "method$salt$hash" format, so a stored hash
+records the parameters it was made with; needs_rehash() compares those to
+the current policy and schedule_rehash() upgrades the hash off the request
+path after a successful login.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from werkzeug.security import (generate_password_hash, check_password_hash,
+                               DEFAULT_PBKDF2_ITERATIONS)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METHOD = f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+
+_method = DEFAULT_METHOD
+
+# One background thread is enough: rehashes are rare (once per user per policy change)
+_rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rehash')
+
+
+def canonical_method(method):
+    """Spell out every parameter of a Werkzeug method string, as stored in hashes"""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt':
+        n = int(args[0]) if args else 2 ** 15
+        r = int(args[1]) if len(args) > 1 else 8
+        p = int(args[2]) if len(args) > 2 else 1
+        return f'scrypt:{n}:{r}:{p}'
+    raise ValueError(f'Unsupported password hash method: {method}')
+
+
+def configure(method):
+    """Set the hashing policy used for new hashes"""
+    global _method
+    _method = canonical_method(method or DEFAULT_METHOD)
+
+
+def current_method():
+    return _method
+
+
+def hasher():
+    """A picklable function hashing with the current policy, for process pools"""
+    return partial(generate_password_hash, method=_method)
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=_method)
+
+
+def verify_password(stored_hash, password):
+    return check_password_hash(stored_hash, password)
+
+
+def is_hashed(value):
+    """True if value looks like a Werkzeug hash rather than a plaintext password"""
+    method, separator, _ = value.partition('$')
+    if not separator:
+        return False
+    try:
+        canonical_method(method)
+    except ValueError:
+        return False
+    return True
+
+
+def needs_rehash(stored_hash):
+    """True if stored_hash was made with parameters other than the current policy"""
+    return stored_hash.partition('$')[0] != _method
+
+
+def schedule_rehash(app, model, row_id, stored_hash, password):
+    """Rehash a just-verified password with the current policy on a background thread.
+
+    The new hash is only written if the stored hash is still the one that was
+    verified, so a password change made in the meantime is never overwritten.
+    """
+    def rehash():
+        new_hash = hash_password(password)
+        with app.app_context():
+            from models import db
+            try:
+                (db.session.query(model)
+                 .filter(model.id == row_id, model.password == stored_hash)
+                 .update({model.password: new_hash}, synchronize_session=False))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                logger.exception('Rehashing password for %s %s failed', model.__name__, row_id)
+
+    return _rehash_executor.submit(rehash)
@@ -0,0 +1,148 @@
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import event
+
+from models import db, Club, Event, Registration
+from pagination import paginate_events, paginate_registrations, paginate_registrations_by_event
+
+# Maximum number of SQL statements each dashboard may issue per request.
+# Enforced by the query_budget decorator when the app runs with TESTING
+# or QUERY_BUDGET_ENFORCE enabled.
+DASHBOARD_QUERY_BUDGETS = {
+    'admin_dashboard': 3,
+    'club_dashboard': 3,
+    # Catalog version, student, clubs, event page, overlay, recommendations and their popular top-up;
+    # a fragment cache hit skips clubs and events
+    'student_dashboard': 7,
+}
+
+# Listing filters that apply to events (registrations also accept status)
+EVENT_FILTERS = ('club_id', 'credits')
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block of code issues more SQL statements than allowed"""
+
+    def __init__(self, budget, statements):
+        self.budget = budget
+        self.statements = statements
+        listing = '\n'.join(f'  {i}. {sql}' for i, sql in enumerate(statements, 1))
+        super().__init__(f'Expected at most {budget} queries, got {len(statements)}:\n{listing}')
+
+
+class QueryCounter:
+    """Collects every SQL statement executed on an engine while active"""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Count the SQL statements issued inside the with-block"""
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter._record)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter._record)
+
+
+@contextmanager
+def assert_max_queries(budget, engine=None):
+    """Fail with QueryBudgetExceeded if the with-block issues more than budget queries"""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > budget:
+        raise QueryBudgetExceeded(budget, counter.statements)
+
+
+def query_budget(name):
+    """Route decorator enforcing DASHBOARD_QUERY_BUDGETS[name] in testing mode"""
+    budget = DASHBOARD_QUERY_BUDGETS[name]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            if not (config.get('TESTING') or config.get('QUERY_BUDGET_ENFORCE')):
+                return view(*args, **kwargs)
+            with assert_max_queries(budget):
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_admin_dashboard_data(events_cursor=None, registrations_cursor=None, filters=None):
+    """Load clubs plus one page each of events and registrations in three statements"""
+    filters = filters or {}
+    event_filters = {k: v for k, v in filters.items() if k in EVENT_FILTERS}
+
+    # Event and registration counts are read from the rows' counter columns
+    clubs = Club.query.order_by(Club.id).all()
+
+    # One page of events with their club
+    events = paginate_events(events_cursor, **event_filters)
+
+    # One page of registrations with student, event and club in one join
+    registrations = paginate_registrations(registrations_cursor, **filters)
+
+    return {
+        'clubs': clubs,
+        'events': events,
+        'registrations': registrations,
+        'filters': filters,
+    }
+
+
+def get_club_dashboard_data(club_id, event_id=None, registrations_cursor=None):
+    """Load a club's events and one page of each event's registrations in three statements
+
+    registrations_cursor pages through event_id's registrations; the per-event counters
+    and the CSV export cover the totals and the full list.
+    """
+    club = db.session.get(Club, club_id)
+    events = Event.query.filter_by(club_id=club_id).order_by(Event.id).all()
+
+    cursors = {event_id: registrations_cursor} if event_id is not None and registrations_cursor else {}
+    event_registrations = paginate_registrations_by_event([event_obj.id for event_obj in events],
+                                                          cursors=cursors)
+
+    return {
+        'club': club,
+        'events': events,
+        'event_registrations': event_registrations,
+        'paged_event_id': event_id if cursors else None,
+    }
+
+
+def get_catalog_page(cursor=None, filters=None):
+    """Load the data shared by every student's dashboard: clubs and one page of events"""
+    filters = {k: v for k, v in (filters or {}).items() if k in EVENT_FILTERS}
+    return {
+        'clubs': Club.query.order_by(Club.club_name).all(),
+        'events': paginate_events(cursor, **filters),
+        'filters': filters,
+    }
+
+
+def get_student_overlay(student_id, event_ids):
+    """Return {event_id: (student's status or None, capacity, seats_taken)} in one statement"""
+    if not event_ids:
+        return {}
+    rows = (db.session.query(Event.id, Registration.status, Event.capacity, Event.seats_taken)
+            .outerjoin(Registration, (Registration.event_id == Event.id) &
+                       (Registration.student_id == student_id))
+            .filter(Event.id.in_(event_ids))
+            .all())
+    return {event_id: (status, capacity, seats_taken) for event_id, status, capacity, seats_taken in rows}
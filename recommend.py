@@ -0,0 +1,305 @@
+"""Event recommendations from the student x event registration matrix.
+
+Two events are similar when the same students register for both, measured
+as the cosine similarity of their columns in the binary matrix:
+
+    similarity(a, b) = together(a, b) / sqrt(registrations(a) * registrations(b))
+
+Any registration counts, whatever its status: it shows interest. The
+event_neighbours table keeps each event's TOP_K most similar events, so a
+student's recommendations are one indexed query: the neighbours of the
+events they registered for with their scores summed, minus those events,
+topped up with the most popular events for students with little history.
+
+A registration for event e only changes similarities that involve e, so
+the index is refreshed incrementally rather than rebuilt. An event is
+stale once its registrations_total no longer matches the neighbours_total
+recorded when its list was computed; refresh() recomputes a batch of
+stale events' lists from one grouped self-join, puts their new scores
+into the lists of the events they co-occur with, and writes back only the
+lists that changed. Registrations queue one refresh job per
+RECOMMEND_REFRESH_INTERVAL. The updates to other events' lists are
+approximate (a neighbour that was trimmed from a list only returns when
+that list is recomputed); rebuild() recomputes every list exactly,
+vectorized with NumPy/SciPy when they are installed and in pure Python
+otherwise:
+
+    python recommend.py            # refresh the stale events
+    python recommend.py --rebuild  # recompute the whole index
+"""
+import argparse
+import heapq
+import math
+import sys
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import chain
+
+from flask import current_app
+from sqlalchemy import bindparam, delete, func, insert, literal, select, update
+from sqlalchemy.orm import aliased
+
+import jobs
+from models import db, Club, Event, EventNeighbour, Registration
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # optional: rebuild() falls back to pure Python
+    np = sparse = None
+
+TOP_K = 20
+REFRESH_BATCH = 500   # stale events per refresh job; a job that fills its batch queues the next
+REFRESH_INTERVAL = 60
+CHUNK = 500           # ids per IN (...) list
+
+# Where a recommendation came from: the row's source column
+NEIGHBOURS = 'neighbours'  # similar to an event the student registered for
+POPULAR = 'popular'        # one of the most registered-for events
+
+
+def _chunks(items, size=CHUNK):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _best(scores):
+    """The TOP_K highest (neighbour id, score) pairs, ties broken by the lower id"""
+    return heapq.nlargest(TOP_K, scores, key=lambda item: (item[1], -item[0]))
+
+
+def schedule_refresh():
+    """Queue the refresh job of the current interval, once per interval; the caller commits"""
+    interval = current_app.config.get('RECOMMEND_REFRESH_INTERVAL', REFRESH_INTERVAL)
+    now = time.time()
+    window = int(now // interval)
+    jobs.enqueue('refresh_recommendations', idempotency_key=f'refresh_recommendations:{window}',
+                 delay=(window + 1) * interval - now)
+
+
+def _cooccurrences(conn, event_ids):
+    """Yield (event id, other event id, students registered for both, other's registrations_total)"""
+    mine = aliased(Registration)
+    theirs = aliased(Registration)
+    for chunk in _chunks(event_ids):
+        yield from conn.execute(
+            select(mine.event_id, theirs.event_id, func.count(), Event.registrations_total)
+            .select_from(mine)
+            .join(theirs, theirs.student_id == mine.student_id)
+            .join(Event, Event.id == theirs.event_id)
+            .where(mine.event_id.in_(chunk), theirs.event_id != mine.event_id)
+            .group_by(mine.event_id, theirs.event_id, Event.registrations_total))
+
+
+def _load_lists(conn, column, event_ids):
+    """{event id: {neighbour id: score}} of the rows whose column is one of event_ids"""
+    lists = defaultdict(dict)
+    for chunk in _chunks(event_ids):
+        for event_id, neighbour_id, score in conn.execute(
+                select(EventNeighbour.event_id, EventNeighbour.neighbour_id, EventNeighbour.score)
+                .where(column.in_(chunk))):
+            lists[event_id][neighbour_id] = score
+    return lists
+
+
+def refresh(conn, limit=None):
+    """Recompute the neighbours of up to limit stale events; returns how many were refreshed.
+
+    The stale events' lists are recomputed exactly; their new scores then
+    replace the old ones in the other events' lists, which keep their
+    TOP_K best.
+    """
+    stale = select(Event.id, Event.registrations_total).where(Event.registrations_total != Event.neighbours_total)
+    if limit is not None:
+        stale = stale.order_by(Event.id).limit(limit)
+    totals = dict(conn.execute(stale).all())
+    if not totals:
+        return 0
+
+    scores = defaultdict(dict)
+    for event_id, other_id, together, other_total in _cooccurrences(conn, totals):
+        if totals[event_id] and other_total:
+            scores[event_id][other_id] = together / math.sqrt(totals[event_id] * other_total)
+    # Any list still holding a stale event it no longer co-occurs with (its club was deleted) drops it
+    holders = _load_lists(conn, EventNeighbour.neighbour_id, totals)
+    affected = set(totals).union(holders, *(event_scores.keys() for event_scores in scores.values()))
+    lists = _load_lists(conn, EventNeighbour.event_id, affected)
+    before = {event_id: dict(neighbours) for event_id, neighbours in lists.items()}
+
+    for other_id, held in holders.items():
+        for event_id in held:
+            if other_id not in scores[event_id]:
+                del lists[other_id][event_id]
+    for event_id in totals:
+        event_scores = scores[event_id]
+        lists[event_id] = dict(_best(event_scores.items()))
+        for other_id, score in event_scores.items():
+            lists[other_id][event_id] = score
+    # Trimmed once all scores are in, so an event pushed out by one update can return after another
+    for event_id, neighbours in lists.items():
+        if len(neighbours) > TOP_K:
+            lists[event_id] = dict(_best(neighbours.items()))
+
+    changed = [event_id for event_id, neighbours in lists.items() if neighbours != before.get(event_id, {})]
+    for chunk in _chunks(changed):
+        conn.execute(delete(EventNeighbour).where(EventNeighbour.event_id.in_(chunk)))
+    rows = [{'event_id': event_id, 'neighbour_id': neighbour_id, 'score': score}
+            for event_id in changed for neighbour_id, score in lists[event_id].items()]
+    if rows:
+        conn.execute(insert(EventNeighbour), rows)
+    # Conditional, so an event that got another registration meanwhile stays stale
+    conn.execute(update(Event)
+                 .where(Event.id == bindparam('e'), Event.registrations_total == bindparam('t'))
+                 .values(neighbours_total=bindparam('t')),
+                 [{'e': event_id, 't': total} for event_id, total in totals.items()])
+    return len(totals)
+
+
+def _neighbours_vectorized(pairs):
+    """Yield (event id, best neighbours) from one sparse matrix product"""
+    students, events = np.fromiter(chain.from_iterable(pairs), dtype=np.int64, count=2 * len(pairs)).reshape(-1, 2).T
+    _, student_index = np.unique(students, return_inverse=True)
+    event_ids, event_index = np.unique(events, return_inverse=True)
+    matrix = sparse.csr_matrix((np.ones(len(pairs), dtype=np.int64), (student_index, event_index)),
+                               shape=(student_index.max() + 1, len(event_ids)))
+    # together[a, b] = students registered for both; totals on the diagonal
+    together = (matrix.T @ matrix).tocsr()
+    totals = together.diagonal().astype(np.float64)
+    rows = np.repeat(np.arange(len(event_ids)), np.diff(together.indptr))
+    # The same expression as the Python path, so equal scores compare equal
+    scores = together.data / np.sqrt(totals[rows] * totals[together.indices])
+    scores[rows == together.indices] = 0
+
+    ids = event_ids.tolist()
+    for row, event_id in enumerate(ids):
+        start, end = together.indptr[row], together.indptr[row + 1]
+        columns, row_scores = together.indices[start:end], scores[start:end]
+        if end - start > TOP_K + 1:
+            # Keep the candidates down to the K-th score; _best() settles ties among them
+            threshold = np.partition(row_scores, end - start - TOP_K)[end - start - TOP_K]
+            keep = row_scores >= threshold
+            columns, row_scores = columns[keep], row_scores[keep]
+        yield event_id, _best((ids[column], score) for column, score in zip(columns.tolist(), row_scores.tolist())
+                              if column != row)
+
+
+def _neighbours_python(pairs):
+    """Yield (event id, best neighbours) one event at a time"""
+    students_of = defaultdict(list)
+    events_of = defaultdict(list)
+    for student_id, event_id in pairs:
+        students_of[event_id].append(student_id)
+        events_of[student_id].append(event_id)
+    for event_id, students in students_of.items():
+        together = Counter()
+        for student_id in students:
+            together.update(events_of[student_id])
+        del together[event_id]
+        total = len(students)
+        yield event_id, _best((other_id, count / math.sqrt(total * len(students_of[other_id])))
+                              for other_id, count in together.items())
+
+
+def rebuild(conn, vectorized=None):
+    """Recompute every event's neighbours from scratch; returns the number of events with registrations.
+
+    vectorized=None uses NumPy/SciPy when they are installed.
+    """
+    if vectorized is None:
+        vectorized = sparse is not None
+    pairs = conn.execute(select(Registration.student_id, Registration.event_id)).all()
+    totals = Counter(event_id for _, event_id in pairs)
+    neighbours = (_neighbours_vectorized if vectorized else _neighbours_python)(pairs) if pairs else ()
+
+    conn.execute(delete(EventNeighbour))
+    rows = []
+    for event_id, best in neighbours:
+        rows.extend({'event_id': event_id, 'neighbour_id': neighbour_id, 'score': score}
+                    for neighbour_id, score in best)
+        if len(rows) >= 10000:
+            conn.execute(insert(EventNeighbour), rows)
+            rows = []
+    if rows:
+        conn.execute(insert(EventNeighbour), rows)
+    # Counted from the rows read above, so registrations made since stay stale
+    conn.execute(update(Event).values(neighbours_total=0))
+    for chunk in _chunks(totals.items(), 10000):
+        conn.execute(update(Event).where(Event.id == bindparam('e')).values(neighbours_total=bindparam('t')),
+                     [{'e': event_id, 't': total} for event_id, total in chunk])
+    return len(totals)
+
+
+@lru_cache(maxsize=None)
+def _statements(by_credits):
+    """The two queries of for_student, built once: (personalized, popular)"""
+    columns = (Event.id, Event.event_name, Event.description, Event.credits, Club.club_name)
+    registered = select(Registration.event_id).where(Registration.student_id == bindparam('student_id'))
+
+    # Grouped on the neighbour id alone; only the chosen few are joined to their event and club
+    score = func.sum(EventNeighbour.score).label('score')
+    best = (select(EventNeighbour.neighbour_id, score)
+            .where(EventNeighbour.event_id.in_(registered), EventNeighbour.neighbour_id.not_in(registered))
+            .group_by(EventNeighbour.neighbour_id)
+            .order_by(score.desc(), EventNeighbour.neighbour_id)
+            .limit(bindparam('limit')))
+    if by_credits:
+        best = (best.join(Event, Event.id == EventNeighbour.neighbour_id)
+                .where(Event.credits >= bindparam('min_credits')))
+    best = best.subquery('best')
+    personalized = (select(*columns, best.c.score, literal(NEIGHBOURS).label('source'))
+                    .join(best, best.c.neighbour_id == Event.id)
+                    .join(Club, Club.id == Event.club_id)
+                    .order_by(best.c.score.desc(), Event.id))
+
+    popular = (select(*columns, func.nullif(0, 0).label('score'), literal(POPULAR).label('source'))
+               .join(Club, Club.id == Event.club_id)
+               .where(Event.id.not_in(registered))
+               .order_by(Event.registrations_total.desc(), Event.id.desc())
+               .limit(bindparam('limit')))
+    if by_credits:
+        popular = popular.where(Event.credits >= bindparam('min_credits'))
+    return personalized, popular
+
+
+def for_student(student_id, limit=5, min_credits=None, session=None):
+    """Up to limit events for a student, best first, as rows of
+    (id, event_name, description, credits, club_name, score, source).
+
+    Neighbours of the events the student registered for come first, with
+    source NEIGHBOURS; the most popular events they have not registered
+    for fill the rest (all of it for student_id None), with source POPULAR
+    and score None. Runs on session, by default the request's.
+    """
+    session = session or db.session
+    personalized, popular = _statements(min_credits is not None)
+    params = {'student_id': student_id, 'limit': limit, 'min_credits': min_credits}
+    rows = session.execute(personalized, params).all() if student_id is not None else []
+    if len(rows) < limit:
+        # limit rows are enough: at most len(rows) of them were already chosen
+        chosen = {row.id for row in rows}
+        rows += [row for row in session.execute(popular, params) if row.id not in chosen][:limit - len(rows)]
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Refresh or rebuild the event recommendation index.')
+    parser.add_argument('--rebuild', action='store_true', help='recompute every event instead of the stale ones')
+    parser.add_argument('--python', action='store_true', help='rebuild without NumPy/SciPy')
+    args = parser.parse_args(argv)
+
+    from app import create_app
+
+    start = time.perf_counter()
+    with create_app(views=False).app_context(), db.engine.begin() as conn:
+        if args.rebuild:
+            count = rebuild(conn, vectorized=False if args.python else None)
+        else:
+            count = refresh(conn)
+    print(f'{"Rebuilt" if args.rebuild else "Refreshed"} {count} event(s) in {time.perf_counter() - start:.1f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+from collections import Counter, defaultdict
+
+import counters
+import ledger
+import seats
+from models import db, Event, Registration
+
+REVIEW_STATUSES = ('Accepted', 'Rejected')
+
+# Per-registration outcomes reported by bulk_update_registrations
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+FORBIDDEN = 'forbidden'
+FULL = 'full'
+
+
+def bulk_update_registrations(club_id, status, registration_ids=None, event_id=None):
+    """Set status on many registrations of a club's events in one transaction.
+
+    Pass either registration_ids or event_id (every Pending registration of
+    that event). Ownership is checked with one joined SELECT and the change
+    is applied with one conditional UPDATE per previous status, so only rows
+    still in the status they were read with change; seats, counters and
+    credits follow the rows actually changed. Seats freed by rejections go to the
+    waitlist; registrations that need a seat the event no longer has are
+    reported as FULL. Returns {registration_id: outcome}. The caller commits.
+    """
+    if status not in REVIEW_STATUSES:
+        raise ValueError(f'status must be one of {", ".join(REVIEW_STATUSES)}')
+
+    query = (db.session.query(Registration.id, Registration.status, Registration.event_id, Event.club_id)
+             .join(Event, Registration.event_id == Event.id))
+    if event_id is not None:
+        query = query.filter(Registration.event_id == event_id,
+                             Registration.status == 'Pending')
+    else:
+        registration_ids = {int(i) for i in registration_ids or ()}
+        if not registration_ids:
+            return {}
+        query = query.filter(Registration.id.in_(registration_ids))
+    rows = query.all()
+
+    outcomes = {}
+    to_update = []
+    previous = {registration_id: (registration_event_id, current_status)
+                for registration_id, current_status, registration_event_id, _ in rows}
+    # Per event: registrations that need a seat, and the number of seats freed
+    need_seat = defaultdict(list)
+    freed = defaultdict(int)
+    wanted = status in seats.HOLDS_SEAT
+    for registration_id, current_status, registration_event_id, owner_id in rows:
+        if owner_id != club_id:
+            outcomes[registration_id] = FORBIDDEN
+        elif current_status == status:
+            outcomes[registration_id] = UNCHANGED
+        else:
+            held = current_status in seats.HOLDS_SEAT
+            if wanted and not held:
+                need_seat[registration_event_id].append(registration_id)
+                continue
+            if held and not wanted:
+                freed[registration_event_id] += 1
+            outcomes[registration_id] = UPDATED
+            to_update.append(registration_id)
+
+    for seat_event_id, ids in need_seat.items():
+        ids.sort()  # oldest registrations get the free seats first
+        granted = seats.allocate_up_to(seat_event_id, len(ids))
+        for registration_id in ids[:granted]:
+            outcomes[registration_id] = UPDATED
+            to_update.append(registration_id)
+        for registration_id in ids[granted:]:
+            outcomes[registration_id] = FULL
+    if event_id is None:
+        for registration_id in registration_ids - outcomes.keys():
+            outcomes[registration_id] = NOT_FOUND
+
+    # One conditional UPDATE per previous status: a row another review changed
+    # since it was read is left alone and reported as unchanged
+    by_old_status = defaultdict(list)
+    for registration_id in to_update:
+        by_old_status[previous[registration_id][1]].append(registration_id)
+    changed = set()
+    for old_status, ids in by_old_status.items():
+        changed.update(seats.move_registrations(ids, old_status, status))
+    unused_seats = Counter()
+    for registration_id in to_update:
+        if registration_id in changed:
+            continue
+        outcomes[registration_id] = UNCHANGED
+        lost_event_id, old_status = previous[registration_id]
+        if old_status in seats.HOLDS_SEAT:
+            if not wanted:
+                freed[lost_event_id] -= 1
+        elif wanted:
+            unused_seats[lost_event_id] += 1
+    for seat_event_id, count in unused_seats.items():
+        seats.release_seats(seat_event_id, count)
+    to_update = [registration_id for registration_id in to_update if registration_id in changed]
+
+    moved = Counter(previous[registration_id] for registration_id in to_update)
+    for (counter_event_id, old_status), count in moved.items():
+        counters.registrations_moved(counter_event_id, old_status, status, count)
+    # Registrations that entered or left Accepted
+    crossed = [registration_id for registration_id in to_update
+               if (previous[registration_id][1] == ledger.ACCEPTED) != (status == ledger.ACCEPTED)]
+    if status == ledger.ACCEPTED:
+        ledger.credit_registrations(crossed)
+    else:
+        ledger.debit_registrations(crossed)
+    for seat_event_id, count in freed.items():
+        if count:
+            seats.release_seats(seat_event_id, count)
+            seats.promote_waitlist(seat_event_id)
+    return outcomes
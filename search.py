@@ -0,0 +1,207 @@
+"""Ranked full-text search over event names and descriptions.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers and
+ranked with bm25(). PostgreSQL uses a generated, weighted tsvector column
+with a GIN index, ranked with ts_rank() and highlighted with ts_headline().
+Other databases fall back to an unranked LIKE scan. Every backend returns
+the same result dicts, so callers never look at the dialect.
+"""
+import re
+
+from markupsafe import Markup, escape
+from sqlalchemy import or_, select, text
+
+from database import dialect_name
+from models import Club, Event
+
+# External-content FTS5 index over events; rows live only in the events table
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+        event_name, description,
+        content='events', content_rowid='id',
+        tokenize='porter unicode61', prefix='2 3'
+    )""",
+    # Keep the index in sync with every write to events
+    """CREATE TRIGGER IF NOT EXISTS events_fts_ai AFTER INSERT ON events BEGIN
+        INSERT INTO events_fts(rowid, event_name, description)
+        VALUES (new.id, new.event_name, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS events_fts_ad AFTER DELETE ON events BEGIN
+        INSERT INTO events_fts(events_fts, rowid, event_name, description)
+        VALUES ('delete', old.id, old.event_name, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS events_fts_au AFTER UPDATE OF event_name, description ON events BEGIN
+        INSERT INTO events_fts(events_fts, rowid, event_name, description)
+        VALUES ('delete', old.id, old.event_name, old.description);
+        INSERT INTO events_fts(rowid, event_name, description)
+        VALUES (new.id, new.event_name, new.description);
+    END""",
+]
+
+# Snippet delimiters; control characters never appear in user text
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+# Column weights for bm25(): a hit in the event name counts more than in the description
+NAME_WEIGHT = 5.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Ranking scores every match, so only rowids and scores are carried through the sort;
+# event details and snippets are fetched for the final page only
+RANK_SQL = text(f"""
+    SELECT e.id, e.event_name, e.credits, c.club_name, hits.rank
+    FROM (
+        SELECT rowid, bm25(events_fts, {NAME_WEIGHT}, {DESCRIPTION_WEIGHT}) AS rank
+        FROM events_fts
+        WHERE events_fts MATCH :query
+        ORDER BY rank
+        LIMIT :limit
+    ) AS hits
+    JOIN events e ON e.id = hits.rowid
+    JOIN clubs c ON c.id = e.club_id
+    ORDER BY hits.rank
+""")
+
+SNIPPET_SQL = f"""
+    SELECT rowid, snippet(events_fts, 1, '{MATCH_START}', '{MATCH_END}', '...', 16)
+    FROM events_fts
+    WHERE events_fts MATCH :query AND rowid IN ({{ids}})
+"""
+
+# PostgreSQL: the generated column recomputes itself on every write, like the FTS5 triggers
+PG_DDL = [
+    """ALTER TABLE events ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(event_name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED""",
+    'CREATE INDEX IF NOT EXISTS ix_events_search_vector ON events USING GIN (search_vector)',
+]
+
+# ts_rank weights for {D, C, B, A}: names (A) against descriptions (B) as in bm25 above.
+# ts_rank grows with relevance, so it is negated to sort ascending like bm25.
+PG_RANK_WEIGHTS = f"'{{0.1, 0.1, {DESCRIPTION_WEIGHT / NAME_WEIGHT}, 1.0}}'"
+
+PG_RANK_SQL = text(f"""
+    SELECT e.id, e.event_name, e.credits, c.club_name, hits.rank
+    FROM (
+        SELECT id, -ts_rank({PG_RANK_WEIGHTS}, search_vector, to_tsquery('english', :query)) AS rank
+        FROM events
+        WHERE search_vector @@ to_tsquery('english', :query)
+        ORDER BY rank
+        LIMIT :limit
+    ) AS hits
+    JOIN events e ON e.id = hits.id
+    JOIN clubs c ON c.id = e.club_id
+    ORDER BY hits.rank
+""")
+
+PG_SNIPPET_SQL = """
+    SELECT id, ts_headline('english', description, to_tsquery('english', :query),
+                           'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', MaxWords=16, MinWords=8')
+    FROM events
+    WHERE id IN ({ids})
+"""
+
+TERM_RE = re.compile(r'\w+')
+
+
+def create_search_index(conn):
+    """Create the backend's search index and its sync mechanism, then index existing events"""
+    dialect = dialect_name(conn)
+    if dialect == 'sqlite':
+        for statement in FTS_DDL:
+            conn.exec_driver_sql(statement)
+        conn.exec_driver_sql("INSERT INTO events_fts(events_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        for statement in PG_DDL:
+            conn.exec_driver_sql(statement)
+
+
+def _terms(query):
+    return TERM_RE.findall(query.lower())
+
+
+def build_match_query(query):
+    """Turn free text into a safe FTS5 query: every term required, last one as a prefix"""
+    terms = _terms(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    if len(terms[-1]) >= 3:
+        quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def build_tsquery(query):
+    """The PostgreSQL to_tsquery() equivalent of build_match_query"""
+    terms = _terms(query)
+    if not terms:
+        return None
+    quoted = [f"'{term}'" for term in terms]
+    if len(terms[-1]) >= 3:
+        quoted[-1] += ':*'
+    return ' & '.join(quoted)
+
+
+def _snippets(conn, snippet_sql, params, results):
+    # ids are integers read back from the database, safe to inline
+    ids = ','.join(str(result['id']) for result in results)
+    snippets = dict(conn.execute(text(snippet_sql.format(ids=ids)), params).all())
+    for result in results:
+        result['snippet'] = snippets.get(result['id'], '')
+    return results
+
+
+def _like_search(conn, query, limit):
+    """Unranked fallback for databases without a full-text backend here"""
+    terms = _terms(query)
+    if not terms:
+        return []
+    statement = (select(Event.id, Event.event_name, Event.credits, Club.club_name, Event.description)
+                 .join(Club, Club.id == Event.club_id)
+                 .order_by(Event.created_at.desc())
+                 .limit(limit))
+    for term in terms:
+        pattern = f'%{term}%'
+        statement = statement.where(or_(Event.event_name.ilike(pattern), Event.description.ilike(pattern)))
+    results = []
+    for row in conn.execute(statement).mappings():
+        result = dict(row)
+        result['rank'] = 0
+        result['snippet'] = result.pop('description')[:200]
+        results.append(result)
+    return results
+
+
+def search_events(conn, query, limit=20):
+    """Return relevance-ranked events matching query as dicts with a highlighted snippet"""
+    dialect = dialect_name(conn)
+    if dialect == 'postgresql':
+        tsquery = build_tsquery(query)
+        if tsquery is None:
+            return []
+        results = [dict(row) for row in
+                   conn.execute(PG_RANK_SQL, {'query': tsquery, 'limit': limit}).mappings()]
+        return _snippets(conn, PG_SNIPPET_SQL, {'query': tsquery}, results) if results else results
+    if dialect != 'sqlite':
+        return _like_search(conn, query, limit)
+
+    match_query = build_match_query(query)
+    if match_query is None:
+        return []
+    results = [dict(row) for row in
+               conn.execute(RANK_SQL, {'query': match_query, 'limit': limit}).mappings()]
+    if not results:
+        return results
+    return _snippets(conn, SNIPPET_SQL, {'query': match_query}, results)
+
+
+def highlight_html(snippet):
+    """Render a search snippet as HTML with matches wrapped in <mark>"""
+    html = str(escape(snippet))
+    return Markup(html.replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+
+def highlight_markdown(snippet):
+    """Render a search snippet for the chatbot with matches in bold"""
+    return snippet.replace(MATCH_START, '**').replace(MATCH_END, '**')
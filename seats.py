@@ -0,0 +1,142 @@
+"""Seat allocation for events with limited capacity.
+
+Every seat change is a conditional UPDATE of the event's seats_taken counter
+(seats_taken + n <= capacity), so the check and the increment are one atomic
+statement. Only that event's row is contended; registrations for different
+events never wait on each other (beyond the database's own write lock on
+SQLite). A registration that finds the event full is stored as Waitlisted,
+and waitlisted registrations are promoted oldest first when a seat is freed.
+
+Pending and Accepted registrations hold a seat. The per-status registration
+counters and the students' credit totals are kept in step here as well. None of these functions commit;
+the caller commits the seat change together with the registration.
+
+Review decisions are conditional too: move_registrations() only changes a
+registration that still has the status it was read with. Seats, counters
+and credits move only for the rows it reports as changed, so two reviewers
+deciding on the same registration at once cannot free its seat twice.
+"""
+from sqlalchemy import or_, update
+from sqlalchemy.orm.attributes import set_committed_value
+
+import counters
+import ledger
+from models import db, Event, Registration
+
+HOLDS_SEAT = ('Pending', 'Accepted')
+WAITLISTED = 'Waitlisted'
+
+
+def allocate_seats(event_id, count=1):
+    """Atomically take count seats of an event; True if they were all free"""
+    result = db.session.execute(
+        update(Event)
+        .where(Event.id == event_id,
+               or_(Event.capacity.is_(None), Event.seats_taken + count <= Event.capacity))
+        .values(seats_taken=Event.seats_taken + count)
+        .execution_options(synchronize_session=False))
+    return result.rowcount == 1
+
+
+def allocate_up_to(event_id, count):
+    """Take as many of count seats as are free; returns the number taken"""
+    if count <= 0:
+        return 0
+    if allocate_seats(event_id, count):
+        return count
+    taken = 0
+    while taken < count and allocate_seats(event_id):
+        taken += 1
+    return taken
+
+
+def release_seats(event_id, count=1):
+    if count > 0:
+        db.session.execute(
+            update(Event)
+            .where(Event.id == event_id)
+            .values(seats_taken=Event.seats_taken - count)
+            .execution_options(synchronize_session=False))
+
+
+def promote_waitlist(event_id):
+    """Give free seats to the oldest waitlisted registrations; returns the promoted ids.
+
+    Call after release_seats in the same transaction: the release already
+    holds the event row, so the free-seat count read here cannot go stale.
+    """
+    capacity, seats_taken = db.session.query(Event.capacity, Event.seats_taken).filter(Event.id == event_id).one()
+    waiting = (db.session.query(Registration.id)
+               .filter(Registration.event_id == event_id, Registration.status == WAITLISTED)
+               .order_by(Registration.registered_at, Registration.id))
+    if capacity is not None:
+        free = capacity - seats_taken
+        if free <= 0:
+            return []
+        waiting = waiting.limit(free)
+    registration_ids = [registration_id for (registration_id,) in waiting]
+    registration_ids = registration_ids[:allocate_up_to(event_id, len(registration_ids))]
+    promoted = move_registrations(registration_ids, WAITLISTED, 'Pending')
+    # Seats taken for registrations another review moved meanwhile go back
+    release_seats(event_id, len(registration_ids) - len(promoted))
+    if promoted:
+        counters.registrations_moved(event_id, WAITLISTED, 'Pending', len(promoted))
+    return promoted
+
+
+def register(student_id, event_id):
+    """Add a Pending registration if a seat is free, otherwise a Waitlisted one.
+
+    A duplicate registration raises IntegrityError on flush; rolling back
+    also returns the seat.
+    """
+    status = 'Pending' if allocate_seats(event_id) else WAITLISTED
+    registration = Registration(student_id=student_id, event_id=event_id, status=status)
+    db.session.add(registration)
+    db.session.flush()
+    counters.registration_added(event_id, status)
+    return registration
+
+
+def move_registrations(registration_ids, old_status, new_status):
+    """Set new_status on those of these registrations still in old_status; returns the ids changed"""
+    if not registration_ids:
+        return []
+    result = db.session.execute(
+        update(Registration)
+        .where(Registration.id.in_(registration_ids), Registration.status == old_status)
+        .values(status=new_status)
+        .returning(Registration.id)
+        .execution_options(synchronize_session=False))
+    return [registration_id for (registration_id,) in result]
+
+
+def set_status(registration, status):
+    """Apply a review decision, moving the seat and promoting the waitlist.
+
+    Returns False, leaving the registration unchanged, if the new status
+    needs a seat and the event is full. If another review changed the
+    registration after it was loaded, it is read again and the decision
+    applied to its current status instead.
+    """
+    while True:
+        old_status = registration.status
+        if old_status == status:
+            return True
+        held = old_status in HOLDS_SEAT
+        wanted = status in HOLDS_SEAT
+        if wanted and not held and not allocate_seats(registration.event_id):
+            return False
+        if move_registrations([registration.id], old_status, status):
+            break
+        # Lost the race: give back the seat taken for it and look again
+        if wanted and not held:
+            release_seats(registration.event_id)
+        db.session.refresh(registration)
+    set_committed_value(registration, 'status', status)
+    counters.registrations_moved(registration.event_id, old_status, status)
+    ledger.status_changed(registration.id, old_status, status)
+    if held and not wanted:
+        release_seats(registration.event_id)
+        promote_waitlist(registration.event_id)
+    return True
@@ -0,0 +1,137 @@
+"""Student routes: login, sign-up, dashboard and event registration."""
+from flask import (Blueprint, current_app, render_template, request, redirect, url_for, session, flash,
+                   make_response, get_template_attribute)
+from models import db, Student, Event, Registration
+from queries import query_budget, get_catalog_page, get_student_overlay, EVENT_FILTERS
+from pagination import parse_filters, InvalidCursor
+import seats
+import recommend
+import fragments
+import passwords
+import database
+from sqlalchemy.exc import IntegrityError
+
+bp = Blueprint('student', __name__)
+
+@bp.route('/student_login', methods=['GET', 'POST'])
+def student_login():
+    if request.method == 'POST':
+        reg_no = request.form['reg_no']
+        password = request.form['password']
+        
+        student = Student.query.filter_by(reg_no=reg_no).first()
+        if student and student.check_password(password):
+            if passwords.needs_rehash(student.password):
+                passwords.schedule_rehash(current_app._get_current_object(), Student, student.id, student.password, password)
+            session['student_id'] = student.id
+            session['student_name'] = student.name
+            session['user_type'] = 'student'
+            flash('Login successful!', 'success')
+            return redirect(url_for('student.student_dashboard'))
+        else:
+            flash('Invalid register number or password', 'error')
+    
+    return render_template('student_login.html')
+
+@bp.route('/student_register', methods=['GET', 'POST'])
+@database.retry_on_busy
+def student_register():
+    if request.method == 'POST':
+        name = request.form['name']
+        reg_no = request.form['reg_no']
+        email = request.form['email']
+        password = request.form['password']
+        
+        if not name or not reg_no or not email or not password:
+            flash('All fields are required!', 'error')
+        elif Student.query.filter_by(reg_no=reg_no).first():
+            flash('Register number already exists!', 'error')
+        elif Student.query.filter_by(email=email).first():
+            flash('Email already exists!', 'error')
+        else:
+            student = Student(name=name, reg_no=reg_no, email=email)
+            student.set_password(password)
+            db.session.add(student)
+            db.session.commit()
+            flash('Registration successful! Please login.', 'success')
+            return redirect(url_for('student.student_login'))
+    
+    return render_template('student_register.html')
+
+@bp.route('/student_dashboard')
+@query_budget('student_dashboard')
+def student_dashboard():
+    if 'student_id' not in session or session.get('user_type') != 'student':
+        return redirect(url_for('student.student_login'))
+    
+    cursor = request.args.get('cursor')
+    filters = {k: v for k, v in parse_filters(request.args).items() if k in EVENT_FILTERS}
+    version = fragments.current_catalog_version()
+    student = db.session.get(Student, session['student_id'])
+    
+    # The event cards are the same for every student: render them once per catalog version
+    def render_catalog():
+        data = get_catalog_page(cursor, filters)
+        html = render_template('_student_catalog.html', overlay_marker=fragments.overlay_marker, **data)
+        return html, [event.id for event in data['events'].items]
+    
+    try:
+        catalog_html, event_ids = fragments.cached_fragment('student_catalog', version,
+                                                            dict(filters, cursor=cursor), render_catalog)
+    except InvalidCursor:
+        return redirect(url_for('student.student_dashboard'))
+    
+    # Only the student's statuses and the live seat counts are per request
+    overlay_data = get_student_overlay(student.id, event_ids)
+    recommendations = recommend.for_student(student.id, limit=current_app.config['RECOMMENDATIONS_LIMIT'])
+    # Pages carrying flash messages are one-offs and must not be revalidated
+    etag = None
+    if not session.get('_flashes'):
+        etag = fragments.etag_for(version, student.id, student.name, student.email, student.credits_earned,
+                                  filters, cursor, sorted(overlay_data.items()),
+                                  [(event.id, event.source) for event in recommendations])
+        not_modified = fragments.not_modified(etag)
+        if not_modified is not None:
+            return not_modified
+    
+    overlay = get_template_attribute('_event_overlay.html', 'overlay')
+    overlays = {event_id: overlay(event_id, *values) for event_id, values in overlay_data.items()}
+    catalog = fragments.apply_overlays(catalog_html, overlays)
+    response = make_response(render_template('student_dashboard.html', student=student, catalog=catalog,
+                                             recommendations=recommendations))
+    if etag is not None:
+        fragments.conditional_headers(response, etag)
+    return response
+
+@bp.route('/register_event/<int:event_id>', methods=['GET', 'POST'])
+@database.retry_on_busy
+def register_event(event_id):
+    if 'student_id' not in session or session.get('user_type') != 'student':
+        return redirect(url_for('student.student_login'))
+    
+    event = Event.query.get_or_404(event_id)
+    student_id = session['student_id']
+    
+    # Check if already registered
+    existing_registration = Registration.query.filter_by(student_id=student_id, event_id=event_id).first()
+    if existing_registration:
+        flash('You have already registered for this event!', 'error')
+        return redirect(url_for('student.student_dashboard'))
+    
+    if request.method == 'POST':
+        try:
+            registration = seats.register(student_id, event_id)
+            recommend.schedule_refresh()
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request registered this student first
+            db.session.rollback()
+            flash('You have already registered for this event!', 'error')
+            return redirect(url_for('student.student_dashboard'))
+        if registration.status == seats.WAITLISTED:
+            flash('This event is full. You have been added to the waitlist.', 'info')
+        else:
+            flash('Event registration submitted successfully!', 'success')
+        return redirect(url_for('student.student_dashboard'))
+    
+    return render_template('register_event.html', event=event)
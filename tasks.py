@@ -0,0 +1,125 @@
+"""Job handlers for the slow side effects of requests (see jobs.py).
+
+delete_club         removes a club with its events and registrations
+notify_status       fans a review decision out to one send_notification job per student
+send_notification   emails one student about their registration's new status
+export_registrations writes a CSV/XLSX roster to EXPORT_DIR for download
+refresh_recommendations recomputes the neighbours of events with new registrations
+
+Handlers may run more than once; each one checks what is left to do
+before doing it.
+"""
+import logging
+import os
+import smtplib
+from datetime import datetime
+from email.message import EmailMessage
+
+from flask import current_app
+from sqlalchemy import or_
+
+import exports
+import fragments
+import jobs
+import ledger
+import recommend
+from models import db, Club, Student, Event, EventNeighbour, Registration
+
+mail_logger = logging.getLogger('tasks.mail')
+
+
+@jobs.handler('delete_club')
+def delete_club(job):
+    club = db.session.get(Club, job.args['club_id'])
+    if club is None:
+        return {'deleted': False}
+
+    # Delete related registrations and events in one statement each; their
+    # counters live on the deleted rows, only the students' credits need adjusting
+    ledger.club_deleted(club.id)
+    club_events = db.session.query(Event.id).filter(Event.club_id == club.id)
+    registrations = (Registration.query
+                     .filter(Registration.event_id.in_(club_events.scalar_subquery()))
+                     .delete(synchronize_session=False))
+    (EventNeighbour.query
+     .filter(or_(EventNeighbour.event_id.in_(club_events.scalar_subquery()),
+                 EventNeighbour.neighbour_id.in_(club_events.scalar_subquery())))
+     .delete(synchronize_session=False))
+    events = Event.query.filter_by(club_id=club.id).delete(synchronize_session=False)
+    db.session.delete(club)
+    # Commits with the job; cached chatbot answers and fragments are keyed on
+    # the version, so every process stops serving the club once it does
+    fragments.bump_catalog_version()
+    return {'deleted': True, 'club_name': club.club_name, 'events': events, 'registrations': registrations}
+
+
+@jobs.handler('notify_status')
+def notify_status(job):
+    registration_ids = job.args['registration_ids']
+    for registration_id in registration_ids:
+        # Keyed per fan-out job, so re-running this one does not notify anyone twice
+        jobs.enqueue('send_notification', {'registration_id': registration_id, 'status': job.args['status']},
+                     idempotency_key=f'notify:{job.id}:{registration_id}')
+    return {'queued': len(registration_ids)}
+
+
+def send_email(to, subject, body):
+    """Send through MAIL_SERVER, or log the message when no server is configured"""
+    config = current_app.config
+    if not config.get('MAIL_SERVER'):
+        mail_logger.info('To %s: %s\n%s', to, subject, body)
+        return
+    message = EmailMessage()
+    message['From'] = config['MAIL_SENDER']
+    message['To'] = to
+    message['Subject'] = subject
+    message.set_content(body)
+    with smtplib.SMTP(config['MAIL_SERVER'], config.get('MAIL_PORT', 25), timeout=30) as smtp:
+        smtp.send_message(message)
+
+
+@jobs.handler('send_notification', max_attempts=8)
+def send_notification(job):
+    row = (db.session.query(Registration.status, Student.name, Student.email, Event.event_name)
+           .join(Student, Registration.student_id == Student.id)
+           .join(Event, Registration.event_id == Event.id)
+           .filter(Registration.id == job.args['registration_id'])
+           .first())
+    # Deleted, or reviewed again since: the later decision sends its own notification
+    if row is None or row.status != job.args['status']:
+        return {'sent': False}
+    send_email(row.email, f'Your registration for {row.event_name} was {row.status.lower()}',
+               f'Hello {row.name},\n\nYour registration for {row.event_name} is now {row.status}.\n')
+    return {'sent': True}
+
+
+def export_path(job_id, file_format):
+    return os.path.join(current_app.config['EXPORT_DIR'], f'registrations-job-{job_id}.{file_format}')
+
+
+@jobs.handler('export_registrations', max_attempts=3)
+def export_registrations(job):
+    args = job.args
+    file_format = args['file_format']
+    start, end = (datetime.fromisoformat(value) if value else None for value in (args['start'], args['end']))
+    stmt = exports.roster_query(start=start, end=end, **args['filters'])
+
+    path = export_path(job.id, file_format)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written under a temporary name, so a download never sees half a file
+    partial = path + '.part'
+    mode = 'w' if file_format == 'csv' else 'wb'
+    with open(partial, mode, **({'newline': '', 'encoding': 'utf-8'} if mode == 'w' else {})) as out:
+        for chunk in exports.STREAMS[file_format](stmt):
+            out.write(chunk)
+    os.replace(partial, path)
+    return {'file': os.path.basename(path), 'bytes': os.path.getsize(path)}
+
+
+@jobs.handler('refresh_recommendations')
+def refresh_recommendations(job):
+    refreshed = recommend.refresh(db.session.connection(), limit=recommend.REFRESH_BATCH)
+    if refreshed == recommend.REFRESH_BATCH:
+        # More may be stale; carry on in a new job rather than one long transaction
+        jobs.enqueue('refresh_recommendations', idempotency_key=f'refresh_recommendations:after:{job.id}')
+    return {'refreshed': refreshed}
@@ -0,0 +1,68 @@
+"""Login attempts are limited per account and client IP, behind a proxy too"""
+import pytest
+
+from admission import MemoryBackend
+
+LIMITS = {'POST student.student_login': ('reg_no', 3, 300)}
+
+
+def attempt(client, reg_no, password='wrong', address=None):
+    headers = {'X-Forwarded-For': address} if address else {}
+    return client.post('/student_login', data={'reg_no': reg_no, 'password': password}, headers=headers)
+
+
+@pytest.fixture
+def limited_app(make_app, seed):
+    return make_app(ADMISSION_ENABLED=True, ACCOUNT_RATE_LIMITS=LIMITS)
+
+
+def test_guessing_one_account_is_refused_without_locking_out_others(limited_app):
+    client = limited_app.test_client()
+    assert [attempt(client, 'REG001').status_code for _ in range(4)] == [200, 200, 200, 429]
+    assert attempt(client, 'REG001', 'password123').status_code == 429
+    # Another student behind the same address still logs in
+    assert attempt(client, 'REG002', 'password123').status_code == 302
+
+
+def test_forwarded_address_is_ignored_without_proxy_fix(limited_app):
+    client = limited_app.test_client()
+    for address in ('203.0.113.1', '203.0.113.2', '203.0.113.3'):
+        assert attempt(client, 'REG001', address=address).status_code == 200
+    assert attempt(client, 'REG001', address='203.0.113.4').status_code == 429
+
+
+def test_proxy_fix_counts_the_forwarded_client(make_app, seed):
+    client = make_app(ADMISSION_ENABLED=True, ACCOUNT_RATE_LIMITS=LIMITS, PROXY_FIX_HOPS=1).test_client()
+    for _ in range(3):
+        assert attempt(client, 'REG001', address='203.0.113.1').status_code == 200
+    assert attempt(client, 'REG001', address='203.0.113.1').status_code == 429
+    assert attempt(client, 'REG001', 'password123', address='203.0.113.2').status_code == 302
+
+
+class BrokenBackend:
+    """A shared backend whose server is down"""
+
+    remote = True
+
+    def __init__(self):
+        self.calls = 0
+
+    def take(self, key, rate, burst):
+        self.calls += 1
+        raise ConnectionError('Error 111 connecting to redis:6379. Connection refused.')
+
+
+def test_backend_outage_falls_back_to_memory(limited_app, caplog):
+    admission = limited_app.extensions['admission']
+    admission.backend = BrokenBackend()
+    client = limited_app.test_client()
+    with caplog.at_level('ERROR', logger='admission'):
+        assert [attempt(client, 'REG001').status_code for _ in range(4)] == [200, 200, 200, 429]
+        assert attempt(client, 'REG002', 'password123').status_code == 302
+    assert admission.backend.calls >= 5
+    # Logged once when the outage starts, not on every request
+    assert len([record for record in caplog.records if record.name == 'admission']) == 1
+
+    admission.backend = MemoryBackend()
+    assert attempt(client, 'REG003').status_code == 200
+    assert not admission.failing
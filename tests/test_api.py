@@ -0,0 +1,56 @@
+"""The /api/v1 registration endpoints only ever show a club or student their own registrations"""
+import pytest
+
+
+# (role, name, indexes into seed['registrations'] the user may read, a query that tries to widen the scope)
+SCOPES = [
+    ('club', 'Club A', [0, 1], lambda seed: {'club_id': seed['clubs'][1]}),
+    ('club', 'Club B', [2], lambda seed: {'event_id': seed['events'][0]}),
+    ('student', 'REG001', [0, 2], lambda seed: {'student_id': seed['students'][1]}),
+    ('student', 'REG003', [], lambda seed: {'event_id': seed['events'][0]}),
+]
+
+
+@pytest.mark.parametrize('role, name, own, widen', SCOPES)
+def test_registration_detail_is_scoped(seed, client_for, role, name, own, widen):
+    client = client_for(role, name)
+    for index, registration_id in enumerate(seed['registrations']):
+        response = client.get(f'/api/v1/registrations/{registration_id}')
+        if index in own:
+            assert response.status_code == 200
+            assert response.get_json()['id'] == registration_id
+        else:
+            assert response.status_code == 404
+            assert response.get_json() == {'error': 'Not found'}
+
+
+@pytest.mark.parametrize('role, name, own, widen', SCOPES)
+def test_registration_list_and_export_are_scoped(seed, client_for, role, name, own, widen):
+    client = client_for(role, name)
+    expected = sorted(seed['registrations'][index] for index in own)
+    listed = client.get('/api/v1/registrations', query_string={'fields': 'id'})
+    assert listed.status_code == 200
+    assert sorted(item['id'] for item in listed.get_json()['items']) == expected
+    exported = client.get('/api/v1/registrations/export', query_string={'fields': 'id'})
+    assert exported.status_code == 200
+    assert sorted(item['id'] for item in exported.get_json()) == expected
+
+    # Filtering on someone else's club, event or student narrows further, never widens
+    query = {'fields': 'id', **widen(seed)}
+    listed = client.get('/api/v1/registrations', query_string=query).get_json()['items']
+    exported = client.get('/api/v1/registrations/export', query_string=query).get_json()
+    assert {item['id'] for item in listed + exported} <= set(expected)
+
+def test_admin_reads_every_registration(seed, client_for):
+    client = client_for('admin', 'admin')
+    listed = client.get('/api/v1/registrations', query_string={'fields': 'id'}).get_json()
+    assert sorted(item['id'] for item in listed['items']) == sorted(seed['registrations'])
+    for registration_id in seed['registrations']:
+        assert client.get(f'/api/v1/registrations/{registration_id}').status_code == 200
+
+
+def test_registrations_require_login(seed, app):
+    client = app.test_client()
+    assert client.get('/api/v1/registrations').status_code == 401
+    assert client.get(f"/api/v1/registrations/{seed['registrations'][0]}").status_code == 401
+    assert client.get('/api/v1/registrations/export').status_code == 401
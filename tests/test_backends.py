@@ -0,0 +1,66 @@
+"""What each database backend implements its own way: search and the migration lock"""
+import threading
+
+from sqlalchemy import func, select
+
+from app import SEED_CLUBS, init_database
+from migrations import latest_version, upgrade
+from models import db, schema_version, Club, Event
+from search import MATCH_START, search_events
+
+
+def test_search_ranks_name_matches_first(app, seed):
+    with app.app_context():
+        db.session.add(Event(club_id=seed['clubs'][1], event_name='Robotics Expo', description='Robots on show',
+                             credits=2))
+        db.session.commit()
+        results = search_events(db.session.connection(), 'robotics')
+        assert [result['event_name'] for result in results] == ['Robotics Expo', 'Tech Workshop']
+        assert MATCH_START in results[1]['snippet']
+        # The last term also matches as a prefix
+        assert [result['event_name'] for result in search_events(db.session.connection(), 'worksh')] == [
+            'Tech Workshop']
+        assert search_events(db.session.connection(), '!!') == []
+
+
+def run_at_once(target, count=4):
+    """Call target from count threads released together; returns the exceptions they raised"""
+    start = threading.Barrier(count)
+    errors = []
+
+    def run():
+        start.wait()
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_concurrent_upgrades_migrate_once(app):
+    with app.app_context():
+        db.drop_all()
+    versions = []
+
+    def migrate():
+        with app.app_context():
+            versions.append(upgrade())
+
+    errors = run_at_once(migrate)
+
+    assert not errors
+    assert versions == [latest_version()] * 4
+    with app.app_context():
+        assert db.session.scalar(select(func.count()).select_from(schema_version)) == 1
+
+
+def test_concurrent_workers_seed_clubs_once(app):
+    assert not run_at_once(lambda: init_database(app))
+    with app.app_context():
+        assert sorted(db.session.scalars(select(Club.club_name))) == sorted(SEED_CLUBS)
@@ -0,0 +1,26 @@
+"""The chatbot routes answer malformed bodies without a server error"""
+import pytest
+
+import answers
+
+
+@pytest.mark.parametrize('body', [[1], 'hello', 42])
+def test_stream_with_non_object_body_sends_error_event(app, body):
+    response = app.test_client().post('/chatbot_stream', json=body)
+    assert response.status_code == 200
+    text = response.get_data(as_text=True)
+    assert text.startswith('event: error')
+    assert 'event: done' not in text
+
+
+def test_stream_answers_an_object_body(app, seed):
+    text = app.test_client().post('/chatbot_stream', json={'message': 'list all clubs'}).get_data(as_text=True)
+    assert 'Club A' in text
+    assert text.endswith(answers.sse('', event='done'))
+
+
+@pytest.mark.parametrize('body', [[1], 'hello'])
+def test_process_with_non_object_body_answers_error_message(app, body):
+    response = app.test_client().post('/chatbot_process', json=body)
+    assert response.status_code == 200
+    assert response.get_json()['response'] == answers.ERROR_MESSAGE
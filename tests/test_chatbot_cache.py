@@ -0,0 +1,29 @@
+"""Cached chatbot answers follow the catalog version across processes"""
+import jobs
+from caching import chatbot_cache
+from models import db
+
+
+def ask(client, message):
+    response = client.post('/chatbot_process', json={'message': message})
+    assert response.status_code == 200
+    return response.get_json()['response']
+
+
+def test_deleted_club_leaves_cached_answers_without_clearing(make_app, seed):
+    web = make_app()
+    worker = make_app()  # stands in for the job worker process
+    client = web.test_client()
+    assert 'Club B' in ask(client, 'list all clubs')
+    assert 'Cultural Festival' in ask(client, 'show all events')
+    assert 'Club B' in ask(client, 'list all clubs')  # now served from the cache
+
+    with web.app_context():
+        jobs.enqueue('delete_club', {'club_id': seed['clubs'][1]})
+        db.session.commit()
+    invalidations = chatbot_cache.stats()['invalidations']
+    assert jobs.run_next(worker)
+
+    assert chatbot_cache.stats()['invalidations'] == invalidations
+    assert 'Club B' not in ask(client, 'list all clubs')
+    assert 'Cultural Festival' not in ask(client, 'show all events')
@@ -0,0 +1,55 @@
+"""Registration counters still match a recount after concurrent reviews"""
+import random
+import threading
+
+from sqlalchemy import func
+
+import counters
+import seats
+from models import db, Event, Registration
+from conftest import login
+
+
+def test_counters_reconcile_after_concurrent_reviews(app, seed):
+    with app.app_context():
+        seats.register(seed['students'][2], seed['events'][0])  # waitlisted: the event is full
+        db.session.commit()
+        registration_ids = [registration_id for (registration_id,) in
+                            db.session.query(Registration.id).filter(Registration.event_id == seed['events'][0])]
+    start = threading.Barrier(6)
+    errors = []
+
+    def reviewer(seed_value):
+        rng = random.Random(seed_value)
+        client = login(app.test_client(), 'club', 'Club A')
+        start.wait()
+        for _ in range(15):
+            status = rng.choice(('Accepted', 'Rejected'))
+            if rng.random() < 0.5:
+                response = client.get(f'/update_registration/{rng.choice(registration_ids)}/{status}')
+                expected = 302
+            else:
+                response = client.post('/bulk_update_registrations', json={
+                    'status': status,
+                    'registration_ids': rng.sample(registration_ids, rng.randint(1, len(registration_ids)))})
+                expected = 200
+            if response.status_code != expected:
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=reviewer, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    with app.app_context():
+        by_status = dict(db.session.query(Registration.status, func.count())
+                         .filter(Registration.event_id == seed['events'][0])
+                         .group_by(Registration.status))
+        event = db.session.get(Event, seed['events'][0])
+        assert (event.registrations_pending, event.registrations_accepted, event.registrations_rejected,
+                event.registrations_waitlisted) == tuple(by_status.get(status, 0) for status in
+                                                         ('Pending', 'Accepted', 'Rejected', 'Waitlisted'))
+        assert event.registrations_total == sum(by_status.values())
+        assert counters.reconcile(db.session.connection()) == []
@@ -0,0 +1,39 @@
+"""Which database errors retry_on_busy retries"""
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from database import is_busy_error
+
+
+class DriverError(Exception):
+    """A DB-API error carrying its SQLSTATE the way one PostgreSQL driver does"""
+
+    def __init__(self, message, **attributes):
+        super().__init__(message)
+        self.__dict__.update(attributes)
+
+
+def operational(orig):
+    return OperationalError('UPDATE registrations ...', {}, orig)
+
+
+@pytest.mark.parametrize('attribute', ['sqlstate', 'pgcode'])  # psycopg 3, psycopg2
+@pytest.mark.parametrize('code', ['40001', '40P01'])  # serialization_failure, deadlock_detected
+def test_postgresql_conflicts_are_retried(attribute, code):
+    assert is_busy_error(operational(DriverError('could not serialize access', **{attribute: code})))
+
+
+@pytest.mark.parametrize('attribute', ['sqlstate', 'pgcode'])
+def test_other_postgresql_errors_are_not_retried(attribute):
+    assert not is_busy_error(operational(DriverError('connection refused', **{attribute: '08006'})))
+
+
+def test_sqlite_lock_is_retried():
+    assert is_busy_error(operational(sqlite3.OperationalError('database is locked')))
+    assert not is_busy_error(operational(sqlite3.OperationalError('no such table: events')))
+
+
+def test_only_operational_errors_are_retried():
+    assert not is_busy_error(IntegrityError('INSERT ...', {}, DriverError('duplicate', sqlstate='40001')))
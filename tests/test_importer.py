@@ -0,0 +1,75 @@
+"""Event imports validate capacity the same way from CSV and JSON"""
+import csv
+import io
+import json
+
+import pytest
+
+import importer
+from models import Event
+
+EVENT = {'club_name': 'Club A', 'event_name': 'Imported', 'description': 'From a file', 'credits': 2}
+
+
+def import_json(app, **fields):
+    with app.app_context():
+        report = importer.import_stream('events', io.StringIO(json.dumps([dict(EVENT, **fields)])), 'json')
+        event = Event.query.filter_by(event_name='Imported').first()
+        return report, event.capacity if event else None
+
+
+@pytest.mark.parametrize('capacity', [0, -3, 2.5, True, '0', 'ten'])
+def test_invalid_capacity_is_refused(app, seed, capacity):
+    report, _ = import_json(app, capacity=capacity)
+    assert report.inserted == 0
+    assert report.errors == [(1, 'capacity must be a positive whole number')]
+
+
+@pytest.mark.parametrize('capacity, stored', [(None, None), ('', None), ('  ', None), (40, 40), (' 40 ', 40)])
+def test_blank_capacity_is_unlimited(app, seed, capacity, stored):
+    report, event_capacity = import_json(app, capacity=capacity)
+    assert report.inserted == 1
+    assert event_capacity == stored
+
+
+def test_csv_capacity_zero_is_refused(app, seed):
+    stream = io.StringIO('club_name,event_name,description,credits,capacity\nClub A,Imported,From a file,2,0\n')
+    with app.app_context():
+        report = importer.import_stream('events', stream, 'csv')
+    assert report.inserted == 0
+    assert len(report.errors) == 1
+
+
+STUDENTS_CSV = b'name,reg_no,email,password\nAda,IMP001,ada@campus.edu,password123\n'
+
+
+def import_bytes(app, kind, data, file_format):
+    stream = io.TextIOWrapper(io.BytesIO(data), encoding='utf-8-sig', newline='')
+    with app.app_context():
+        return importer.import_stream(kind, stream, file_format, workers=0)
+
+
+def test_non_utf8_csv_is_reported(app, seed):
+    report = import_bytes(app, 'students', STUDENTS_CSV + b'Bj\xf6rn,IMP002,bjorn@campus.edu,password123\n', 'csv')
+    assert report.errors == [(None, "Row 2: the file is not UTF-8 text (invalid start byte)")]
+
+
+def test_non_utf8_json_is_reported(app, seed):
+    report = import_bytes(app, 'events', b'[{"club_name": "Club A", "event_name": "Caf\xe9"}]', 'json')
+    assert len(report.errors) == 1
+    assert report.errors[0][1].startswith('Record 1: the file is not UTF-8 text')
+
+
+def test_malformed_csv_is_reported(app, seed):
+    oversized = b'x' * (csv.field_size_limit() + 1)
+    report = import_bytes(app, 'students', STUDENTS_CSV + b'Bo,IMP002,"' + oversized + b'",password123\n', 'csv')
+    assert report.inserted == 0  # the batch holding the bad row is rolled back
+    assert len(report.errors) == 1
+    assert report.errors[0][1].startswith('Row 3: invalid CSV (field larger than field limit')
+
+
+def test_admin_upload_of_undecodable_file_shows_the_report(app, seed, client_for):
+    response = client_for('admin', 'admin').post('/import_data', data={
+        'kind': 'students', 'file': (io.BytesIO(b'\xff\xfe\x00n\x00a\x00m\x00e'), 'students.csv')})
+    assert response.status_code == 200
+    assert 'the file is not UTF-8 text' in response.get_data(as_text=True)
@@ -0,0 +1,110 @@
+"""Job queue guarantees: idempotent enqueue, lease expiry and bounded retries"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import jobs
+import tasks
+from models import db, Job
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Registers 'echo' (succeeds) and 'flaky' (always raises, 3 attempts); returns the attempts each saw"""
+    calls = []
+
+    def echo(job):
+        calls.append(('echo', job.attempts))
+        return job.args
+
+    def flaky(job):
+        calls.append(('flaky', job.attempts))
+        raise RuntimeError('mail server down')
+
+    monkeypatch.setitem(jobs.HANDLERS, 'echo', (echo, 5))
+    monkeypatch.setitem(jobs.HANDLERS, 'flaky', (flaky, 3))
+    return calls
+
+
+def test_enqueue_with_same_idempotency_key_returns_existing_job(app, calls):
+    with app.app_context():
+        first = jobs.enqueue('echo', {'n': 1}, idempotency_key='echo:1')
+        # Found in the same transaction, before it commits
+        assert jobs.enqueue('echo', {'n': 2}, idempotency_key='echo:1') is first
+        db.session.commit()
+        first_id = first.id
+
+    with app.app_context():
+        again = jobs.enqueue('echo', {'n': 3}, idempotency_key='echo:1')
+        db.session.commit()
+        assert again.id == first_id
+        assert again.args == {'n': 1}
+        assert Job.query.filter_by(kind='echo').count() == 1
+
+        other = jobs.enqueue('echo', {'n': 4}, idempotency_key='echo:2')
+        db.session.commit()
+        assert other.id != first_id
+
+
+def test_expired_lease_is_reclaimed(app, calls):
+    with app.app_context():
+        job_id = jobs.enqueue('echo', {'n': 1}).id
+        db.session.commit()
+
+        assert jobs.claim(lease_seconds=60) == (job_id, 1)
+        # Leased to the first worker, so nobody else can take it
+        assert jobs.claim(lease_seconds=60) is None
+
+        # The first worker died: once its lease runs out the job is claimed again
+        Job.query.filter_by(id=job_id).update({'locked_until': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+        assert jobs.claim(lease_seconds=60) == (job_id, 2)
+
+        # A late finish by the first attempt is discarded; the second one settles the job
+        assert jobs.run_job(job_id, 1, app.config) is None
+        assert db.session.get(Job, job_id).status == jobs.RUNNING
+        assert jobs.run_job(job_id, 2, app.config) == jobs.DONE
+        job = db.session.get(Job, job_id)
+        assert (job.status, job.attempts) == (jobs.DONE, 2)
+
+
+def test_failing_job_is_retried_until_max_attempts_then_failed(make_app, calls):
+    app = make_app(JOB_RETRY_BACKOFF=0)
+    with app.app_context():
+        job_id = jobs.enqueue('flaky').id
+        db.session.commit()
+
+    while jobs.run_next(app):
+        pass
+
+    assert calls == [('flaky', 1), ('flaky', 2), ('flaky', 3)]
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        assert (job.status, job.attempts) == (jobs.FAILED, 3)
+        assert job.error == 'RuntimeError: mail server down'
+        assert job.finished_at is not None and job.locked_until is None
+
+
+def test_failed_attempt_waits_for_backoff(app, calls):
+    with app.app_context():
+        job_id = jobs.enqueue('flaky').id
+        db.session.commit()
+
+    assert jobs.run_next(app)
+    # The retry is scheduled JOB_RETRY_BACKOFF seconds out, so it is not due yet
+    assert not jobs.run_next(app)
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        assert (job.status, job.attempts) == (jobs.QUEUED, 1)
+        assert job.run_at > datetime.utcnow()
+
+
+def test_rerun_notify_status_does_not_queue_duplicate_notifications(app, seed):
+    with app.app_context():
+        job = jobs.enqueue('notify_status', {'registration_ids': seed['registrations'][:2], 'status': 'Accepted'})
+        db.session.commit()
+        # Run twice, as if the first run's worker lost its lease after the fan-out committed
+        for _ in range(2):
+            assert tasks.notify_status(job) == {'queued': 2}
+            db.session.commit()
+        assert Job.query.filter_by(kind='send_notification').count() == 2
@@ -0,0 +1,59 @@
+"""A registration is credited once however many reviewers accept it"""
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+import ledger
+import reviews
+import seats
+from models import db, CreditEntry, Registration, Student
+
+
+def credits(app, student_id):
+    with app.app_context():
+        return db.session.get(Student, student_id).credits_earned
+
+
+def test_stale_double_accept_credits_once(app, seed):
+    pending_id = seed['registrations'][0]
+    student_id = seed['students'][0]
+    with app.app_context():
+        registration = db.session.get(Registration, pending_id)
+        with app.app_context():
+            assert seats.set_status(db.session.get(Registration, pending_id), 'Accepted')
+            db.session.commit()
+        # The second reviewer still holds the registration as Pending
+        assert seats.set_status(registration, 'Accepted')
+        db.session.commit()
+        assert ledger.verify(db.session.connection()) == []
+    assert credits(app, student_id) == 5
+
+
+def test_bulk_accept_after_single_accept_credits_once(app, seed):
+    pending_id = seed['registrations'][0]
+    with app.app_context():
+        assert seats.set_status(db.session.get(Registration, pending_id), 'Accepted')
+        db.session.commit()
+    with app.app_context():
+        outcomes = reviews.bulk_update_registrations(seed['clubs'][0], 'Accepted', registration_ids=[pending_id])
+        db.session.commit()
+    assert outcomes == {pending_id: reviews.UNCHANGED}
+    assert credits(app, seed['students'][0]) == 5
+
+
+def test_second_credit_for_a_registration_is_refused(app, seed):
+    accepted_id = seed['registrations'][1]
+    with app.app_context():
+        with pytest.raises(IntegrityError):
+            ledger.credit_registrations([accepted_id])
+            db.session.flush()
+        db.session.rollback()
+        assert CreditEntry.query.filter_by(registration_id=accepted_id).count() == 1
+    assert credits(app, seed['students'][1]) == 5
+
+
+def test_debit_without_entry_changes_nothing(app, seed):
+    pending_id = seed['registrations'][0]
+    with app.app_context():
+        ledger.debit_registrations([pending_id])
+        db.session.commit()
+    assert credits(app, seed['students'][0]) == 0
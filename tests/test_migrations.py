@@ -0,0 +1,79 @@
+"""upgrade() brings a database created before any migration up to the current schema"""
+from sqlalchemy import create_engine, inspect
+
+import counters
+import ledger
+import passwords
+from app import create_app
+from migrations import get_schema_version, latest_version, upgrade
+from models import db, Club, Event
+
+# The tables as the first release created them, before schema_version existed
+BASELINE_DDL = [
+    """CREATE TABLE clubs (
+        id INTEGER PRIMARY KEY, club_name VARCHAR(100) NOT NULL UNIQUE, password VARCHAR(100) NOT NULL)""",
+    """CREATE TABLE students (
+        id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, reg_no VARCHAR(50) NOT NULL UNIQUE,
+        email VARCHAR(120) NOT NULL UNIQUE, password VARCHAR(200) NOT NULL)""",
+    """CREATE TABLE events (
+        id INTEGER PRIMARY KEY, club_id INTEGER NOT NULL REFERENCES clubs (id),
+        event_name VARCHAR(200) NOT NULL, description TEXT NOT NULL, credits INTEGER NOT NULL,
+        created_at TIMESTAMP)""",
+    """CREATE TABLE registrations (
+        id INTEGER PRIMARY KEY, student_id INTEGER NOT NULL REFERENCES students (id),
+        event_id INTEGER NOT NULL REFERENCES events (id), status VARCHAR(20), registered_at TIMESTAMP,
+        CONSTRAINT unique_student_event UNIQUE (student_id, event_id))""",
+]
+
+
+def create_baseline(url):
+    """Empty the database and create the version-0 tables with a few rows"""
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        db.metadata.drop_all(conn)
+        if conn.dialect.name == 'sqlite':
+            conn.exec_driver_sql('DROP TABLE IF EXISTS events_fts')
+        for ddl in BASELINE_DDL:
+            conn.exec_driver_sql(ddl)
+        conn.exec_driver_sql("INSERT INTO clubs (id, club_name, password) VALUES (1, 'Club A', 'clubpass')")
+        conn.exec_driver_sql(
+            "INSERT INTO students (id, name, reg_no, email, password) VALUES "
+            f"(1, 'Student 1', 'REG001', 'student1@campus.edu', '{passwords.hash_password('password123')}'), "
+            f"(2, 'Student 2', 'REG002', 'student2@campus.edu', '{passwords.hash_password('password123')}')")
+        conn.exec_driver_sql(
+            "INSERT INTO events (id, club_id, event_name, description, credits, created_at) VALUES "
+            "(1, 1, 'Tech Workshop', 'Python and robotics', 5, '2024-01-01 10:00:00'), "
+            "(2, 1, 'Hackathon', 'Build something', 3, '2024-01-02 10:00:00')")
+        conn.exec_driver_sql(
+            "INSERT INTO registrations (id, student_id, event_id, status, registered_at) VALUES "
+            "(1, 1, 1, 'Pending', '2024-01-03 10:00:00'), (2, 2, 1, 'Accepted', '2024-01-03 11:00:00'), "
+            "(3, 1, 2, 'Accepted', '2024-01-03 12:00:00'), (4, 2, 2, 'Rejected', '2024-01-03 13:00:00')")
+    engine.dispose()
+
+
+def test_upgrade_from_version_0(database_url):
+    create_baseline(database_url)
+    app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': database_url, 'ADMISSION_ENABLED': False})
+    try:
+        with app.app_context():
+            assert get_schema_version(db.session.connection()) == 0
+            db.session.rollback()
+            assert upgrade() == latest_version()
+            conn = db.session.connection()
+            assert get_schema_version(conn) == latest_version()
+            inspector = inspect(conn)
+            for table in db.metadata.sorted_tables:
+                existing = {index['name'] for index in inspector.get_indexes(table.name)}
+                assert {index.name for index in table.indexes} <= existing, table.name
+            assert counters.reconcile(conn) == []
+            assert ledger.verify(conn) == []
+            assert db.session.get(Event, 1).seats_taken == 2
+            assert passwords.is_hashed(db.session.get(Club, 1).password)
+            assert db.session.get(Club, 1).check_password('clubpass')
+            # Already current: nothing left to apply
+            db.session.rollback()
+            assert upgrade() == latest_version()
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
@@ -0,0 +1,53 @@
+"""Every dashboard stays within its DASHBOARD_QUERY_BUDGETS entry (enforced under TESTING)"""
+import re
+
+import pytest
+
+from models import db, Registration, Student
+from pagination import DEFAULT_PAGE_SIZE
+from queries import DASHBOARD_QUERY_BUDGETS, assert_max_queries
+
+
+@pytest.mark.parametrize('role, name, path, budget', [
+    ('admin', 'admin', '/admin_dashboard', 'admin_dashboard'),
+    ('club', 'Club A', '/club_dashboard', 'club_dashboard'),
+    ('student', 'REG001', '/student_dashboard', 'student_dashboard'),
+])
+def test_dashboard_within_budget(app, seed, client_for, role, name, path, budget):
+    client = client_for(role, name)
+    with app.app_context():
+        with assert_max_queries(DASHBOARD_QUERY_BUDGETS[budget], db.engine):
+            response = client.get(path)
+    assert response.status_code == 200
+    for event_name in ('Tech Workshop', 'Cultural Festival') if role != 'club' else ('Tech Workshop',):
+        assert event_name in response.get_data(as_text=True)
+
+
+
+def test_club_dashboard_pages_registrations_per_event(app, seed, client_for):
+    with app.app_context():
+        students = [Student(name=f'Bulk {n}', reg_no=f'BULK{n:03}', email=f'bulk{n}@campus.edu', password='x')
+                    for n in range(DEFAULT_PAGE_SIZE + 5)]
+        db.session.add_all(students)
+        db.session.flush()
+        db.session.add_all(Registration(student_id=student.id, event_id=seed['events'][0], status='Pending')
+                           for student in students)
+        db.session.commit()
+    client = client_for('club', 'Club A')
+
+    with app.app_context():
+        with assert_max_queries(DASHBOARD_QUERY_BUDGETS['club_dashboard'], db.engine):
+            first = client.get('/club_dashboard').get_data(as_text=True)
+    assert first.count('>BULK') == DEFAULT_PAGE_SIZE
+    next_page = re.search(r'href="(/club_dashboard\?[^"]*registrations_cursor=[^"]*)"', first).group(1)
+
+    with app.app_context():
+        with assert_max_queries(DASHBOARD_QUERY_BUDGETS['club_dashboard'], db.engine):
+            second = client.get(next_page.replace('&amp;', '&')).get_data(as_text=True)
+    # The rest of the bulk registrations, then the two seeded ones
+    assert second.count('>BULK') == 5
+    assert '>REG001<' in second and '>REG002<' in second
+    assert 'registrations_cursor=' not in second
+    assert 'First page' in second
+
+    assert client.get('/club_dashboard?event_id=1&registrations_cursor=garbage').status_code == 302
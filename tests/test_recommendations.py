@@ -0,0 +1,37 @@
+"""Recommendations say where they came from, and the chatbot's tip follows"""
+import recommend
+from models import db
+
+SIMILAR_TIP = 'popular with students who registered for the same events as you'
+POPULAR_TIP = 'the most popular events right now'
+
+
+def ask(client, message):
+    return client.post('/chatbot_process', json={'message': message}).get_json()['response']
+
+
+def rebuild(app):
+    with app.app_context():
+        recommend.rebuild(db.session.connection())
+        db.session.commit()
+
+
+def test_neighbour_recommendations_get_the_similarity_tip(app, seed, client_for):
+    rebuild(app)
+    with app.app_context():
+        rows = recommend.for_student(seed['students'][1], limit=3)
+        assert [(row.event_name, row.source) for row in rows] == [('Cultural Festival', recommend.NEIGHBOURS)]
+    answer = ask(client_for('student', 'REG002'), 'recommend me some events')
+    assert 'Cultural Festival' in answer
+    assert SIMILAR_TIP in answer
+
+
+def test_popular_fallback_does_not_claim_similarity(app, seed, client_for):
+    with app.app_context():
+        rows = recommend.for_student(seed['students'][2], limit=3)
+        assert rows and {row.source for row in rows} == {recommend.POPULAR}
+    client = client_for('student', 'REG003')
+    answer = ask(client, 'recommend me some events')
+    assert SIMILAR_TIP not in answer
+    assert POPULAR_TIP in answer
+    assert 'Popular Events' in client.get('/student_dashboard').get_data(as_text=True)
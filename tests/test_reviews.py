@@ -0,0 +1,137 @@
+"""Review decisions: racing reviews never move a seat twice, and malformed bulk requests change nothing"""
+import random
+import threading
+
+import pytest
+from sqlalchemy import event, func
+
+import reviews
+import seats
+from models import db, Event, Registration
+from conftest import login
+
+
+def seat_state(app, event_id):
+    """(seats_taken, registrations holding a seat, capacity) of an event"""
+    with app.app_context():
+        event = db.session.get(Event, event_id)
+        holding = (db.session.query(func.count(Registration.id))
+                   .filter(Registration.event_id == event_id, Registration.status.in_(seats.HOLDS_SEAT))
+                   .scalar())
+        state = event.seats_taken, holding, event.capacity
+        db.session.rollback()
+        return state
+
+
+def waitlist(app, seed):
+    """Register the third student for the full two-seat event; returns the registration id"""
+    with app.app_context():
+        registration = seats.register(seed['students'][2], seed['events'][0])
+        db.session.commit()
+        assert registration.status == seats.WAITLISTED
+        return registration.id
+
+
+def test_stale_double_reject_frees_one_seat(app, seed):
+    waiting_id = waitlist(app, seed)
+    accepted_id = seed['registrations'][1]
+    with app.app_context():
+        registration = db.session.get(Registration, accepted_id)
+        assert registration.status == 'Accepted'
+        # The first reviewer rejects it through the same code path and commits
+        with app.app_context():
+            assert seats.set_status(db.session.get(Registration, accepted_id), 'Rejected')
+            db.session.commit()
+        # The second reviewer still holds the registration as Accepted
+        assert seats.set_status(registration, 'Rejected')
+        db.session.commit()
+        assert db.session.get(Registration, waiting_id).status == 'Pending'
+    taken, holding, capacity = seat_state(app, seed['events'][0])
+    assert taken == holding == 2 <= capacity
+
+
+def test_bulk_review_racing_another_review(app, seed):
+    waiting_id = waitlist(app, seed)
+    pending_id, accepted_id = seed['registrations'][:2]
+    raced = []
+
+    def other_reviewer(conn, cursor, statement, parameters, context, executemany):
+        """Reject accepted_id and commit, between the bulk review's SELECT and its UPDATE"""
+        if raced or not statement.startswith('UPDATE registrations'):
+            return
+        raced.append(statement)
+        with app.app_context():
+            assert seats.set_status(db.session.get(Registration, accepted_id), 'Rejected')
+            db.session.commit()
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', other_reviewer)
+        try:
+            outcomes = reviews.bulk_update_registrations(seed['clubs'][0], 'Rejected',
+                                                         registration_ids=[pending_id, accepted_id])
+            db.session.commit()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', other_reviewer)
+        assert db.session.get(Registration, waiting_id).status == 'Pending'
+    assert raced
+    assert outcomes == {pending_id: reviews.UPDATED, accepted_id: reviews.UNCHANGED}
+    taken, holding, capacity = seat_state(app, seed['events'][0])
+    assert taken == holding == 1 <= capacity
+
+
+def test_concurrent_reviews_never_overbook(app, seed):
+    waitlist(app, seed)
+    registration_ids = [seed['registrations'][0], seed['registrations'][1]]
+    with app.app_context():
+        registration_ids.append(db.session.query(Registration.id)
+                                .filter(Registration.status == seats.WAITLISTED).scalar())
+    start = threading.Barrier(6)
+    errors = []
+
+    def reviewer(seed_value):
+        rng = random.Random(seed_value)
+        client = login(app.test_client(), 'club', 'Club A')
+        start.wait()
+        for _ in range(15):
+            registration_id = rng.choice(registration_ids)
+            status = rng.choice(('Accepted', 'Rejected'))
+            response = client.get(f'/update_registration/{registration_id}/{status}')
+            if response.status_code != 302:
+                errors.append(response.status_code)
+
+    threads = [threading.Thread(target=reviewer, args=(n,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    taken, holding, capacity = seat_state(app, seed['events'][0])
+    assert taken == holding
+    assert taken <= capacity
+
+
+@pytest.mark.parametrize('body', [
+    [1, 2],
+    'Accepted',
+    {'status': 'Accepted', 'registration_ids': '1,2'},
+    {'status': 'Accepted', 'registration_ids': [1, '2']},
+    {'status': 'Accepted', 'registration_ids': [True]},
+    {'status': 'Accepted', 'event_id': '1'},
+    {'status': 'Pending', 'registration_ids': [1]},
+    {'registration_ids': [1]},
+])
+def test_bulk_review_rejects_malformed_json(app, seed, client_for, body):
+    response = client_for('club', 'Club A').post('/bulk_update_registrations', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+    with app.app_context():
+        assert db.session.get(Registration, seed['registrations'][0]).status == 'Pending'
+
+
+
+def test_bulk_review_rejects_invalid_json_body(seed, client_for):
+    response = client_for('club', 'Club A').post('/bulk_update_registrations', data='{"status": ',
+                                                 content_type='application/json')
+    assert response.status_code == 400
+    assert 'error' in response.get_json()